@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 
 import accupatt.config as cfg
@@ -7,6 +8,8 @@ from PyQt6.QtWidgets import QApplication
 from accupatt.windows.mainWindow import MainWindow
 
 if __name__ == "__main__":
+    # Required for card processing worker processes in frozen (bundled) builds
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setOrganizationName("mattgill")
     app.setApplicationDisplayName("AccuPatt")
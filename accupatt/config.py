@@ -391,6 +391,21 @@ def set_smooth_order(value: int):
     QSettings().setValue(_SMOOTH_ORDER, value)
 
 
+_AVERAGE_GRID_POINTS = "average_grid_points"
+# 0 samples the series average at the finest pass spacing
+AVERAGE_GRID_POINTS__DEFAULT = 0
+
+
+def get_average_grid_points() -> int:
+    return QSettings().value(
+        _AVERAGE_GRID_POINTS, defaultValue=AVERAGE_GRID_POINTS__DEFAULT, type=int
+    )
+
+
+def set_average_grid_points(value: int):
+    QSettings().setValue(_AVERAGE_GRID_POINTS, value)
+
+
 # String Plot Options
 
 _STRING_PLOT_AVERAGE_DASH_OVERLAY = "string_plot_average_dash_overlay"
@@ -565,6 +580,61 @@ def set_spectrometer_display_unit(value: str):
     QSettings().setValue(_SPECTROMETER_DISPLAY_UNIT, value)
 
 
+_SPECTROMETER_ACQUISITION_MODE = "spectrometer_acquisition_mode"
+SPECTROMETER_ACQUISITION_MODE_POLLED = "Polled"
+SPECTROMETER_ACQUISITION_MODE_BUFFERED = "Device Buffered"
+SPECTROMETER_ACQUISITION_MODES = [
+    SPECTROMETER_ACQUISITION_MODE_POLLED,
+    SPECTROMETER_ACQUISITION_MODE_BUFFERED,
+]
+SPECTROMETER_ACQUISITION_MODE__DEFAULT = SPECTROMETER_ACQUISITION_MODE_POLLED
+
+
+def get_spectrometer_acquisition_mode() -> str:
+    return QSettings().value(
+        _SPECTROMETER_ACQUISITION_MODE,
+        defaultValue=SPECTROMETER_ACQUISITION_MODE__DEFAULT,
+        type=str,
+    )
+
+
+def set_spectrometer_acquisition_mode(value: str):
+    QSettings().setValue(_SPECTROMETER_ACQUISITION_MODE, value)
+
+
+_SPECTROMETER_CAPTURE_FULL_SPECTRA = "spectrometer_capture_full_spectra"
+SPECTROMETER_CAPTURE_FULL_SPECTRA__DEFAULT = False
+
+
+def get_spectrometer_capture_full_spectra() -> bool:
+    return QSettings().value(
+        _SPECTROMETER_CAPTURE_FULL_SPECTRA,
+        defaultValue=SPECTROMETER_CAPTURE_FULL_SPECTRA__DEFAULT,
+        type=bool,
+    )
+
+
+def set_spectrometer_capture_full_spectra(value: bool):
+    QSettings().setValue(_SPECTROMETER_CAPTURE_FULL_SPECTRA, value)
+
+
+# Upper bound on the uncompressed full spectra kept per pass
+_SPECTROMETER_FULL_SPECTRA_LIMIT_MB = "spectrometer_full_spectra_limit_mb"
+SPECTROMETER_FULL_SPECTRA_LIMIT_MB__DEFAULT = 64
+
+
+def get_spectrometer_full_spectra_limit_mb() -> int:
+    return QSettings().value(
+        _SPECTROMETER_FULL_SPECTRA_LIMIT_MB,
+        defaultValue=SPECTROMETER_FULL_SPECTRA_LIMIT_MB__DEFAULT,
+        type=int,
+    )
+
+
+def set_spectrometer_full_spectra_limit_mb(value: int):
+    QSettings().setValue(_SPECTROMETER_FULL_SPECTRA_LIMIT_MB, value)
+
+
 # SprayCard Image Loading Operations / Attributes
 
 _IMAGE_LOAD_DIR = "image_load_dir"
@@ -699,6 +769,20 @@ def set_image_dpi(value: int):
     QSettings().setValue(_IMAGE_DPI, value)
 
 
+_IMAGE_CACHE_MB = "image_cache_mb"
+IMAGE_CACHE_MB__DEFAULT = 512
+
+
+def get_image_cache_mb() -> int:
+    return QSettings().value(
+        _IMAGE_CACHE_MB, defaultValue=IMAGE_CACHE_MB__DEFAULT, type=int
+    )
+
+
+def set_image_cache_mb(value: int):
+    QSettings().setValue(_IMAGE_CACHE_MB, value)
+
+
 # SprayCard Image Processing - Thresholding
 
 _THRESHOLD_TYPE = "threshold_type"
@@ -958,6 +1042,20 @@ def set_max_stain_count(value: int):
     QSettings().setValue(_MAX_STAIN_COUNT, value)
 
 
+_TILE_MEMORY_MB = "tile_memory_mb"
+TILE_MEMORY_MB__DEFAULT = 1024
+
+
+def get_tile_memory_mb() -> int:
+    return QSettings().value(
+        _TILE_MEMORY_MB, defaultValue=TILE_MEMORY_MB__DEFAULT, type=int
+    )
+
+
+def set_tile_memory_mb(value: int):
+    QSettings().setValue(_TILE_MEMORY_MB, value)
+
+
 # SprayCard Processed Image Colors
 
 COLOR_STAIN_OUTLINE = (226, 43, 138)  # Red-Pink
@@ -0,0 +1,167 @@
+import concurrent.futures as cf
+import os
+from typing import Callable
+
+import accupatt.config as cfg
+import cv2
+from accupatt.helpers.imageCache import image_cache
+from accupatt.models.sprayCard import (
+    SprayCard,
+    SprayCardImageStages,
+    TiledSprayCardImageProcessor,
+    sprayCardImageFileHandler,
+)
+from PyQt6.QtCore import QCoreApplication
+
+
+class CardProcessingEngine:
+    """
+    Processes a batch of SprayCards, fanning image processing out across
+    a pool of worker processes (one per core by default). Workers only ship
+    back the compact per-stain results, which are applied to the cards here.
+    A card whose image can't be processed is left not current and listed in
+    failed, the rest of the batch carries on.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers if max_workers else os.cpu_count() or 1
+        self._executor: cf.ProcessPoolExecutor = None
+        self._canceled = False
+        self.failed: list[SprayCard] = []
+
+    def process(
+        self,
+        cards: list[SprayCard],
+        on_progress: Callable[[int, SprayCard], bool] = None,
+    ) -> list[SprayCard]:
+        """
+        Processes images and caches droplet statistics for each card in cards.
+        on_progress is called with (number of cards finished, last completed card or None)
+        each time a card finishes and periodically while waiting. Returning False
+        from on_progress cancels the batch. Returns the list of completed cards,
+        those which failed are in failed.
+        """
+        self._canceled = False
+        self.failed = []
+        if len(cards) == 0:
+            return []
+        # No need to spin up a pool for a single card
+        if len(cards) == 1 or self.max_workers == 1:
+            return self._process_in_process(cards, on_progress)
+        return self._process_in_pool(cards, on_progress)
+
+    def cancel(self):
+        self._canceled = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _process_in_process(self, cards, on_progress) -> list[SprayCard]:
+        completed: list[SprayCard] = []
+        for card in cards:
+            finished = len(completed) + len(self.failed)
+            if on_progress is not None and not on_progress(finished, None):
+                self.cancel()
+                break
+            try:
+                card.process_image()
+            except Exception:
+                self._fail(card)
+                continue
+            card.stats.set_volumetric_stats()
+            completed.append(card)
+        if on_progress is not None and not self._canceled:
+            on_progress(
+                len(completed) + len(self.failed),
+                completed[-1] if completed else None,
+            )
+        return completed
+
+    def _process_in_pool(self, cards, on_progress) -> list[SprayCard]:
+        completed: list[SprayCard] = []
+        workers = min(self.max_workers, len(cards))
+        # Workers process cards at once, so they share the tile memory budget
+        self._executor = cf.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(
+                cfg.get_tile_memory_mb() / workers,
+                QCoreApplication.organizationName(),
+                QCoreApplication.applicationName(),
+            ),
+        )
+        try:
+            futures = {
+                self._executor.submit(
+                    _process_card,
+                    card.id,
+                    card.name,
+                    card.filepath,
+                    card.has_image,
+                    card.get_process_options(),
+                ): card
+                for card in cards
+            }
+            pending = set(futures)
+            while pending and not self._canceled:
+                done, pending = cf.wait(
+                    pending, timeout=0.1, return_when=cf.FIRST_COMPLETED
+                )
+                last_card = None
+                for future in done:
+                    card = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        self._fail(card)
+                        continue
+                    _apply_result(card, result)
+                    card.stats.set_volumetric_stats()
+                    completed.append(card)
+                    last_card = card
+                if on_progress is not None and not on_progress(
+                    len(completed) + len(self.failed), last_card
+                ):
+                    self.cancel()
+        finally:
+            self._executor.shutdown(wait=not self._canceled, cancel_futures=True)
+            self._executor = None
+        return completed
+
+    def _fail(self, card: SprayCard):
+        # Unreadable or corrupt image, left to be processed again
+        card.current = False
+        self.failed.append(card)
+
+
+def _init_worker(tile_memory_mb: float, organization: str, application: str):
+    # Spawned workers must be named as the app is to read its settings
+    QCoreApplication.setOrganizationName(organization)
+    QCoreApplication.setApplicationName(application)
+    TiledSprayCardImageProcessor.memory_mb = tile_memory_mb
+    # Each worker handles one card at a time, avoid oversubscribing cores
+    cv2.setNumThreads(1)
+    # Workers never revisit a card, caching images would only hold memory
+    image_cache.set_max_bytes(0)
+
+
+def _process_card(id_, name, filepath, has_image, process_options) -> dict:
+    # Runs in worker process, rebuild a minimal card to process
+    card = SprayCard(id_=id_, name=name, filepath=filepath)
+    card.has_image = has_image
+    card.set_process_options(process_options)
+    # Read directly, the image is decoded once and dropped after processing
+    img = sprayCardImageFileHandler.read_image_from_file(card, use_cache=False)
+    card.process_image(stages=SprayCardImageStages(img))
+    # Return only the compact stain table, contours are never built in the worker
+    return {
+        "area_px2": card.area_px2,
+        "threshold_grayscale_calculated": card.threshold_grayscale_calculated,
+        "stains": card.stains,
+    }
+
+
+def _apply_result(card: SprayCard, result: dict):
+    card.area_px2 = result["area_px2"]
+    card.threshold_grayscale_calculated = result["threshold_grayscale_calculated"]
+    card.stains = result["stains"]
+    card.current = True
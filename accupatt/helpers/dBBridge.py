@@ -1,22 +1,90 @@
+import functools
+import hashlib
+import io
 import os
+import re
 import sqlite3
-import alembic.config
-import alembic.command
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 import accupatt.config as cfg
+from accupatt.helpers.dBConnections import db_connections
+from accupatt.helpers.imageCache import image_cache
 from accupatt.models.appInfo import Nozzle
 from accupatt.models.passDataCard import PassDataCard
 from accupatt.models.passData import Pass
 from accupatt.models.passDataString import PassDataString
+from accupatt.models.pattern import Pattern
 from accupatt.models.seriesDataCard import SeriesDataCard
 from accupatt.models.seriesData import SeriesData
 from accupatt.models.seriesDataString import SeriesDataString
 from accupatt.models.sprayCard import SprayCard
+from accupatt.models.stainTable import StainTable
+from accupatt.models.stringSpectra import StringSpectra
 
 schema_filename = os.path.join(os.getcwd(), "resources", "schema.sql")
 alembic_ini = os.path.join(os.getcwd(), "resources", "alembic.ini")
+migrations_dir = os.path.join(os.getcwd(), "resources", "migrations", "versions")
+
+
+"""""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """''
+Schema Version
+""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" ""
+
+
+@functools.cache
+def _schema_head() -> str:
+    # Head revision of the migration scripts, read without importing Alembic
+    revisions, parents = set(), set()
+    for name in os.listdir(migrations_dir):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(migrations_dir, name), "rt") as f:
+            for line in f:
+                if line.startswith("revision ="):
+                    revisions.update(re.findall(r"['\"](\w+)['\"]", line))
+                elif line.startswith("down_revision ="):
+                    parents.update(re.findall(r"['\"](\w+)['\"]", line))
+    heads = revisions - parents
+    # None unless there is exactly one, leaving Alembic to resolve it
+    return heads.pop() if len(heads) == 1 else None
+
+
+def _schema_revision(c: sqlite3.Cursor) -> str:
+    # Revision the db is stamped with, None if never stamped
+    try:
+        rows = c.execute("""SELECT version_num FROM alembic_version""").fetchall()
+    except sqlite3.OperationalError:
+        return None
+    return rows[0][0] if rows else None
+
+
+def _is_schema_head(c: sqlite3.Cursor) -> bool:
+    head = _schema_head()
+    return head is not None and _schema_revision(c) == head
+
+
+def _run_alembic(file: str, *command: str):
+    # Imports Alembic and SQLAlchemy, so only used when the db is not at head
+    import alembic.config
+
+    alembic.config.main(
+        argv=["--raiseerr", f"-c{alembic_ini}", f"-xdbPath=sqlite:///{file}", *command]
+    )
+
+
+def _stamp_schema_head(file: str, c: sqlite3.Cursor):
+    head = _schema_head()
+    if head is None:
+        _run_alembic(file, "stamp", "head")
+        return
+    # As Alembic would stamp it
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL, CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))"""
+    )
+    c.execute("""DELETE FROM alembic_version""")
+    c.execute("""INSERT INTO alembic_version (version_num) VALUES (?)""", (head,))
 
 
 """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """''
@@ -25,19 +93,13 @@ Loading
 
 
 def load_from_db(file: str, s: SeriesData, load_only_info=False):
-    # Use Alembic to convert db to most current
-    alembic_args = [
-        "--raiseerr",
-        f"-c{alembic_ini}",
-        f"-xdbPath=sqlite:///{file}",
-        "upgrade",
-        "head",
-    ]
-    alembic.config.main(argv=alembic_args)
     # Opens a file connection to the db
-    with sqlite3.connect(file) as conn:
+    with db_connections.connection(file) as conn:
         # Get a cursor object
         c = conn.cursor()
+        # Use Alembic to convert db to most current, only if behind
+        if not _is_schema_head(c):
+            _run_alembic(file, "upgrade", "head")
         if load_only_info:
             # Need a handle on the series id to load
             s_ = SeriesData()
@@ -58,6 +120,7 @@ def load_from_db(file: str, s: SeriesData, load_only_info=False):
             _load_table_spray_system(c, s)
             _load_table_nozzles(c, s)
             _load_table_passes(c, s, file)
+            _mark_loaded(c, file, s)
 
 
 def _load_table_series(c: sqlite3.Cursor, s: SeriesData):
@@ -257,8 +320,29 @@ def _load_table_pass_string(c: sqlite3.Cursor, p: Pass):
         d_em,
         ps.include_in_composite,
     ) = c.fetchone()
-    ps.data_ex = pd.read_json(d_ex)
-    ps.data = pd.read_json(d_em)
+    ps.data_ex = _decode_pattern(d_ex)
+    ps.data = _decode_pattern(d_em)
+    _load_table_pass_string_spectra(c, p)
+
+
+def _decode_pattern(value) -> Pattern:
+    # Binary blobs, or JSON from files saved before binary storage
+    if isinstance(value, bytes):
+        return Pattern.from_blob(value)
+    return Pattern.from_dataframe(pd.read_json(io.StringIO(value)))
+
+
+def _load_table_pass_string_spectra(c: sqlite3.Cursor, p: Pass):
+    c.execute(
+        """SELECT stride, wavelengths, loc, spectra FROM pass_string_spectra WHERE pass_id = ?""",
+        (p.id,),
+    )
+    row = c.fetchone()
+    if row is None:
+        return
+    stride, wavelengths, loc, spectra = row
+    # Stays compressed until first used
+    p.string.spectra = StringSpectra.from_blob(wavelengths, loc, spectra, stride)
 
 
 def _load_table_pass_spray_card(c: sqlite3.Cursor, p: Pass):
@@ -277,7 +361,7 @@ def _load_table_pass_spray_card(c: sqlite3.Cursor, p: Pass):
 def _load_table_spray_cards(c: sqlite3.Cursor, p: Pass, file: str):
     # Spray Cards Table
     c.execute(
-        """SELECT id, name, location, location_units, include_in_composite, threshold_type, threshold_method_grayscale, threshold_grayscale, threshold_color_hue_min, threshold_color_hue_max, threshold_color_hue_pass, threshold_color_saturation_min, threshold_color_saturation_max, threshold_color_saturation_pass, threshold_color_brightness_min, threshold_color_brightness_max, threshold_color_brightness_pass, watershed, min_stain_area_px, stain_approximation_method, dpi, spread_method, spread_factor_a, spread_factor_b, spread_factor_c, has_image FROM spray_cards WHERE pass_id = ?""",
+        """SELECT id, name, location, location_units, include_in_composite, threshold_type, threshold_method_grayscale, threshold_grayscale, threshold_color_hue_min, threshold_color_hue_max, threshold_color_hue_pass, threshold_color_saturation_min, threshold_color_saturation_max, threshold_color_saturation_pass, threshold_color_brightness_min, threshold_color_brightness_max, threshold_color_brightness_pass, watershed, min_stain_area_px, stain_approximation_method, dpi, spread_method, spread_factor_a, spread_factor_b, spread_factor_c, has_image, image_hash FROM spray_cards WHERE pass_id = ?""",
         (p.id,),
     )
     cards = c.fetchall()
@@ -310,16 +394,58 @@ def _load_table_spray_cards(c: sqlite3.Cursor, p: Pass, file: str):
             sc.spread_factor_b,
             sc.spread_factor_c,
             sc.has_image,
+            sc.image_hash,
         ) = row
         sc.set_threshold_color_hue(min_=hmin, max_=hmax, bandpass=hpass)
         sc.set_threshold_color_saturation(min_=smin, max_=smax, bandpass=spass)
         sc.set_threshold_color_brightness(min_=bmin, max_=bmax, bandpass=bpass)
+        _load_table_spray_card_results(c, sc)
         p.cards.card_list.append(sc)
 
 
+def _load_table_spray_card_results(c: sqlite3.Cursor, sc: SprayCard):
+    c.execute(
+        """SELECT image_hash, process_key, area_px2, threshold_grayscale_calculated, stain_index, stain_area, stain_flags FROM spray_card_results WHERE spray_card_id = ?""",
+        (sc.id,),
+    )
+    row = c.fetchone()
+    if row is None or not sc.has_image:
+        return
+    (
+        image_hash,
+        process_key,
+        area_px2,
+        threshold_grayscale_calculated,
+        stain_index,
+        stain_area,
+        stain_flags,
+    ) = row
+    # Image or process options changed since results were saved, needs reprocessing
+    if image_hash != sc.image_hash or process_key != sc.get_process_key():
+        return
+    flags = np.frombuffer(stain_flags, dtype=np.uint8)
+    sc.area_px2 = area_px2
+    sc.threshold_grayscale_calculated = threshold_grayscale_calculated
+    sc.stains = StainTable(
+        index=np.frombuffer(stain_index, dtype=np.int32),
+        area=np.frombuffer(stain_area, dtype=np.float64),
+        is_too_small=(flags & 1).astype(bool),
+        is_edge=(flags & 2).astype(bool),
+        is_include=(flags & 4).astype(bool),
+    )
+    sc.current = True
+    # Droplet stats depend on spread factors, cheap to recompute from stain areas
+    sc.stats.set_volumetric_stats()
+
+
+def hash_image(image) -> str:
+    return hashlib.sha1(image).hexdigest()
+
+
 def load_image_from_db(file: str, spray_card_id: str) -> bytearray:
     byte_array = None
-    with sqlite3.connect(file) as conn:
+    # Read-only for the calling thread, as worker threads and processes load images
+    with db_connections.reader(file) as conn:
         # Get a cursor object
         c = conn.cursor()
         # SprayCard Table entry matching supplied card id
@@ -335,41 +461,147 @@ Saving
 
 
 def save_to_db(file: str, s: SeriesData) -> bool:
+    is_new = not os.path.isfile(file)
     # If db not yet created need create timestamp
-    if not os.path.isfile(file):
+    if is_new:
         s.info.created = int(datetime.now().timestamp())
-    s.info.modified = int(datetime.now().timestamp())
-    # Use Alembic to convert db to most current
-    alembic_args = [
-        "--raiseerr",
-        f"-c{alembic_ini}",
-        f"-xdbPath=sqlite:///{file}",
-        "stamp",
-        "head",
-    ]
-    alembic.config.main(argv=alembic_args)
+    # Rows saved to any other file say nothing of what this one holds
+    if is_new or s.saved_file != os.path.abspath(file):
+        _forget_saved(s)
+    # Any connection still open was to a file since removed
+    if is_new:
+        db_connections.close(file)
     # Opens a file connection to the db
-    with sqlite3.connect(file) as conn:
+    with db_connections.connection(file) as conn:
+        # Get a cursor object
+        c = conn.cursor()
+        # Mark db as most current, as the schema below creates any missing tables
+        if not _is_schema_head(c):
+            _stamp_schema_head(file, c)
         # Create db from schema if no tables exist
         with open(schema_filename, "rt") as f:
             schema = f.read()
         conn.executescript(schema)
-        # Get a cursor object
-        c = conn.cursor()
         # Ensure we don't get multiple series per db file
-        if _is_new_or_sole_series(c, s):
-            # Update all tables
-            _update_table_series(c, s)
-            _update_table_series_string(c, s)
-            _update_table_series_spray_card(c, s)
-            _update_table_flyin(c, s)
-            _update_table_aircraft(c, s)
-            _update_table_applicator(c, s)
-            _update_table_spray_system(c, s)
-            _update_table_nozzles(c, s)
-            _update_table_passes(c, s)
-            return True
-    return False
+        if not _is_new_or_sole_series(c, s):
+            return False
+        # Write only rows changed since last loaded or saved, in one transaction
+        batch = _SaveBatch(c)
+        _update_tables(batch, s)
+        batch.execute()
+    # Committed, so remember what the file now holds
+    batch.mark_saved()
+    s.saved_file = os.path.abspath(file)
+    db_connections.checkpoint(file)
+    return True
+
+
+def _update_tables(batch: "_SaveBatch", s: SeriesData, touch=True):
+    _update_table_series_string(batch, s)
+    _update_table_series_spray_card(batch, s)
+    _update_table_flyin(batch, s)
+    _update_table_aircraft(batch, s)
+    _update_table_applicator(batch, s)
+    _update_table_spray_system(batch, s)
+    _update_table_nozzles(batch, s)
+    _update_table_passes(batch, s)
+    # Last, as any other change moves on the modified time
+    _update_table_series(batch, s, touch)
+
+
+def _mark_loaded(c: sqlite3.Cursor, file: str, s: SeriesData):
+    # Rows as just loaded are as saved, without writing them
+    batch = _SaveBatch(c)
+    _update_tables(batch, s, touch=False)
+    batch.mark_saved()
+    s.saved_file = os.path.abspath(file)
+
+
+def _forget_saved(s: SeriesData):
+    s.saved_rows.clear()
+    s.saved_pass_ids = set()
+    s.saved_nozzle_ids = set()
+    for p in s.passes:
+        p.saved_rows.clear()
+        p.string.saved_rows.clear()
+        p.cards.saved_rows.clear()
+        p.cards.saved_card_ids = set()
+        for card in p.cards.card_list:
+            card.saved_rows.clear()
+
+
+def _set_saved_ids(obj, attr: str, items: list):
+    setattr(obj, attr, {item.id for item in items})
+
+
+class _SaveBatch:
+    """
+    Rows to write in one save, grouped by statement so each statement runs
+    once with executemany. An upsert is skipped if its object's saved row for
+    the key is unchanged. Saved rows are only updated by mark_saved, once the
+    transaction has committed.
+    """
+
+    def __init__(self, c: sqlite3.Cursor):
+        self.c = c
+        self._upserts: dict[str, list[tuple]] = {}
+        self._deletes: dict[str, list[tuple]] = {}
+        self._saved: list[tuple] = []
+        self._on_commit: list = []
+
+    def __len__(self) -> int:
+        # Statements to execute, one per row
+        return sum(len(rows) for rows in self._upserts.values()) + sum(
+            len(rows) for rows in self._deletes.values()
+        )
+
+    def upsert(self, obj, key, sql: str, row: tuple, compare=None, force=False):
+        # compare stands in for row when checking for changes, if given
+        compare = row if compare is None else compare
+        if not force and obj.saved_rows.get(key) == compare:
+            return
+        self._upserts.setdefault(sql, []).append(row)
+        self._saved.append((obj, key, compare))
+
+    def delete(self, obj, key, sql: str, *rows: tuple):
+        if len(rows) == 0:
+            return
+        self._deletes.setdefault(sql, []).extend(rows)
+        if obj is not None:
+            self._saved.append((obj, key, None))
+
+    def on_commit(self, callback):
+        self._on_commit.append(callback)
+
+    def execute(self):
+        # Each statement once over all of its rows, upserts before deletes
+        for sql, rows in [*self._upserts.items(), *self._deletes.items()]:
+            self.c.executemany(sql, rows)
+
+    def mark_saved(self):
+        for obj, key, row in self._saved:
+            if row is None:
+                obj.saved_rows.pop(key, None)
+            else:
+                obj.saved_rows[key] = row
+        for callback in self._on_commit:
+            callback()
+
+
+# Removing a pass, and everything belonging to it, by pass id
+_DELETE_PASS = [
+    """DELETE FROM spray_card_results WHERE spray_card_id IN (SELECT id FROM spray_cards WHERE pass_id = ?)""",
+    """DELETE FROM spray_cards WHERE pass_id = ?""",
+    """DELETE FROM pass_spray_card WHERE pass_id = ?""",
+    """DELETE FROM pass_string_spectra WHERE pass_id = ?""",
+    """DELETE FROM pass_string WHERE pass_id = ?""",
+    """DELETE FROM passes WHERE id = ?""",
+]
+# Removing a spray card, by card id
+_DELETE_CARD = [
+    """DELETE FROM spray_card_results WHERE spray_card_id = ?""",
+    """DELETE FROM spray_cards WHERE id = ?""",
+]
 
 
 def _is_new_or_sole_series(c: sqlite3.Cursor, s: SeriesData):
@@ -382,9 +614,18 @@ def _is_new_or_sole_series(c: sqlite3.Cursor, s: SeriesData):
     return False
 
 
-def _update_table_series(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_series(batch: "_SaveBatch", s: SeriesData, touch=True):
     i = s.info
-    c.execute(
+    # Compared without the modified time, which is only moved on by a change
+    info = (s.id, i.series, i.created, i.notes_setup, i.notes_analyst)
+    changed = len(batch) > 0 or s.saved_rows.get("series") != info
+    if not changed:
+        return
+    if touch:
+        i.modified = int(datetime.now().timestamp())
+    batch.upsert(
+        s,
+        "series",
         """INSERT INTO series (id, series, created, modified, notes_setup, notes_analyst, version_major, version_minor, version_release) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(id) DO UPDATE SET
                     series = excluded.series, created = excluded.created, modified = excluded.modified, notes_setup = excluded.notes_setup, notes_analyst = excluded.notes_analyst""",
@@ -399,12 +640,16 @@ def _update_table_series(c: sqlite3.Cursor, s: SeriesData):
             cfg.VERSION_MINOR,
             cfg.VERSION_RELEASE,
         ),
+        compare=info,
+        force=True,
     )
 
 
-def _update_table_series_string(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_series_string(batch: "_SaveBatch", s: SeriesData):
     ss: SeriesDataString = s.string
-    c.execute(
+    batch.upsert(
+        s,
+        "series_string",
         """INSERT INTO series_string (series_id, average_center, average_center_method, average_smooth, average_smooth_window, average_smooth_order, equalize_integrals, swath_adjusted, simulated_adjascent_passes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(series_id) DO UPDATE SET
                     average_center = excluded.average_center, average_center_method = excluded.average_center_method, average_smooth = excluded.average_smooth, average_smooth_window = excluded.average_smooth_window, average_smooth_order = excluded.average_smooth_window, equalize_integrals = excluded.equalize_integrals, swath_adjusted = excluded.swath_adjusted, simulated_adjascent_passes = excluded.simulated_adjascent_passes""",
@@ -422,9 +667,11 @@ def _update_table_series_string(c: sqlite3.Cursor, s: SeriesData):
     )
 
 
-def _update_table_series_spray_card(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_series_spray_card(batch: "_SaveBatch", s: SeriesData):
     scd: SeriesDataCard = s.cards
-    c.execute(
+    batch.upsert(
+        s,
+        "series_spray_card",
         """INSERT INTO series_spray_card (series_id, average_center, average_center_method, swath_adjusted, simulated_adjascent_passes) VALUES (?, ?, ?, ?, ?)
                     ON CONFLICT(series_id) DO UPDATE SET
                     average_center = excluded.average_center, average_center_method = excluded.average_center_method, swath_adjusted = excluded.swath_adjusted, simulated_adjascent_passes = excluded.simulated_adjascent_passes""",
@@ -438,9 +685,11 @@ def _update_table_series_spray_card(c: sqlite3.Cursor, s: SeriesData):
     )
 
 
-def _update_table_flyin(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_flyin(batch: "_SaveBatch", s: SeriesData):
     i = s.info
-    c.execute(
+    batch.upsert(
+        s,
+        "flyin",
         """INSERT INTO flyin (series_id, flyin_name, flyin_location, flyin_date, flyin_analyst) VALUES (?, ?, ?, ?, ?)
                         ON CONFLICT(series_id) DO UPDATE SET
                         flyin_name = excluded.flyin_name, flyin_location = excluded.flyin_location, flyin_date = excluded.flyin_date, flyin_analyst = excluded.flyin_analyst""",
@@ -448,9 +697,11 @@ def _update_table_flyin(c: sqlite3.Cursor, s: SeriesData):
     )
 
 
-def _update_table_applicator(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_applicator(batch: "_SaveBatch", s: SeriesData):
     i = s.info
-    c.execute(
+    batch.upsert(
+        s,
+        "applicator",
         """INSERT INTO applicator (series_id, pilot, business, street, city, state, zip, phone, email) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                         ON CONFLICT(series_id) DO UPDATE SET
                         pilot = excluded.pilot, business = excluded.business, street = excluded.street, city = excluded.city, state = excluded.state, zip = excluded.zip, phone = excluded.phone, email = excluded.email""",
@@ -458,9 +709,11 @@ def _update_table_applicator(c: sqlite3.Cursor, s: SeriesData):
     )
 
 
-def _update_table_aircraft(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_aircraft(batch: "_SaveBatch", s: SeriesData):
     i = s.info
-    c.execute(
+    batch.upsert(
+        s,
+        "aircraft",
         """INSERT INTO aircraft (series_id, regnum, make, model, wingspan, wingspan_units, winglets) VALUES (?, ?, ?, ?, ?, ?, ?)
                         ON CONFLICT(series_id) DO UPDATE SET
                         regnum = excluded.regnum, make = excluded.make, model = excluded.model, wingspan = excluded.wingspan, wingspan_units = excluded.wingspan_units, winglets = excluded.winglets""",
@@ -468,9 +721,11 @@ def _update_table_aircraft(c: sqlite3.Cursor, s: SeriesData):
     )
 
 
-def _update_table_spray_system(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_spray_system(batch: "_SaveBatch", s: SeriesData):
     i = s.info
-    c.execute(
+    batch.upsert(
+        s,
+        "spray_system",
         """INSERT INTO spray_system (series_id, swath, swath_units, rate, rate_units, pressure, pressure_units, boom_width, boom_width_units, boom_drop, boom_drop_units, nozzle_spacing, nozzle_spacing_units) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         ON CONFLICT(series_id) DO UPDATE SET
                         swath = excluded.swath, swath_units = excluded.swath_units, rate = excluded.rate, rate_units = excluded.rate_units, pressure = excluded.pressure, pressure_units = excluded.pressure_units,  boom_width = excluded.boom_width, boom_width_units = excluded.boom_width_units, boom_drop = excluded.boom_drop, boom_drop_units = excluded.boom_drop_units, nozzle_spacing = excluded.nozzle_spacing, nozzle_spacing_units = excluded.nozzle_spacing_units""",
@@ -492,35 +747,33 @@ def _update_table_spray_system(c: sqlite3.Cursor, s: SeriesData):
     )
 
 
-def _update_table_nozzles(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_nozzles(batch: "_SaveBatch", s: SeriesData):
     i = s.info
     n: Nozzle
     for n in i.nozzles:
-        c.execute(
+        batch.upsert(
+            s,
+            ("nozzles", n.id),
             """INSERT INTO nozzles (id, series_id, type, size, deflection, quantity) VALUES (?, ?, ?, ?, ?, ?)
                   ON CONFLICT(id) DO UPDATE SET
                   type = excluded.type, size = excluded.size, deflection = excluded.deflection, quantity = excluded.quantity""",
             (n.id, s.id, n.type, n.size, n.deflection, n.quantity),
         )
-    # Loop through nozzles on db, delete any not in series object
-    current_ids = [n.id for n in i.nozzles]
-    if len(current_ids) == 0:
-        c.execute("""DELETE FROM nozzles""")
-    else:
-        in_query = "("
-        for i, id_ in enumerate(current_ids):
-            if i == 0:
-                in_query += f"'{id_}'"
-            else:
-                in_query += f", '{id_}'"
-        in_query += ")"
-        c.execute(f"DELETE FROM nozzles WHERE id NOT IN {in_query}")
+    # Nozzle sets saved before but since removed
+    removed = s.saved_nozzle_ids - {n.id for n in i.nozzles}
+    for id_ in removed:
+        batch.delete(
+            s, ("nozzles", id_), """DELETE FROM nozzles WHERE id = ?""", (id_,)
+        )
+    batch.on_commit(lambda: _set_saved_ids(s, "saved_nozzle_ids", i.nozzles))
 
 
-def _update_table_passes(c: sqlite3.Cursor, s: SeriesData):
+def _update_table_passes(batch: "_SaveBatch", s: SeriesData):
     p: Pass
     for p in s.passes:
-        c.execute(
+        batch.upsert(
+            p,
+            "passes",
             """INSERT INTO passes (id, series_id, pass_name, pass_number, ground_speed, ground_speed_units, spray_height, spray_height_units, pass_heading, wind_direction, wind_speed, wind_speed_units, temperature, temperature_units, humidity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(id) DO UPDATE SET
                     pass_name = excluded.pass_name, pass_number = excluded.pass_number, ground_speed = excluded.ground_speed, ground_speed_units = excluded.ground_speed_units, spray_height = excluded.spray_height, spray_height_units = excluded.spray_height_units, pass_heading = excluded.pass_heading, wind_direction = excluded.wind_direction, wind_speed = excluded.wind_speed, wind_speed_units = excluded.wind_speed_units, temperature = excluded.temperature, temperature_units = excluded.temperature_units, humidity = excluded.humidity""",
@@ -542,29 +795,26 @@ def _update_table_passes(c: sqlite3.Cursor, s: SeriesData):
                 p.humidity,
             ),
         )
-        _update_table_pass_string(c, p)
-        _update_table_pass_spray_card(c, p)
-        _update_table_spray_cards(c, p)
-    # Loop through passes on db, delete any not in series object
-    current_ids = [p.id for p in s.passes]
-    if len(current_ids) == 0:
-        c.execute("""DELETE FROM passes WHERE pass_id = ?""", (p.id,))
-    else:
-        in_query = "("
-        for i, id in enumerate(current_ids):
-            if i == 0:
-                in_query += f"'{id}'"
-            else:
-                in_query += f", '{id}'"
-        in_query += ")"
-        c.execute(f"DELETE FROM passes WHERE id NOT IN {in_query}")
-        c.execute(f"DELETE FROM pass_string WHERE pass_id NOT IN {in_query}")
-        c.execute(f"DELETE FROM spray_cards WHERE pass_id NOT IN {in_query}")
-
-
-def _update_table_pass_string(c: sqlite3.Cursor, p: Pass):
+        _update_table_pass_string(batch, p)
+        _update_table_pass_spray_card(batch, p)
+        _update_table_spray_cards(batch, p)
+    # Passes saved before but since removed, with everything belonging to them
+    removed = s.saved_pass_ids - {p.id for p in s.passes}
+    for sql in _DELETE_PASS:
+        batch.delete(None, None, sql, *[(id_,) for id_ in removed])
+    batch.on_commit(lambda: _set_saved_ids(s, "saved_pass_ids", s.passes))
+    # Cards saved before but since removed from every pass
+    current = {card.id for p in s.passes for card in p.cards.card_list}
+    removed = set().union(*[p.cards.saved_card_ids for p in s.passes]) - current
+    for sql in _DELETE_CARD:
+        batch.delete(None, None, sql, *[(id_,) for id_ in removed])
+
+
+def _update_table_pass_string(batch: "_SaveBatch", p: Pass):
     ps: PassDataString = p.string
-    c.execute(
+    batch.upsert(
+        ps,
+        "pass_string",
         """INSERT INTO pass_string (pass_id, dye, excitation_wav, emission_wav, integration_time_ms, boxcar_width, trim_left, trim_right, trim_vertical, rebase, center, center_method, smooth, smooth_window, smooth_order, data_loc_units, excitation_data, emission_data, include_in_composite) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(pass_id) DO UPDATE SET
                     dye = excluded.dye, excitation_wav = excluded.excitation_wav, emission_wav = excluded.emission_wav, integration_time_ms = excluded.integration_time_ms, boxcar_width = excluded.boxcar_width, trim_left = excluded.trim_left, trim_right = excluded.trim_right, trim_vertical = excluded.trim_vertical, rebase = excluded.rebase, center = excluded.center, center_method = excluded.center_method, smooth = excluded.smooth, smooth_window = excluded.smooth_window, smooth_order = excluded.smooth_order, data_loc_units = excluded.data_loc_units, excitation_data = excluded.excitation_data, emission_data = excluded.emission_data, include_in_composite = excluded.include_in_composite""",
@@ -585,16 +835,46 @@ def _update_table_pass_string(c: sqlite3.Cursor, p: Pass):
             ps.smooth_window,
             ps.smooth_order,
             ps.data_loc_units,
-            ps.data_ex.to_json(),
-            ps.data.to_json(),
+            ps.data_ex.to_blob(),
+            ps.data.to_blob(),
             ps.include_in_composite,
         ),
     )
+    _update_table_pass_string_spectra(batch, p)
+
+
+def _update_table_pass_string_spectra(batch: "_SaveBatch", p: Pass):
+    spectra: StringSpectra = p.string.spectra
+    if spectra is None:
+        if "pass_string_spectra" in p.string.saved_rows:
+            batch.delete(
+                p.string,
+                "pass_string_spectra",
+                """DELETE FROM pass_string_spectra WHERE pass_id = ?""",
+                (p.id,),
+            )
+        return
+    batch.upsert(
+        p.string,
+        "pass_string_spectra",
+        """INSERT INTO pass_string_spectra (pass_id, stride, wavelengths, loc, spectra) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(pass_id) DO UPDATE SET
+                    stride = excluded.stride, wavelengths = excluded.wavelengths, loc = excluded.loc, spectra = excluded.spectra""",
+        (
+            p.id,
+            spectra.stride,
+            spectra.wavelengths.tobytes(),
+            spectra.loc.tobytes(),
+            spectra.to_blob(),
+        ),
+    )
 
 
-def _update_table_pass_spray_card(c: sqlite3.Cursor, p: Pass):
+def _update_table_pass_spray_card(batch: "_SaveBatch", p: Pass):
     pcd: PassDataCard = p.cards
-    c.execute(
+    batch.upsert(
+        pcd,
+        "pass_spray_card",
         """INSERT INTO pass_spray_card (pass_id, center, center_method, include_in_composite) VALUES (?, ?, ?, ?)
                     ON CONFLICT(pass_id) DO UPDATE SET
                     center = excluded.center, center_method = excluded.center_method, include_in_composite = excluded.include_in_composite""",
@@ -607,10 +887,12 @@ def _update_table_pass_spray_card(c: sqlite3.Cursor, p: Pass):
     )
 
 
-def _update_table_spray_cards(c: sqlite3.Cursor, p: Pass):
+def _update_table_spray_cards(batch: "_SaveBatch", p: Pass):
     card: SprayCard
     for card in p.cards.card_list:
-        c.execute(
+        batch.upsert(
+            card,
+            "spray_cards",
             """INSERT INTO spray_cards (id, pass_id, name, location, location_units, include_in_composite, threshold_type, threshold_method_grayscale, threshold_grayscale, threshold_color_hue_min, threshold_color_hue_max, threshold_color_hue_pass, threshold_color_saturation_min, threshold_color_saturation_max, threshold_color_saturation_pass, threshold_color_brightness_min, threshold_color_brightness_max, threshold_color_brightness_pass, watershed, min_stain_area_px, stain_approximation_method, dpi, spread_method, spread_factor_a, spread_factor_b, spread_factor_c, has_image) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         ON CONFLICT(id) DO UPDATE SET
                         name = excluded.name, location = excluded.location, location_units = excluded.location_units, include_in_composite = excluded.include_in_composite, threshold_type = excluded.threshold_type, threshold_method_grayscale = excluded.threshold_method_grayscale, threshold_grayscale = excluded.threshold_grayscale, threshold_color_hue_min = excluded.threshold_color_hue_min, threshold_color_hue_max = excluded.threshold_color_hue_max, threshold_color_hue_pass = excluded.threshold_color_hue_pass, threshold_color_saturation_min = excluded.threshold_color_saturation_min, threshold_color_saturation_max = excluded.threshold_color_saturation_max, threshold_color_saturation_pass = excluded.threshold_color_saturation_pass, threshold_color_brightness_min = excluded.threshold_color_brightness_min, threshold_color_brightness_max = excluded.threshold_color_brightness_max, threshold_color_brightness_pass = excluded.threshold_color_brightness_pass, watershed = excluded.watershed, min_stain_area_px = excluded.min_stain_area_px, stain_approximation_method = excluded.stain_approximation_method, dpi = excluded.dpi, spread_method = excluded.spread_method, spread_factor_a = excluded.spread_factor_a, spread_factor_B = excluded.spread_factor_b, spread_factor_c = excluded.spread_factor_c, has_image = excluded.has_image""",
@@ -644,32 +926,86 @@ def _update_table_spray_cards(c: sqlite3.Cursor, p: Pass):
                 card.has_image,
             ),
         )
-    # Loop through cards on db, delete any not in pass object
-    current_ids = [sc.id for sc in p.cards.card_list]
-    if len(current_ids) == 0:
-        c.execute("""DELETE FROM spray_cards WHERE pass_id = ?""", (p.id,))
-    else:
-        in_query = "("
-        for i, id in enumerate(current_ids):
-            if i == 0:
-                in_query += f"'{id}'"
-            else:
-                in_query += f", '{id}'"
-        in_query += ")"
-        c.execute(
-            f'DELETE FROM spray_cards WHERE pass_id = "{p.id}" AND id NOT IN {in_query}'
+    batch.on_commit(
+        lambda: _set_saved_ids(p.cards, "saved_card_ids", p.cards.card_list)
+    )
+    _update_table_spray_card_results(batch, p.cards.card_list)
+
+
+def _update_table_spray_card_results(batch: "_SaveBatch", cards: list[SprayCard]):
+    card: SprayCard
+    for card in cards:
+        # Only persist results which reflect the current image and process options
+        if not card.has_image or not card.current:
+            continue
+        if (process_key := card.get_process_key()) is None:
+            continue
+        stains = card.stains
+        flags = (
+            stains.is_too_small.astype(np.uint8)
+            | (stains.is_edge.astype(np.uint8) << 1)
+            | (stains.is_include.astype(np.uint8) << 2)
+        )
+        batch.upsert(
+            card,
+            "spray_card_results",
+            """INSERT INTO spray_card_results (spray_card_id, image_hash, process_key, area_px2, threshold_grayscale_calculated, stain_index, stain_area, stain_flags) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(spray_card_id) DO UPDATE SET
+                        image_hash = excluded.image_hash, process_key = excluded.process_key, area_px2 = excluded.area_px2, threshold_grayscale_calculated = excluded.threshold_grayscale_calculated, stain_index = excluded.stain_index, stain_area = excluded.stain_area, stain_flags = excluded.stain_flags""",
+            (
+                card.id,
+                card.image_hash,
+                process_key,
+                float(card.area_px2),
+                float(card.threshold_grayscale_calculated),
+                stains.index.astype(np.int32).tobytes(),
+                stains.area.astype(np.float64).tobytes(),
+                flags.tobytes(),
+            ),
         )
 
 
-def save_image_to_db(file: str, spray_card_id: str, image) -> bool:
+def save_image_to_db(
+    file: str, spray_card_id: str, image, image_hash: str = None
+) -> bool:
     success = False
-    with sqlite3.connect(file) as conn:
+    # Kept with the image, so loading never needs to read the image to hash it
+    if image_hash is None:
+        image_hash = hash_image(image)
+    with db_connections.connection(file) as conn:
         # Get a cursor object
         c = conn.cursor()
         # Request update of card record in table spray_cards by sprayCard.id
         c.execute(
-            """UPDATE spray_cards SET image = ? WHERE id = ?""",
-            (sqlite3.Binary(image), spray_card_id),
+            """UPDATE spray_cards SET image = ?, image_hash = ? WHERE id = ?""",
+            (sqlite3.Binary(image), image_hash, spray_card_id),
+        )
+        success = True
+    # Any decoded copy of the previous image is now stale
+    image_cache.invalidate(file, spray_card_id)
+    return success
+
+
+def save_images_to_db(file: str, cards: list[SprayCard], images: list) -> bool:
+    # Images and any current processing results of many cards in one transaction
+    success = False
+    with db_connections.connection(file) as conn:
+        c = conn.cursor()
+        for card, image in zip(cards, images):
+            card.image_hash = hash_image(image)
+        c.executemany(
+            """UPDATE spray_cards SET image = ?, image_hash = ? WHERE id = ?""",
+            [
+                (sqlite3.Binary(image), card.image_hash, card.id)
+                for card, image in zip(cards, images)
+            ],
         )
+        batch = _SaveBatch(c)
+        _update_table_spray_card_results(batch, cards)
+        batch.execute()
         success = True
+    batch.mark_saved()
+    db_connections.checkpoint(file)
+    for card in cards:
+        image_cache.invalidate(file, card.id)
     return success
@@ -0,0 +1,167 @@
+import atexit
+import os
+import pathlib
+import sqlite3
+import threading
+
+
+class DBConnections:
+    """
+    Process-wide sqlite3 connections to AccuPatt databases, kept open between
+    loads and saves rather than reopened for each. Each file has one
+    read/write connection, owned by the thread which first opens it, and each
+    other thread or worker process gets its own read-only connection. Files
+    are put in WAL mode while open, so those readers never block on the
+    writer, and returned to their own journal mode on closing so no sidecar
+    files are left beside them. Files which can't be written stay as they are.
+    Closing a file closes its readers on every thread too, close_all drops
+    every connection but keep's, and other readers reopen on their next use.
+    """
+
+    # Page cache per connection in KiB, and most of a file to memory map
+    CACHE_SIZE_KIB = 32 * 1024
+    MMAP_SIZE = 256 * 1024 * 1024
+
+    def __init__(self):
+        self._writers: dict[str, sqlite3.Connection] = {}
+        # Thread each read/write connection was created on, and may only be used on
+        self._owners: dict[str, int] = {}
+        # Journal mode each file had before being put in WAL mode
+        self._journal_modes: dict[str, str] = {}
+        # Read-only connections of every thread, by file
+        self._readers: dict[str, set[sqlite3.Connection]] = {}
+        self._pid = os.getpid()
+        # Bumped on closing, so readers of other threads know to reopen
+        self._generation = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def connection(self, file: str) -> sqlite3.Connection:
+        # Read/write connection of file, created on first use
+        path = os.path.abspath(file)
+        with self._lock:
+            self._check_pid()
+            conn = self._writers.get(path)
+            if conn is None:
+                conn = sqlite3.connect(path)
+                self._enable_wal(path, conn)
+                self._configure(conn)
+                self._writers[path] = conn
+                self._owners[path] = threading.get_ident()
+            return conn
+
+    def reader(self, file: str) -> sqlite3.Connection:
+        # Read-only connection of file for the calling thread
+        path = os.path.abspath(file)
+        with self._lock:
+            self._check_pid()
+            if self._owners.get(path) == threading.get_ident():
+                return self._writers[path]
+            readers = getattr(self._local, "readers", None)
+            stale = []
+            if readers is None or self._local.generation != self._generation:
+                if readers is not None:
+                    stale = list(readers.values())
+                    for p, c in readers.items():
+                        self._readers.get(p, set()).discard(c)
+                readers = self._local.readers = {}
+                self._local.generation = self._generation
+        # This thread's readers from before a close, safe to close here
+        for conn in stale:
+            conn.close()
+        conn = readers.get(path)
+        if conn is None:
+            uri = f"{pathlib.Path(path).as_uri()}?mode=ro"
+            # Closed from whichever thread closes its file
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._configure(conn)
+            readers[path] = conn
+            with self._lock:
+                self._readers.setdefault(path, set()).add(conn)
+        return conn
+
+    def checkpoint(self, file: str):
+        # Copy committed pages into the db itself, so the file alone is complete
+        path = os.path.abspath(file)
+        with self._lock:
+            conn = self._writers.get(path)
+        if conn is not None:
+            conn.execute("""PRAGMA wal_checkpoint(PASSIVE)""")
+
+    def close(self, file: str):
+        # Read/write connection of file, before the file is replaced or removed
+        path = os.path.abspath(file)
+        with self._lock:
+            conn = self._writers.pop(path, None)
+            self._owners.pop(path, None)
+            mode = self._journal_modes.pop(path, None)
+            readers = self._readers.pop(path, set())
+            self._generation += 1
+        for reader in readers:
+            reader.close()
+        if conn is not None:
+            self._close_writer(conn, mode)
+
+    def close_all(self, keep: str = None):
+        # All but keep's read/write connection, readers of other threads lazily
+        keep = None if keep is None or keep == "" else os.path.abspath(keep)
+        with self._lock:
+            closing = [
+                (c, self._journal_modes.get(p))
+                for p, c in self._writers.items()
+                if p != keep
+            ]
+            self._writers = {p: c for p, c in self._writers.items() if p == keep}
+            self._owners = {p: t for p, t in self._owners.items() if p == keep}
+            self._journal_modes = {
+                p: m for p, m in self._journal_modes.items() if p == keep
+            }
+            readers = [c for p, cs in self._readers.items() if p != keep for c in cs]
+            self._readers = {p: cs for p, cs in self._readers.items() if p == keep}
+            self._generation += 1
+        for reader in readers:
+            reader.close()
+        for conn, mode in closing:
+            self._close_writer(conn, mode)
+
+    def _enable_wal(self, path: str, conn: sqlite3.Connection):
+        try:
+            mode = conn.execute("""PRAGMA journal_mode""").fetchone()[0]
+            if mode.lower() != "wal":
+                conn.execute("""PRAGMA journal_mode=WAL""")
+                self._journal_modes[path] = mode
+        except sqlite3.Error:
+            # Read-only file or media, keep its journal mode
+            pass
+
+    def _close_writer(self, conn: sqlite3.Connection, mode: str):
+        # Checkpoints and removes the -wal and -shm files, unless another
+        # process still has the file open, in which case it stays in WAL mode
+        if mode is not None:
+            try:
+                conn.execute(f"""PRAGMA journal_mode={mode}""")
+            except sqlite3.Error:
+                pass
+        conn.close()
+
+    def _configure(self, conn: sqlite3.Connection):
+        conn.execute(f"""PRAGMA cache_size=-{self.CACHE_SIZE_KIB}""")
+        conn.execute(f"""PRAGMA mmap_size={self.MMAP_SIZE}""")
+        # Safe from corruption in WAL mode, only a power loss may undo a commit
+        conn.execute("""PRAGMA synchronous=NORMAL""")
+
+    def _check_pid(self):
+        # Connections inherited by a forked worker are its parent's, never use them
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._writers = {}
+            self._owners = {}
+            self._journal_modes = {}
+            self._readers = {}
+            self._local = threading.local()
+            self._generation = 0
+
+
+# Shared by all loads and saves in this process
+db_connections = DBConnections()
+atexit.register(db_connections.close_all)
@@ -8,6 +8,7 @@ import pandas as pd
 from accupatt.helpers.dBBridge import load_from_db, save_to_db
 from accupatt.models.appInfo import AppInfo, Nozzle
 from accupatt.models.passData import Pass
+from accupatt.models.pattern import Pattern
 from accupatt.models.seriesData import SeriesData
 from accupatt.models.sprayCard import SprayCard
 from openpyxl_image_loader import SheetImageLoader
@@ -234,8 +235,8 @@ def load_from_accupatt_1_file(file, s: SeriesData):
         p.string.trim_v = 0 if np.isnan(trims.at[2, p.name]) else trims.at[2, p.name]
         # TODO Integration Time is params row 0, must convert to int
         # TODO Ex/Em Wavs are params rows 1, 2 respective, must strip string
-        p.string.data = df_em[["loc", p.name]]
-        p.string.data_ex = df_ex[["loc", p.name]]
+        p.string.data = Pattern.from_dataframe(df_em[["loc", p.name]])
+        p.string.data_ex = Pattern.from_dataframe(df_ex[["loc", p.name]])
 
     # Create SprayCards if applicable
     if "Card Data" in df_map.keys():
@@ -387,8 +388,8 @@ def load_from_usda_file(file: str, s: SeriesData):
             line_item = line.strip().split("\t")
             d_ex.append({"loc": float(line_item[1]), p.name: float(line_item[3])})
             d_em.append({"loc": float(line_item[1]), p.name: float(line_item[2])})
-        p.string.data_ex = pd.DataFrame(d_ex)
-        p.string.data = pd.DataFrame(d_em)
+        p.string.data_ex = Pattern.from_dataframe(pd.DataFrame(d_ex))
+        p.string.data = Pattern.from_dataframe(pd.DataFrame(d_em))
 
         s.passes.append(p)
 
@@ -502,7 +503,7 @@ def load_from_wrk_file(file, s: SeriesData):
         d = []
         for i in range(38, 38 + _num_data_points):
             d.append({"loc": (i - 38) * _spacing, p.name: float(lines[i] or 0)})
-        p.string.data = pd.DataFrame(d)
+        p.string.data = Pattern.from_dataframe(pd.DataFrame(d))
 
         # Turn off smoothing
         p.string.smooth = False
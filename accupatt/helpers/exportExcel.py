@@ -252,7 +252,14 @@ def export_all_to_excel(series: SeriesData, saveFile: str):
     # Join all df's
     df = pd.DataFrame()
     for i, p in enumerate(s.passes):
-        df = pd.concat([df, p.string.data_ex, p.string.data], axis=1)
+        df = pd.concat(
+            [
+                df,
+                p.string.data_ex.to_dataframe(p.name),
+                p.string.data.to_dataframe(p.name),
+            ],
+            axis=1,
+        )
     for j, p in enumerate(s.passes):
         ws.cell(1, 1 + (j * 4), p.name)
         ws.merge_cells(
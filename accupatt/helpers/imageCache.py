@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+
+import accupatt.config as cfg
+import numpy as np
+
+
+class ImageCache:
+    """
+    Process-wide LRU cache of decoded card images, bounded by a byte budget.
+    Entries are keyed by (filepath, card id, blob version); the version is bumped
+    by invalidate whenever a new image blob is written for a card.
+    Cached images are read-only, callers must copy before drawing on them.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        # Budget read from config on first use if not supplied
+        self._max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._images: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._versions: dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is None:
+            self._max_bytes = cfg.get_image_cache_mb() * 1024 * 1024
+        return self._max_bytes
+
+    def get(self, filepath: str, card_id: str) -> np.ndarray:
+        with self._lock:
+            key = self._key(filepath, card_id)
+            img = self._images.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return img
+
+    def put(self, filepath: str, card_id: str, img: np.ndarray) -> np.ndarray:
+        img.setflags(write=False)
+        # Images larger than the whole budget are never cached
+        if img.nbytes > self.max_bytes:
+            return img
+        with self._lock:
+            key = self._key(filepath, card_id)
+            if key in self._images:
+                self.nbytes -= self._images.pop(key).nbytes
+            self._images[key] = img
+            self.nbytes += img.nbytes
+            self._evict(self.max_bytes)
+        return img
+
+    def invalidate(self, filepath: str, card_id: str):
+        with self._lock:
+            old_key = self._key(filepath, card_id)
+            self._versions[(filepath, card_id)] = old_key[2] + 1
+            if old_key in self._images:
+                self.nbytes -= self._images.pop(old_key).nbytes
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self.nbytes = 0
+
+    def set_max_bytes(self, max_bytes: int):
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._evict(max_bytes)
+
+    def _key(self, filepath: str, card_id: str) -> tuple:
+        return (filepath, card_id, self._versions.get((filepath, card_id), 0))
+
+    def _evict(self, max_bytes: int):
+        # Drop least recently used images until within budget
+        while self.nbytes > max_bytes and self._images:
+            _, img = self._images.popitem(last=False)
+            self.nbytes -= img.nbytes
+
+
+# Shared by all SprayCards in this process
+image_cache = ImageCache()
@@ -0,0 +1,91 @@
+import numpy as np
+
+import accupatt.config as cfg
+
+
+class PatternAveragingEngine:
+    """
+    Averages patterns sampled at differing locations. Every pattern is
+    resampled onto one uniform location grid spanning all of them, then the
+    average is taken across patterns in a single reduction.
+    """
+
+    # Upper bound on automatic grid size, guards against near-duplicate locations
+    MAX_AUTO_GRID_POINTS = 20000
+
+    def __init__(self, grid_points: int = None):
+        # Number of grid points, 0 to match the finest pattern spacing
+        self.grid_points = (
+            grid_points if grid_points is not None else cfg.get_average_grid_points()
+        )
+
+    def grid(self, locs: list[np.ndarray]) -> np.ndarray:
+        lo = min(loc[0] for loc in locs)
+        hi = max(loc[-1] for loc in locs)
+        if hi <= lo:
+            return np.array([lo], dtype=float)
+        if self.grid_points > 1:
+            return np.linspace(lo, hi, self.grid_points)
+        # Finest median spacing among the patterns
+        spacings = [np.median(np.diff(loc)) for loc in locs if loc.size > 1]
+        spacings = [s for s in spacings if s > 0]
+        if len(spacings) == 0:
+            return np.array([lo, hi], dtype=float)
+        n = int(np.ceil((hi - lo) / min(spacings))) + 1
+        return np.linspace(lo, hi, min(n, self.MAX_AUTO_GRID_POINTS))
+
+    def resample(
+        self,
+        grid: np.ndarray,
+        locs: list[np.ndarray],
+        values: list[np.ndarray],
+        outside: float = 0.0,
+    ) -> np.ndarray:
+        # One row per pattern, linearly interpolated inside its own extent
+        out = np.full((len(locs), grid.size), outside, dtype=float)
+        for row, loc, y in zip(out, locs, values):
+            lo = np.searchsorted(grid, loc[0], side="left")
+            hi = np.searchsorted(grid, loc[-1], side="right")
+            row[lo:hi] = np.interp(grid[lo:hi], loc, y)
+        return out
+
+    def average(
+        self,
+        locs: list[np.ndarray],
+        columns: dict[str, list[np.ndarray]],
+        outside: dict[str, float] = None,
+    ) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+        """
+        Averages each named column across patterns, returning the grid and the
+        averaged columns. Locations must be ascending. A column's value outside
+        a pattern's extent defaults to 0, and NaN excludes that pattern from the
+        average there instead.
+        """
+        outside = outside if outside is not None else {}
+        grid = self.grid(locs)
+        averages = {}
+        for name, values in columns.items():
+            resampled = self.resample(grid, locs, values, outside.get(name, 0.0))
+            valid = ~np.isnan(resampled)
+            count = valid.sum(axis=0)
+            total = np.where(valid, resampled, 0.0).sum(axis=0)
+            averages[name] = np.divide(
+                total, count, out=np.full(grid.size, np.nan), where=count > 0
+            )
+        return grid, averages
+
+    @staticmethod
+    def fill_missing(loc: np.ndarray, y: np.ndarray) -> np.ndarray:
+        # Linearly interpolate, and extrapolate, over NaN values
+        y = np.asarray(y, dtype=float)
+        valid = ~np.isnan(y)
+        if valid.all() or valid.sum() < 2:
+            return y
+        x, v = loc[valid], y[valid]
+        filled = np.interp(loc, x, v)
+        # Extend the end segments beyond the outermost valid values
+        for end, nxt, beyond in ((0, 1, loc < x[0]), (-1, -2, loc > x[-1])):
+            dx = x[nxt] - x[end]
+            slope = (v[nxt] - v[end]) / dx if dx != 0 else 0.0
+            filled[beyond] = v[end] + slope * (loc[beyond] - x[end])
+        return filled
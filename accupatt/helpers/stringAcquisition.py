@@ -0,0 +1,318 @@
+import threading
+import time
+
+import numpy as np
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+
+class SampleRingBuffer:
+    """
+    Preallocated ring buffer of string samples: a monotonic timestamp (s) with
+    the emission and excitation intensities of each spectrum. Written by the
+    acquisition thread and read from the GUI thread, under a lock. Once full,
+    the oldest samples are overwritten.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.t = np.empty(self.capacity, dtype=np.float64)
+        self.em = np.empty(self.capacity, dtype=np.float64)
+        self.ex = np.empty(self.capacity, dtype=np.float64)
+        # Total samples written, including any overwritten
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, t: float, em: float, ex: float):
+        with self._lock:
+            i = self.count % self.capacity
+            self.t[i] = t
+            self.em[i] = em
+            self.ex[i] = ex
+            self.count += 1
+
+    def extend(self, t: np.ndarray, em: np.ndarray, ex: np.ndarray):
+        # Batch append, of which only the last capacity samples can be held
+        with self._lock:
+            skip = max(0, len(t) - self.capacity)
+            idx = (self.count + np.arange(skip, len(t))) % self.capacity
+            self.t[idx] = t[skip:]
+            self.em[idx] = em[skip:]
+            self.ex[idx] = ex[skip:]
+            self.count += len(t)
+
+    def snapshot(
+        self, max_points: int = None
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Copies of held samples oldest first, strided down to max_points if given
+        with self._lock:
+            n = len(self)
+            step = 1 if max_points is None or n <= max_points else -(-n // max_points)
+            if self.count <= self.capacity:
+                idx = slice(0, n, step)
+            else:
+                idx = (np.arange(0, n, step) + self.count) % self.capacity
+            return self.t[idx].copy(), self.em[idx].copy(), self.ex[idx].copy()
+
+
+class SpectrumRecorder:
+    """
+    Keeps full spectra of a pass as float32 rows of a block preallocated within
+    max_bytes. The stride, every how many frames one is kept, is chosen up
+    front from expected_frames so the whole pass fits. Frames arriving beyond
+    the block's capacity are counted as dropped. Written by the acquisition
+    thread, read only once acquisition has finished.
+    """
+
+    def __init__(self, n_pixels: int, expected_frames: int, max_bytes: int):
+        max_frames = max(1, max_bytes // (4 * n_pixels))
+        expected_frames = max(1, expected_frames)
+        self.stride = -(-expected_frames // max_frames)
+        self.capacity = -(-expected_frames // self.stride)
+        self.t = np.empty(self.capacity, dtype=np.float64)
+        self.spectra = np.empty((self.capacity, n_pixels), dtype=np.float32)
+        # Frames offered and kept, and timestamp (s) of the last offered
+        self.offered = 0
+        self.count = 0
+        self.dropped = 0
+        self.t_last = 0.0
+
+    def offer(self, t: float, spectrum: np.ndarray):
+        if self.offered % self.stride == 0:
+            if self.count < self.capacity:
+                self.t[self.count] = t
+                self.spectra[self.count] = spectrum
+                self.count += 1
+            else:
+                self.dropped += 1
+        self.offered += 1
+        self.t_last = t
+
+    def offer_many(self, t: np.ndarray, spectra: np.ndarray):
+        if len(t) == 0:
+            return
+        keep = np.flatnonzero((self.offered + np.arange(len(t))) % self.stride == 0)
+        n = min(keep.size, self.capacity - self.count)
+        self.t[self.count : self.count + n] = t[keep[:n]]
+        self.spectra[self.count : self.count + n] = spectra[keep[:n]]
+        self.count += n
+        self.dropped += keep.size - n
+        self.offered += len(t)
+        self.t_last = t[-1]
+
+    @property
+    def capture_rate_hz(self) -> float:
+        return self.offered / self.t_last if self.t_last > 0 else 0.0
+
+    def snapshot(self) -> tuple[np.ndarray, np.ndarray]:
+        # Copies of the timestamps and spectra kept
+        return self.t[: self.count].copy(), self.spectra[: self.count].copy()
+
+
+class StringAcquisitionWorker(QObject):
+    """
+    Reads spectra back to back on its own thread until duration_s has elapsed,
+    reducing each to its emission and excitation intensities in a
+    SampleRingBuffer. Samples are timestamped with a monotonic clock, so their
+    timing does not depend on the GUI event loop. Decimated copies for plotting
+    are emitted at a fixed rate, independent of the sample rate. Full spectra
+    are also offered to a SpectrumRecorder if one is given.
+    Move to a QThread and connect its started signal to run.
+    """
+
+    # Timestamps (s) and emission intensities, decimated
+    plotUpdate = pyqtSignal(np.ndarray, np.ndarray)
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(
+        self,
+        spec,
+        pix_em: tuple[int, int],
+        pix_ex: int,
+        duration_s: float,
+        buffer: SampleRingBuffer,
+        ui_rate_hz: float = 30.0,
+        max_plot_points: int = 2000,
+        spectra: SpectrumRecorder = None,
+    ):
+        super().__init__()
+        self.spec = spec
+        self.pix_em = pix_em
+        self.pix_ex = pix_ex
+        self.duration_s = duration_s
+        self.buffer = buffer
+        self.ui_period_s = 1.0 / ui_rate_hz
+        self.max_plot_points = max_plot_points
+        self.spectra = spectra
+        self._stop = threading.Event()
+
+    def stop(self):
+        # Safe to call from any thread, takes effect after the current read
+        self._stop.set()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            self._acquire()
+        except Exception as e:
+            self.failed.emit(str(e))
+        self._emit_plot_update()
+        self.finished.emit()
+
+    def _acquire(self):
+        # One spectrum buffer, filled in place by the device on each read
+        intensities = np.empty(self.spec.get_formatted_spectrum_length())
+        t0 = time.perf_counter()
+        self._next_plot = t0
+        while not self._stop.is_set():
+            before = time.perf_counter()
+            self.spec.get_formatted_spectrum_numpy(intensities)
+            after = time.perf_counter()
+            # Stamp the sample at the middle of its read
+            t = (before + after) / 2 - t0
+            if t > self.duration_s:
+                break
+            self.buffer.append(
+                t,
+                intensities[self.pix_em[0] : self.pix_em[1] + 1].mean(),
+                intensities[self.pix_ex],
+            )
+            if self.spectra is not None:
+                self.spectra.offer(t, intensities)
+            self._maybe_emit_plot_update(after)
+
+    def _maybe_emit_plot_update(self, now: float):
+        if now >= self._next_plot:
+            self._emit_plot_update()
+            self._next_plot = max(self._next_plot + self.ui_period_s, now)
+
+    def _emit_plot_update(self):
+        t, em, _ = self.buffer.snapshot(max_points=self.max_plot_points)
+        self.plotUpdate.emit(t, em)
+
+
+class BufferedStringAcquisitionWorker(StringAcquisitionWorker):
+    """
+    StringAcquisitionWorker streaming back-to-back scans from the device's own
+    data buffer, read out in batches. Samples are timed by the device's scan
+    timestamps, so throughput is set by the spectrometer's scan rate rather
+    than by Python polling. Buffered spectra are raw counts, so the electric
+    dark and nonlinearity corrections the device applies to the formatted
+    spectra of polling are applied here instead, keeping both modes on the
+    same intensity scale. Falls back to polling if the device does not
+    support data buffering.
+    """
+
+    # Most spectra returned per get_raw_spectrum_with_metadata call
+    BATCH_SIZE = 15
+    # Device timestamps are in microseconds
+    TIMESTAMP_PER_S = 1e6
+    # Most back-to-back scans requested at once, longer passes are re-armed
+    MAX_BACKTOBACK_SCANS = 65535
+
+    def __init__(self, *args, integration_time_s: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.integration_time_s = integration_time_s
+
+    def _acquire(self):
+        adv = self.spec.Advanced
+        scans = min(
+            int(np.ceil(self.duration_s / self.integration_time_s)) + 1,
+            self.MAX_BACKTOBACK_SCANS,
+        )
+        try:
+            adv.set_data_buffer_enable(True)
+            capacity = min(
+                max(scans, adv.get_data_buffer_capacity_minimum()),
+                adv.get_data_buffer_capacity_maximum(),
+            )
+            adv.set_data_buffer_capacity(capacity)
+            adv.set_number_of_backtoback_scans(scans)
+            adv.clear_data_buffer()
+        except Exception:
+            # Device doesn't support buffering, poll instead with it left off
+            self._disable_buffer()
+            return super()._acquire()
+        dark_pixels, nl_coeffs = self._corrections()
+        # Batch buffers, filled in place by the device on each read
+        spectra = np.empty((self.BATCH_SIZE, self.spec.get_formatted_spectrum_length()))
+        stamps = np.empty(self.BATCH_SIZE, dtype=np.int64)
+        t0 = time.perf_counter()
+        self._next_plot = t0
+        ts_first = None
+        try:
+            adv.acquire_spectra_to_buffer()
+            remaining = scans
+            # Guard against a device which stops delivering scans
+            while not self._stop.is_set() and (
+                time.perf_counter() - t0 < self.duration_s + 2.0
+            ):
+                n = adv.get_raw_spectrum_with_metadata_numpy(spectra, stamps)
+                if n == 0:
+                    time.sleep(self.integration_time_s / 2)
+                    continue
+                intensities = spectra[:n]
+                if dark_pixels is not None:
+                    intensities -= intensities[:, dark_pixels].mean(
+                        axis=1, keepdims=True
+                    )
+                if nl_coeffs is not None:
+                    intensities /= np.polynomial.polynomial.polyval(
+                        intensities, nl_coeffs
+                    )
+                ts = stamps[:n] / self.TIMESTAMP_PER_S
+                if ts_first is None:
+                    ts_first = ts[0]
+                # The first scan is centered one half integration after start
+                t = ts - ts_first + self.integration_time_s / 2
+                keep = t <= self.duration_s
+                self.buffer.extend(
+                    t[keep],
+                    intensities[keep, self.pix_em[0] : self.pix_em[1] + 1].mean(axis=1),
+                    intensities[keep, self.pix_ex],
+                )
+                if self.spectra is not None:
+                    self.spectra.offer_many(t[keep], intensities[keep])
+                if not keep.all():
+                    break
+                self._maybe_emit_plot_update(time.perf_counter())
+                # Scans requested are spent before the pass ends, request more
+                remaining -= n
+                if remaining <= 0:
+                    adv.acquire_spectra_to_buffer()
+                    remaining = scans
+        finally:
+            try:
+                adv.abort_acquisition()
+            except Exception:
+                pass
+            self._disable_buffer()
+
+    def _corrections(self) -> tuple[np.ndarray, np.ndarray]:
+        # Electric dark pixels and nonlinearity coefficients, where the device
+        # would apply them to formatted spectra, otherwise None
+        dark_pixels = nl_coeffs = None
+        try:
+            if self.spec.get_electric_dark_correction_usage():
+                dark_pixels = np.array(self.spec.get_electric_dark_pixel_indices())
+                if dark_pixels.size == 0:
+                    dark_pixels = None
+        except Exception:
+            pass
+        try:
+            if self.spec.get_nonlinearity_correction_usage():
+                # Stored lowest order first, as polyval expects
+                nl_coeffs = np.array(self.spec.Advanced.get_nonlinearity_coeffs())
+        except Exception:
+            pass
+        return dark_pixels, nl_coeffs
+
+    def _disable_buffer(self):
+        # Never let this mask an error already being raised
+        try:
+            self.spec.Advanced.set_data_buffer_enable(False)
+        except Exception:
+            pass
@@ -0,0 +1,133 @@
+import numpy as np
+
+from accupatt.models.pattern import Pattern
+
+
+class SwathCVEngine:
+    """
+    Simulates overlapped deposition for many swath widths at once. The average
+    pattern is sampled on a uniform grid centered on 0, so with swath widths
+    snapped to that grid every adjascent pass is a whole-index shift of the
+    same samples and the CV for each width is a masked reduction over the
+    center swath. Racetrack and back & forth share the unmirrored passes.
+    """
+
+    # Bound on (swath widths x window points) evaluated together, kept cache sized
+    MAX_CHUNK_ELEMENTS = 1 << 16
+
+    def __init__(
+        self, average: Pattern, adjascent_passes: int, resolution: float = 0.1
+    ):
+        self.adjascent_passes = adjascent_passes
+        self.resolution = resolution
+        if average.empty:
+            self._samples = np.zeros(1)
+            self._offset = 0
+            return
+        # Grid indices covering the average, padded by one zero sample each end
+        k_lo = int(np.floor(average.loc[0] / resolution)) - 1
+        k_hi = int(np.ceil(average.loc[-1] / resolution)) + 1
+        x = np.arange(k_lo, k_hi + 1) * resolution
+        self._samples = np.interp(x, average.loc, average.y, left=0, right=0)
+        self._offset = -k_lo
+
+    def _take(self, k: np.ndarray) -> np.ndarray:
+        # Samples at grid indices k, indices beyond the pattern land on a 0 pad
+        return self._samples.take(k + self._offset, mode="clip")
+
+    def sweep(self, swath_widths) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns (swath widths as snapped to the grid, racetrack CV %,
+        back & forth CV %) for each requested swath width.
+        """
+        widths, rt, bf = self.sweep_pass_counts(swath_widths, [self.adjascent_passes])
+        return widths, rt[0], bf[0]
+
+    def sweep_pass_counts(
+        self, swath_widths, pass_counts: list[int]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        As sweep, for each number of adjascent passes in pass_counts. CV arrays
+        have one row per pass count. Passes are accumulated once, with the CV
+        taken as each requested count is reached.
+        """
+        steps = np.rint(np.asarray(swath_widths, dtype=float) / self.resolution)
+        steps = np.maximum(steps, 1).astype(np.int64)
+        rt = np.empty((len(pass_counts), steps.size))
+        bf = np.empty((len(pass_counts), steps.size))
+        if steps.size == 0 or len(pass_counts) == 0:
+            return steps * self.resolution, rt, bf
+        # Chunk similar widths together so each chunk's window stays small
+        order = np.argsort(steps, kind="stable")
+        windows = 2 * (steps[order] // 2) + 1
+        start = 0
+        while start < order.size:
+            # Most rows whose widest window still fits the element budget
+            sizes = np.arange(1, order.size - start + 1) * windows[start:]
+            rows = max(1, np.searchsorted(sizes, self.MAX_CHUNK_ELEMENTS, "right"))
+            idx = order[start : start + rows]
+            half = steps[idx[-1]] // 2
+            i = np.arange(-half, half + 1)
+            self._sweep_chunk(steps[idx, None], i, pass_counts, rt, bf, idx)
+            start += idx.size
+        return steps * self.resolution, rt, bf
+
+    def _sweep_chunk(self, m, i, pass_counts, rt, bf, idx):
+        inside = np.abs(i) <= m // 2
+        dep_rt = np.broadcast_to(self._take(i), (m.shape[0], i.size)).copy()
+        dep_bf = dep_rt.copy()
+        for j in range(0, max(pass_counts) + 1):
+            if j > 0:
+                # Left and right passes, the odd ones flipped for back & forth
+                unmirrored = self._take(i + j * m) + self._take(i - j * m)
+                dep_rt += unmirrored
+                if j % 2 != 0:
+                    dep_bf += self._take(-i - j * m) + self._take(j * m - i)
+                else:
+                    dep_bf += unmirrored
+            for row, count in enumerate(pass_counts):
+                if count == j:
+                    rt[row, idx] = self._masked_cv(dep_rt, inside)
+                    bf[row, idx] = self._masked_cv(dep_bf, inside)
+
+    def simulate(
+        self, swath_width: float, mirrored: bool = False
+    ) -> tuple[np.ndarray, list[np.ndarray], np.ndarray, float]:
+        """
+        Returns (grid locations spanning every pass, deposition of each pass in
+        order center, left 1, right 1, left 2, etc., mask of the center swath,
+        CV % over it) for one swath width, as snapped to the grid. The CV is
+        the one sweep gives for the same width.
+        """
+        m = max(int(np.rint(swath_width / self.resolution)), 1)
+        reach = max(self._offset, self._samples.size - 1 - self._offset)
+        reach += self.adjascent_passes * m
+        i = np.arange(-reach, reach + 1)
+        y_fills = [self._take(i)]
+        for j in range(1, self.adjascent_passes + 1):
+            if mirrored and j % 2 != 0:
+                y_fills += [self._take(-i - j * m), self._take(j * m - i)]
+            else:
+                y_fills += [self._take(i + j * m), self._take(i - j * m)]
+        inside = np.abs(i) <= m // 2
+        cv = self._masked_cv(np.sum(y_fills, axis=0)[None, :], inside[None, :])
+        return i * self.resolution, y_fills, inside, float(cv[0])
+
+    def sweep_range(
+        self, start: float, stop: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.sweep(self.swath_widths(start, stop))
+
+    def swath_widths(self, start: float, stop: float) -> np.ndarray:
+        # Every grid-resolution swath width from start to stop inclusive
+        n = int(np.floor((stop - start) / self.resolution + 0.5)) + 1
+        return start + np.arange(max(n, 0)) * self.resolution
+
+    @staticmethod
+    def _masked_cv(dep: np.ndarray, inside: np.ndarray) -> np.ndarray:
+        # Population CV (as scipy's variation) of each row's masked points, in %
+        n = inside.sum(axis=1)
+        mean = np.where(inside, dep, 0.0).sum(axis=1) / n
+        var = np.where(inside, (dep - mean[:, None]) ** 2, 0.0).sum(axis=1) / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(var) / mean * 100
@@ -34,6 +34,8 @@ class Pass:
         self.string = PassDataString(name=self.name)
         # Card Data
         self.cards = PassDataCard(name=self.name)
+        # Database rows as last loaded or saved, keyed by table
+        self.saved_rows: dict = {}
 
     """
     GET methods return a tuple of (value, units, value_string, value_units_string)
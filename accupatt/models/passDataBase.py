@@ -5,6 +5,8 @@ class PassDataBase(OptBase):
     def __init__(self, name):
         super().__init__(name=name)
         self.include_in_composite = True
+        # Database rows as last loaded or saved, keyed by table
+        self.saved_rows: dict = {}
 
     def has_data() -> bool:
         # MUST override in inherited class
@@ -5,6 +5,7 @@ from scipy import interpolate
 import accupatt.config as cfg
 from accupatt.helpers.atomizationModel import AtomizationModel
 from accupatt.models.passDataBase import PassDataBase
+from accupatt.models.pattern import Pattern
 
 from accupatt.models.sprayCard import SprayCard
 from accupatt.widgets.mplwidget import MplWidget
@@ -15,9 +16,15 @@ class PassDataCard(PassDataBase):
         super().__init__(name=name)
         # Card Data
         self.card_list: list[SprayCard] = []
+        # Ids of the cards as last loaded or saved
+        self.saved_card_ids: set[str] = set()
+        # Last centered pattern, see _centerify
+        self._center_pattern: Pattern = None
+        self._center_fingerprint: bytes = None
 
-    def _get_data_from_card_list(self):
-        scs: list[SprayCard] = sorted(
+    def _get_located_cards(self) -> list[SprayCard]:
+        # Included cards with images and locations, in order of location
+        return sorted(
             [
                 card
                 for card in self.card_list
@@ -28,6 +35,9 @@ class PassDataCard(PassDataBase):
             ],
             key=lambda x: x.location,
         )
+
+    def _get_data_from_card_list(self):
+        scs = self._get_located_cards()
         return pd.DataFrame(
             {
                 "name": [card.name for card in scs],
@@ -59,44 +69,19 @@ class PassDataCard(PassDataBase):
     def _centerify(self, d: pd.DataFrame, center, centerMethod):
         if not center or d.empty:
             return
-        if centerMethod == cfg.CENTER_METHOD_CENTROID:
-            # Use Centroid
-            c = self._calcCentroid(d)
-        elif centerMethod == cfg.CENTER_METHOD_COD:
-            # Use Center of Distribution
-            c = self._calcCenterOfDistribution(d)
-        else:
-            # No centering applied
-            c = 0
-        # Subtract the calculated center from the x vals
-        d["loc"] = d["loc"].sub(c)
-
-    def _calcCentroid(self, d: pd.DataFrame):
-        y_index = (
-            "dep"
-            if cfg.get_card_plot_y_axis() == cfg.CARD_PLOT_Y_AXIS_DEPOSITION
-            else "cov"
-        )
-        return (d[y_index] * d["loc"]).sum() / d[y_index].sum()
-
-    def _calcCenterOfDistribution(self, d: pd.DataFrame):
         y_index = (
             "dep"
             if cfg.get_card_plot_y_axis() == cfg.CARD_PLOT_Y_AXIS_DEPOSITION
             else "cov"
         )
-        sumNumerator = 0.0
-        sumDenominator = 0.0
-        for i in range(0, len(d.index) - 1, 1):
-            D = d.at[i, y_index]
-            Dn = d.at[i + 1, y_index]
-            X = d.at[i, "loc"]
-            Xn = d.at[i + 1, "loc"]
-            # Calc Numerator and add to summation
-            sumNumerator += D * (Xn + X) + (Dn - D) * (2 * Xn + X) / 3
-            sumDenominator += Dn + D
-        # Calc and return CoD
-        return sumNumerator / sumDenominator
+        # Reuse the last pattern, and its cached centers, while data is unchanged
+        pattern = Pattern(d["loc"], d[y_index])
+        fingerprint = pattern.fingerprint()
+        if fingerprint != self._center_fingerprint:
+            self._center_pattern = pattern
+            self._center_fingerprint = fingerprint
+        # Subtract the calculated center from the x vals
+        d["loc"] = d["loc"].sub(self._center_pattern.center(centerMethod))
 
     """
     Plot Methods
@@ -1,12 +1,13 @@
 import accupatt.config as cfg
 import numpy as np
-import pandas as pd
 import scipy.signal as sig
 from pyqtgraph import InfiniteLine, PlotWidget, setConfigOptions
 from pyqtgraph.functions import mkPen
 from accupatt.models.dye import Dye
 
 from accupatt.models.passDataBase import PassDataBase
+from accupatt.models.pattern import Pattern, PatternStageCache
+from accupatt.models.stringSpectra import StringSpectra
 
 
 class PassDataString(PassDataBase):
@@ -14,10 +15,14 @@ class PassDataString(PassDataBase):
         super().__init__(name=name)
         # String Data Collection
         self.dye = Dye.fromConfig()
+        # Memoized modification stages, shared with trim previews
+        self.stage_cache = PatternStageCache()
+        self._data_version = 0
         # String Data
-        self.data_ex = pd.DataFrame()  # Holds Excitation Data
-        self.data = pd.DataFrame()  # Holds original Data
-        self.data_mod = pd.DataFrame()  # Holds data with all requested modifications
+        self.data_ex = Pattern()  # Holds Excitation Data
+        self.data = Pattern()  # Holds original Data
+        self.data_mod = Pattern()  # Holds data with all requested modifications
+        self.spectra: StringSpectra = None  # Holds full spectra, if captured
         self.data_loc_units = cfg.get_unit_data_location()
         # String Data Mod Options
         self.trim_l = 0
@@ -25,123 +30,179 @@ class PassDataString(PassDataBase):
         self.trim_v = 0.0
         self.rebase = False
 
+    @property
+    def data(self) -> Pattern:
+        return self._data
+
+    @data.setter
+    def data(self, value: Pattern):
+        # New raw data invalidates every cached stage
+        self._data = value
+        self._data_version += 1
+        self.stage_cache.clear()
+
     def modifyData(self, loc_units=None):
         if self.data.empty:
             return
-        self.data_mod = self.data.copy()
+        # Reuses cached stages whose parameters and inputs are unchanged
+        d, key = self._trimmedData(loc_units)
+        # Center it
+        d, key = self.stage_cache.run(
+            "centerify",
+            (self.center_method,),
+            d,
+            key,
+            lambda p: self.centerify(p, self.center, self.center_method),
+            enabled=self.center,
+        )
+        # Smooth it
+        d, key = self._smoothedData(d, key)
+        # Copy out, as series modifications act on data_mod in place
+        self.data_mod.assign(d)
+        self.data_mod.loc_units = (
+            self.data_loc_units if loc_units is None else loc_units
+        )
+
+    def _trimmedData(self, loc_units=None) -> tuple[Pattern, tuple]:
+        c = self.stage_cache
+        d, key = self.data, (self._data_version,)
         # Assert location units if provided
-        self.reLoc(self.data_mod, loc_units)
+        d, key = c.run(
+            "reLoc",
+            (self.data_loc_units, loc_units),
+            d,
+            key,
+            lambda p: self.reLoc(p, loc_units),
+            enabled=loc_units is not None and loc_units != self.data_loc_units,
+        )
         # Trim it horizontally
-        self.trimLR(self.data_mod, self.trim_l, self.trim_r)
+        d, key = c.run(
+            "trimLR",
+            (self.trim_l, self.trim_r),
+            d,
+            key,
+            lambda p: self.trimLR(p, self.trim_l, self.trim_r),
+        )
         # Rebase it
-        self.rebaseIt(self.data_mod, self.rebase, self.trim_l, self.trim_r)
+        d, key = c.run(
+            "rebaseIt",
+            (self.trim_l, self.trim_r),
+            d,
+            key,
+            lambda p: self.rebaseIt(p, self.rebase, self.trim_l, self.trim_r),
+            enabled=self.rebase,
+        )
         # Trim it vertically
-        self.trimV(self.data_mod, self.trim_v)
-        # Center it
-        self.centerify(self.data_mod, self.center, self.center_method)
-        # Smooth it
-        self.smoothIt(self.data_mod, self.smooth, self.smooth_window, self.smooth_order)
+        return c.run(
+            "trimV", (self.trim_v,), d, key, lambda p: self.trimV(p, self.trim_v)
+        )
 
-    def reLoc(self, d: pd.DataFrame, loc_units: str = None):
+    def _smoothedData(self, d: Pattern, key: tuple) -> tuple[Pattern, tuple]:
+        return self.stage_cache.run(
+            "smoothIt",
+            (self.smooth_window, self.smooth_order),
+            d,
+            key,
+            lambda p: self.smoothIt(
+                p, self.smooth, self.smooth_window, self.smooth_order
+            ),
+            enabled=self.smooth,
+        )
+
+    def reLoc(self, d: Pattern, loc_units: str = None):
         if loc_units is None or loc_units == self.data_loc_units:
             return
         if loc_units == cfg.UNIT_FT:
             # Convert loc from M to FT
-            d["loc"] = d["loc"].multiply(cfg.FT_PER_M)
+            np.multiply(d.loc, cfg.FT_PER_M, out=d.loc)
         else:
             # Convert loc from FT to M
-            d["loc"] = d["loc"].divide(cfg.FT_PER_M)
+            np.divide(d.loc, cfg.FT_PER_M, out=d.loc)
+        d.loc_units = loc_units
 
-    def trimLR(self, d: pd.DataFrame, trimL: int = 0, trimR: int = 0):
+    def trimLR(self, d: Pattern, trimL: int = 0, trimR: int = 0):
         # Left trimmed points set to -1
-        d.loc[d.index[:trimL], self.name] = -1
+        d.y[:trimL] = -1
         # Right trimmed points set to -1
-        d.loc[d.index[(-1 - trimR) :], self.name] = -1
+        d.y[(-1 - trimR) :] = -1
         # Find new min inside untrimmed area
         min_ = self.findMin(d, trimL, trimR)
         # subtract min from all points
-        d[self.name] = d[self.name].sub(min_)
+        np.subtract(d.y, min_, out=d.y)
         # clip all negative values (from trimmed areas) to 0
-        d[self.name] = d[self.name].clip(lower=0)
+        np.maximum(d.y, 0, out=d.y)
 
-    def findMin(self, d: pd.DataFrame, trimL: int = 0, trimR: int = 0) -> float:
-        return d[trimL : -1 - trimR][self.name].min()
+    def findMin(self, d: Pattern, trimL: int = 0, trimR: int = 0) -> float:
+        y = d.y[trimL : -1 - trimR]
+        return y.min() if y.size > 0 else np.nan
 
     def rebaseIt(
-        self, d: pd.DataFrame, isRebase: bool = False, trimL: int = 0, trimR: int = 0
+        self, d: Pattern, isRebase: bool = False, trimL: int = 0, trimR: int = 0
     ):
         if not isRebase:
             return
         # Calculate trimmed/untrimmed distances
-        untrimmed_dist = d.at[d.index[-1], "loc"] - d.at[d.index[0], "loc"]
-        trimmed_dist = d.at[d.index[-1 - trimR], "loc"] - d.at[d.index[trimL], "loc"]
+        untrimmed_dist = d.loc[-1] - d.loc[0]
+        trimmed_dist = d.loc[-1 - trimR] - d.loc[trimL]
         # Drop data points outside trimmed area
-        d.drop(d[d.index < trimL].index, inplace=True)
-        d.drop(d[d.index > d.index[-1 - trimR]].index, inplace=True)
+        d.crop(trimL, len(d) - trimR)
         # Rebase locations according to ratio of untrimmed:trimmed length
-        d["loc"] = d["loc"].multiply(untrimmed_dist / trimmed_dist)
+        np.multiply(d.loc, untrimmed_dist / trimmed_dist, out=d.loc)
 
-    def trimV(self, d: pd.DataFrame, trimV: float = 0.0):
+    def trimV(self, d: Pattern, trimV: float = 0.0):
         # Trim Vertical
-        d[self.name] = d[self.name].sub(trimV)
+        np.subtract(d.y, trimV, out=d.y)
         # clip all negative values (from trimmed areas) to 0
-        d[self.name] = d[self.name].clip(lower=0)
+        np.maximum(d.y, 0, out=d.y)
 
-    def centerify(self, d: pd.DataFrame, center, centerMethod):
+    def centerify(self, d: Pattern, center, centerMethod):
         if not center:
             return
-        if centerMethod == cfg.CENTER_METHOD_CENTROID:
-            # Use Centroid
-            c = self._calcCentroid(d)
-        elif centerMethod == cfg.CENTER_METHOD_COD:
-            # Use Center of Distribution
-            c = self._calcCenterOfDistribution(d)
-        else:
-            # No centering applied
-            c = 0
         # Subtract the calculated center from the x vals
-        d["loc"] = d["loc"].sub(c)
+        np.subtract(d.loc, d.center(centerMethod), out=d.loc)
+        d.modified()
 
-    def _calcCentroid(self, d: pd.DataFrame):
-        return (d[self.name] * d["loc"]).sum() / d[self.name].sum()
-
-    def _calcCenterOfDistribution(self, d: pd.DataFrame):
-        sumNumerator = 0.0
-        sumDenominator = 0.0
-        for i in range(0, len(d.index) - 1, 1):
-            D = d.at[i, self.name]
-            Dn = d.at[i + 1, self.name]
-            X = d.at[i, "loc"]
-            Xn = d.at[i + 1, "loc"]
-            # Calc Numerator and add to summation
-            sumNumerator += D * (Xn + X) + (Dn - D) * (2 * Xn + X) / 3
-            sumDenominator += Dn + D
-        # Calc and return CoD
-        return sumNumerator / sumDenominator
-
-    def smoothIt(self, d: pd.DataFrame, isSmooth: bool, window: float, order: int):
+    def smoothIt(self, d: Pattern, isSmooth: bool, window: float, order: int):
         if not isSmooth:
             return
         # Calculate the integer smoothing window
         _window = int(
             np.ceil(
-                np.abs(d["loc"].abs().idxmin() - d["loc"].sub(window).abs().idxmin())
+                np.abs(np.argmin(np.abs(d.loc)) - np.argmin(np.abs(d.loc - window)))
             )
         )
         # Round it up to the next odd integer if needed
         _window = _window + 1 if _window % 2 == 0 else _window
         # Smooth y vals
-        d[self.name] = sig.savgol_filter(d[self.name], _window, order)
+        d.y[:] = sig.savgol_filter(d.y, _window, order)
         # Clip y vals below 0
-        d[self.name] = d[self.name].clip(lower=0)
+        np.maximum(d.y, 0, out=d.y)
 
-    def setData(self, x_data, y_data, y_ex_data):
-        self.data = pd.DataFrame(
-            data=list(zip(x_data, y_data)), columns=["loc", self.name]
-        )
-        self.data_ex = pd.DataFrame(
-            data=list(zip(x_data, y_ex_data)), columns=["loc", self.name]
-        )
+    def setData(self, x_data, y_data, y_ex_data, spectra: StringSpectra = None):
+        self.data = Pattern(loc=x_data, y=y_data)
+        self.data_ex = Pattern(loc=x_data, y=y_ex_data)
+        self.spectra = spectra
+
+    def reextract(self, dye: Dye = None):
+        # Rebuild data and data_ex from the full spectra, for dye's bands if given
+        if self.spectra is None:
+            return
+        if dye is not None:
+            self.dye = dye
+        # Trims are point counts, and spectra may hold fewer points (see stride)
+        # than data, so keep them at the same locations
+        trimmed = len(self.data) > self.trim_l + self.trim_r
+        if trimmed:
+            loc_l = self.data.loc[self.trim_l]
+            loc_r = self.data.loc[-1 - self.trim_r]
+        self.data, self.data_ex = self.spectra.extract(self.dye)
+        if trimmed and not self.data.empty:
+            self.trim_l = int(np.argmin(np.abs(self.data.loc - loc_l)))
+            self.trim_r = int(
+                len(self.data) - 1 - np.argmin(np.abs(self.data.loc - loc_r))
+            )
+        else:
+            self.trim_l = self.trim_r = 0
 
     """
     Methods to convert ui-set trim values to object values and set them to this object
@@ -149,13 +210,11 @@ class PassDataString(PassDataBase):
 
     def user_set_trim_left(self, value: float):
         # Takes a location domained trim value and converts it to an integer number of points
-        self.trim_l = int(self.data["loc"].sub(value).abs().idxmin())
+        self.trim_l = int(np.argmin(np.abs(self.data.loc - value)))
 
     def user_set_trim_right(self, value: float):
         # Takes a location domained trim value and converts it to an integer number of points
-        self.trim_r = int(
-            self.data["loc"].shape[0] - abs(self.data["loc"] - value).idxmin()
-        )
+        self.trim_r = int(len(self.data) - np.argmin(np.abs(self.data.loc - value)))
 
     def user_set_trim_floor(self, value: float):
         # Find minimum y value
@@ -177,9 +236,8 @@ class PassDataString(PassDataBase):
             return None, None, None
         # Calculate min y val for use with trim_vertical handle
         min_ = self.findMin(self.data, self.trim_l, self.trim_r)
-        # Numpy-ize dataframe columns for plotting
-        x = np.array(self.data["loc"].values, dtype=float)
-        y = np.array(self.data[self.name].values, dtype=float)
+        x = self.data.loc
+        y = self.data.y
         floor = min_ + self.trim_v
         # Plot raw data
         pyqtplotwidget.plotItem.plot(name="Raw", pen="w").setData(x, y)
@@ -222,16 +280,11 @@ class PassDataString(PassDataBase):
         # Only proceed if data exists
         if self.data.empty:
             return
-        # Copy dataframes for non-destructive use
-        data = self.data.copy()
-        data_mod = data.copy()
-        # Trim and Rebase
-        self.trimLR(data_mod, self.trim_l, self.trim_r)
-        self.rebaseIt(data_mod, self.rebase, self.trim_l, self.trim_r)
-        self.trimV(data_mod, self.trim_v)
-        # Numpy-ize dataframe columns for plotting
-        x = np.array(data_mod["loc"].values, dtype=float)
-        y = np.array(data_mod[self.name].values, dtype=float)
+        # Trim and Rebase, sharing cached stages with modifyData
+        data_mod, key = self._trimmedData()
+        # Copy out for plotting, as cached stages may later reuse the buffers
+        x = data_mod.loc.copy()
+        y = data_mod.y.copy()
         # Label modifier for if rebasing is utilized
         rebase_str = ", Rebased" if self.rebase else ""
         # Plot trimmed/rebased data
@@ -240,9 +293,8 @@ class PassDataString(PassDataBase):
         )
         # Only plot smoothed version if enabled for pass
         if self.smooth:
-            self.smoothIt(data_mod, self.smooth, self.smooth_window, self.smooth_order)
-            # Numpy-ize dataframe column for plotting
-            y_smooth = np.array(data_mod[self.name].values, dtype=float)
+            data_smooth, _ = self._smoothedData(data_mod, key)
+            y_smooth = data_smooth.y.copy()
             trim_mask = np.nonzero(y_smooth)[0]
             y_smooth[0 : trim_mask[0]] = np.nan
             y_smooth[trim_mask[-1] : -1] = np.nan
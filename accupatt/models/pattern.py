@@ -0,0 +1,195 @@
+import hashlib
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Callable
+
+import accupatt.config as cfg
+import numpy as np
+import pandas as pd
+
+
+class Pattern:
+    """
+    Array-backed deposition pattern: contiguous float64 location and intensity
+    arrays of equal length, plus the units of location if known. The arrays are
+    views into buffers which are reused when a pattern is reset from a source of
+    no greater length, so modification stages can work in place.
+    """
+
+    # Blob layout: header then the loc and y arrays, little-endian
+    BLOB_MAGIC = b"APAT"
+    BLOB_VERSION = 1
+    BLOB_COMPRESSED = 1
+    # Magic, version, item size (4 or 8), flags, point count
+    _BLOB_HEADER = struct.Struct("<4sBBBxI")
+
+    def __init__(self, loc=None, y=None, loc_units: str = None):
+        self._loc_buf = np.array(loc if loc is not None else [], dtype=np.float64)
+        self._y_buf = np.array(y if y is not None else [], dtype=np.float64)
+        self.loc = self._loc_buf
+        self.y = self._y_buf
+        self.loc_units = loc_units
+        # Bumped on modification, keys the cached centers
+        self.version = 0
+        self._centers: dict[str, tuple[int, float]] = {}
+
+    def __len__(self) -> int:
+        return self.loc.size
+
+    @property
+    def empty(self) -> bool:
+        return self.loc.size == 0
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, loc_units: str = None) -> "Pattern":
+        # Location column, with the first other column as intensity
+        if df.empty:
+            return cls(loc_units=loc_units)
+        y_col = [col for col in df.columns if col != "loc"][0]
+        return cls(df["loc"].to_numpy(), df[y_col].to_numpy(), loc_units=loc_units)
+
+    def to_dataframe(self, y_label: str = "y") -> pd.DataFrame:
+        # Pandas view for export, built on request
+        return pd.DataFrame({"loc": self.loc, y_label: self.y})
+
+    def to_blob(self, dtype=np.float64, compress: bool = False) -> bytes:
+        # Binary encoding for storage, float64 round-trips exactly
+        dt = np.dtype(dtype).newbyteorder("<")
+        payload = self.loc.astype(dt).tobytes() + self.y.astype(dt).tobytes()
+        flags = 0
+        if compress:
+            payload = zlib.compress(payload)
+            flags |= self.BLOB_COMPRESSED
+        header = self._BLOB_HEADER.pack(
+            self.BLOB_MAGIC, self.BLOB_VERSION, dt.itemsize, flags, len(self)
+        )
+        return header + payload
+
+    @classmethod
+    def from_blob(cls, blob: bytes, loc_units: str = None) -> "Pattern":
+        magic, version, itemsize, flags, n = cls._BLOB_HEADER.unpack_from(blob)
+        if magic != cls.BLOB_MAGIC or version > cls.BLOB_VERSION:
+            raise ValueError("Unrecognized pattern blob")
+        payload = memoryview(blob)[cls._BLOB_HEADER.size :]
+        if flags & cls.BLOB_COMPRESSED:
+            payload = zlib.decompress(payload)
+        # Views into the blob, copied once into the pattern's buffers
+        a = np.frombuffer(payload, dtype=f"<f{itemsize}", count=2 * n)
+        return cls(a[:n], a[n:], loc_units=loc_units)
+
+    def fingerprint(self) -> bytes:
+        # Content hash, equal for patterns holding equal data
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.ascontiguousarray(self.loc))
+        h.update(np.ascontiguousarray(self.y))
+        return h.digest()
+
+    def copy(self) -> "Pattern":
+        return Pattern(self.loc, self.y, loc_units=self.loc_units)
+
+    def assign(self, src: "Pattern"):
+        # Copy src into this pattern's buffers, only reallocating to grow them
+        n = len(src)
+        if self._loc_buf.size < n:
+            self._loc_buf = np.empty(n, dtype=np.float64)
+            self._y_buf = np.empty(n, dtype=np.float64)
+        self.loc = self._loc_buf[:n]
+        self.y = self._y_buf[:n]
+        np.copyto(self.loc, src.loc)
+        np.copyto(self.y, src.y)
+        self.loc_units = src.loc_units
+        self.modified()
+
+    def crop(self, start: int, stop: int):
+        # Restrict to points [start, stop) without copying
+        self.loc = self.loc[start:stop]
+        self.y = self.y[start:stop]
+        self.modified()
+
+    def modified(self):
+        # Must be called after changing loc or y in place
+        self.version += 1
+
+    def center(self, method: str) -> float:
+        # Cached until the pattern is next modified
+        cached = self._centers.get(method)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        if method == cfg.CENTER_METHOD_CENTROID:
+            c = centroid(self.loc, self.y)
+        elif method == cfg.CENTER_METHOD_COD:
+            c = center_of_distribution(self.loc, self.y)
+        else:
+            c = 0.0
+        self._centers[method] = (self.version, c)
+        return c
+
+
+def centroid(loc: np.ndarray, y: np.ndarray) -> float:
+    return float(np.dot(y, loc) / y.sum())
+
+
+def center_of_distribution(loc: np.ndarray, y: np.ndarray) -> float:
+    # Trapezoidal first moment over the total, per adjascent pair of points
+    D, Dn = y[:-1], y[1:]
+    X, Xn = loc[:-1], loc[1:]
+    numerator = D * (Xn + X) + (Dn - D) * (2 * Xn + X) / 3
+    return float(numerator.sum() / (Dn + D).sum())
+
+
+class PatternStageCache:
+    """
+    Memoizes each stage of a pattern modification chain. A stage's output is
+    keyed by its own parameters plus the key of its input, so changing one
+    stage's parameters reruns only that stage and those after it. A few
+    outputs are kept per stage, and evicted outputs lend their buffers to the
+    next miss. Outputs are shared, callers must copy before modifying them.
+    """
+
+    def __init__(self, entries_per_stage: int = 2):
+        self.entries_per_stage = entries_per_stage
+        self._entries: dict[str, OrderedDict[tuple, Pattern]] = {}
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    def run(
+        self,
+        stage: str,
+        params: tuple,
+        src: Pattern,
+        src_key: tuple,
+        func: Callable[[Pattern], None],
+        enabled: bool = True,
+    ) -> tuple[Pattern, tuple]:
+        # Disabled stages pass their input and its key straight through
+        if not enabled:
+            return src, src_key
+        key = (src_key, params)
+        entries = self._entries.setdefault(stage, OrderedDict())
+        if key in entries:
+            self.hits[stage] = self.hits.get(stage, 0) + 1
+            entries.move_to_end(key)
+            return entries[key], key
+        self.misses[stage] = self.misses.get(stage, 0) + 1
+        if len(entries) >= self.entries_per_stage:
+            out = entries.popitem(last=False)[1]
+        else:
+            out = Pattern()
+        out.assign(src)
+        func(out)
+        out.modified()
+        entries[key] = out
+        return out, key
+
+    def clear(self):
+        self._entries.clear()
+
+    def counts(self) -> dict[str, tuple[int, int]]:
+        # (hits, misses) per stage
+        stages = self.hits.keys() | self.misses.keys()
+        return {s: (self.hits.get(s, 0), self.misses.get(s, 0)) for s in stages}
+
+    def reset_counts(self):
+        self.hits.clear()
+        self.misses.clear()
@@ -19,6 +19,11 @@ class SeriesData:
         self.passes: list[Pass] = []
         self.string = SeriesDataString(self.passes)
         self.cards = SeriesDataCard(self.passes)
+        # Database rows as last loaded or saved, keyed by table, see dBBridge
+        self.saved_rows: dict = {}
+        self.saved_pass_ids: set[str] = set()
+        self.saved_nozzle_ids: set[int] = set()
+        self.saved_file: str = None
 
     """
     Common pass observable sharing
@@ -1,15 +1,58 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
 import numpy as np
-import pandas as pd
 import accupatt.config as cfg
+from accupatt.helpers.swathCVEngine import SwathCVEngine
 from accupatt.models.OptBase import OptBase
 from accupatt.models.passData import Pass
+from accupatt.models.pattern import Pattern
 from accupatt.widgets.mplwidget import MplWidget
-from scipy.stats import variation
 
 from PyQt6.QtWidgets import QTableWidget
 
 
+@dataclass
+class SwathCVCurve:
+    adjascent_passes: int
+    swath_widths: np.ndarray
+    rt_cv: np.ndarray
+    bf_cv: np.ndarray
+
+
+@dataclass
+class OptimalSwath:
+    target_cv: float
+    curves: list[SwathCVCurve] = field(default_factory=list)
+    # Widest swath meeting target_cv and the adjascent passes it was found with
+    rt_swath: float = np.nan
+    rt_adjascent_passes: int = None
+    bf_swath: float = np.nan
+    bf_adjascent_passes: int = None
+
+    @staticmethod
+    def widest_meeting(swath_widths: np.ndarray, cv: np.ndarray, target_cv) -> float:
+        # End of the run of widths meeting target CV, starting from the narrowest
+        failing = np.flatnonzero(~(cv <= target_cv))
+        end = failing[0] if failing.size > 0 else cv.size
+        return float(swath_widths[end - 1]) if end > 0 else np.nan
+
+
+@dataclass
+class SimulationResult:
+    xfill: np.ndarray
+    y_fills: list[np.ndarray]
+    labels: list[str]
+    y_fill_cum: np.ndarray
+    # Points of xfill inside the center swath, over which cv is taken
+    inside: np.ndarray
+    cv: int
+
+
 class SeriesDataBase(OptBase):
+    # Number of simulations and CV sweeps kept, oldest evicted first
+    SIMULATION_CACHE_SIZE = 16
+
     def __init__(self, passes: list[Pass]):
         super().__init__(name="series")
         self.passes = passes
@@ -18,17 +61,14 @@ class SeriesDataBase(OptBase):
         self.swath_adjusted = 0
         self.swath_units = cfg.get_unit_swath()
         self.simulated_adjascent_passes = cfg.get_simulated_adjascent_passes()
+        # Simulations keyed by average pattern content and simulation options
+        self._simulation_cache: OrderedDict[tuple, object] = OrderedDict()
 
-    def get_average_mod(self):
-        """
-        This should be overriden by inheriting class
-        """
-        return pd.DataFrame()
-
-    def get_average_y_label(self):
+    def get_average_mod(self) -> Pattern:
         """
         This should be overriden by inheriting class
         """
+        return Pattern()
 
     def set_swath_adjusted(self, string) -> bool:
         try:
@@ -45,16 +85,11 @@ class SeriesDataBase(OptBase):
         mirrorAdjascent=False,
     ):
         self._config_mpl_plotter(mplWidget)
-        average_df = self.get_average_mod()
-        average_y_label = self.get_average_y_label()
+        average = self.get_average_mod()
         _sw = self.swath_adjusted
-        if not average_df.empty and _sw >= 1:
-            xfill, y_fills, labels = self._get_fill_arrays(
-                swath_width=_sw,
-                average_df=average_df,
-                average_y_label=average_y_label,
-                mirrorAdjascent=mirrorAdjascent,
-            )
+        if not average.empty and _sw >= 1:
+            sim = self._simulate(average, _sw, mirrorAdjascent)
+            xfill, y_fills, labels = sim.xfill, sim.y_fills, sim.labels
             # Plot the fills cumulatively in order of generation: C, L1, R1, L2, R2, etc.
             y_fill_cum = np.zeros(xfill.size)
             for i, y_fill in enumerate(y_fills):
@@ -69,9 +104,7 @@ class SeriesDataBase(OptBase):
             # Plot a solid line on the cumulative deposition
             mplWidget.canvas.ax.plot(xfill, y_fill_cum, color="black")
             # Find average deposition inside swath width
-            avg = np.mean(
-                y_fill_cum[np.where(((xfill >= -_sw / 2) & (xfill <= _sw / 2)))]
-            )
+            avg = np.mean(y_fill_cum[sim.inside])
             mplWidget.canvas.ax.plot(
                 [-_sw / 2, _sw / 2],
                 [avg, avg],
@@ -94,83 +127,123 @@ class SeriesDataBase(OptBase):
         mplWidget.canvas.draw()
 
     def plotCVTable(self, tableWidget: QTableWidget):
-        average_df = self.get_average_mod()
-        average_y_label = self.get_average_y_label()
+        average = self.get_average_mod()
         # Simulate various Swath Widths, incrimenting by 2 units (-/+) from the center
-        for row in range(tableWidget.rowCount()):
+        swath_widths = [
+            self.swath_adjusted - (tableWidget.rowCount() - 1) + (2 * row)
+            for row in range(tableWidget.rowCount())
+        ]
+        # Calc RT and BF CV for every row at once
+        rt_cvs, bf_cvs = self._sweep(average, swath_widths)
+        for row, _sw in enumerate(swath_widths):
             item_sw = tableWidget.item(row, 0)
             item_rt = tableWidget.item(row, 1)
             item_bf = tableWidget.item(row, 2)
-            _sw = self.swath_adjusted - (tableWidget.rowCount() - 1) + (2 * row)
-            if average_df.empty or _sw < 1:
+            if average.empty or _sw < 1:
                 item_sw.setText("-")
                 item_rt.setText("-")
                 item_bf.setText("-")
                 continue
             # Print swath width
             item_sw.setText(f"{_sw} {self.swath_units}")
-            # Calc and Print RT CV
-            rt_cv = self._calcCV(average_df, average_y_label, _sw, False)
-            item_rt.setText(f"{rt_cv} %")
-            # Calc and Print BF CV
-            bf_cv = self._calcCV(average_df, average_y_label, _sw, True)
-            item_bf.setText(f"{bf_cv} %")
-
-    def _calcCV(
-        self,
-        average_df: pd.DataFrame,
-        average_y_label: str,
-        swath_width: float,
-        mirrorAdjascent=False,
-    ):
-        xfill, y_fills, _ = self._get_fill_arrays(
-            swath_width=swath_width,
-            average_df=average_df,
-            average_y_label=average_y_label,
-            mirrorAdjascent=mirrorAdjascent,
-        )
-        y_fill_cum = np.zeros(xfill.size)
-        for y_fill in y_fills:
-            y_fill_cum = y_fill_cum + y_fill
-        # Find average deposition inside swath width
-        y_fill_cum_center = y_fill_cum[
-            np.where(((xfill >= -swath_width / 2) & (xfill <= swath_width / 2)))
-        ]
-        return round(variation(y_fill_cum_center, axis=0) * 100)
+            # Print RT CV
+            item_rt.setText(f"{round(rt_cvs[row])} %")
+            # Print BF CV
+            item_bf.setText(f"{round(bf_cvs[row])} %")
 
-    def _get_fill_arrays(
+    def find_optimal_swath(
         self,
-        swath_width: float,
-        average_df: pd.DataFrame,
-        average_y_label: str,
-        mirrorAdjascent=False,
-    ) -> tuple[np.array, list[np.array], list[str]]:
+        target_cv: float,
+        adjascent_passes: list[int] = None,
+        swath_min: float = 1,
+        swath_max: float = None,
+        resolution: float = 0.1,
+    ) -> OptimalSwath:
         """
-        Returns xfill, yfills[], labels
+        Finds the widest swath meeting target_cv (%) for racetrack and back &
+        forth separately, over each adjascent pass count given (defaults to the
+        current count). Swath widths are searched from swath_min to swath_max
+        (defaults to the average pattern's width) at resolution. String series
+        must have had modifyPatterns called first.
         """
-        # Original average data
-        x0 = np.array(average_df["loc"], dtype=float)
-        y0 = np.array(average_df[average_y_label], dtype=float)
-        # create a shifted x array for each simulated pass with labels
-        x_arrays = [x0]
-        y_arrays = [y0]
+        pass_counts = sorted(
+            adjascent_passes
+            if adjascent_passes is not None
+            else [self.simulated_adjascent_passes]
+        )
+        result = OptimalSwath(target_cv=target_cv)
+        average = self.get_average_mod()
+        if average.empty or len(pass_counts) == 0:
+            return result
+        if swath_max is None:
+            swath_max = average.loc[-1] - average.loc[0]
+        engine = SwathCVEngine(average, pass_counts[-1], resolution)
+        widths, rt_cvs, bf_cvs = engine.sweep_pass_counts(
+            engine.swath_widths(swath_min, swath_max), pass_counts
+        )
+        for count, rt_cv, bf_cv in zip(pass_counts, rt_cvs, bf_cvs):
+            result.curves.append(SwathCVCurve(count, widths, rt_cv, bf_cv))
+            # Keep the fewest passes giving the widest swath
+            rt_swath = result.widest_meeting(widths, rt_cv, target_cv)
+            if rt_swath > np.nan_to_num(result.rt_swath, nan=-np.inf):
+                result.rt_swath, result.rt_adjascent_passes = rt_swath, count
+            bf_swath = result.widest_meeting(widths, bf_cv, target_cv)
+            if bf_swath > np.nan_to_num(result.bf_swath, nan=-np.inf):
+                result.bf_swath, result.bf_adjascent_passes = bf_swath, count
+        return result
+
+    def _cached_simulation(self, key: tuple, simulate):
+        # Keys lead with the average's fingerprint, so a changed average misses
+        if key in self._simulation_cache:
+            self._simulation_cache.move_to_end(key)
+            return self._simulation_cache[key]
+        result = simulate()
+        self._simulation_cache[key] = result
+        if len(self._simulation_cache) > self.SIMULATION_CACHE_SIZE:
+            self._simulation_cache.popitem(last=False)
+        return result
+
+    def _simulate(
+        self, average: Pattern, swath_width: float, mirrorAdjascent=False
+    ) -> SimulationResult:
+        key = (
+            average.fingerprint(),
+            swath_width,
+            self.simulated_adjascent_passes,
+            mirrorAdjascent,
+        )
+        return self._cached_simulation(
+            key, lambda: self._run_simulation(average, swath_width, mirrorAdjascent)
+        )
+
+    def _run_simulation(
+        self, average: Pattern, swath_width: float, mirrorAdjascent=False
+    ) -> SimulationResult:
+        # Same grid as _sweep, so the plotted CV is the one the CV table shows
+        engine = SwathCVEngine(average, self.simulated_adjascent_passes)
+        xfill, y_fills, inside, cv = engine.simulate(swath_width, mirrorAdjascent)
         labels = ["Center"]
         for i in range(1, self.simulated_adjascent_passes + 1):
-            x = (x0 * -1)[::-1] if mirrorAdjascent and i % 2 != 0 else x0
-            y = y0[::-1] if mirrorAdjascent and i % 2 != 0 else y0
-            x_arrays.append(x - (i * swath_width))
-            y_arrays.append(y)
-            labels.append(f"Left {i}")
-            x_arrays.append(x + (i * swath_width))
-            y_arrays.append(y)
-            labels.append(f"Right {i}")
-        # Unify the x-domain
-        xfill = np.sort(np.concatenate(x_arrays))
-        # Interpolate the original y-values to the new x-domain
-        y_fills = []
-        for x, y in zip(x_arrays, y_arrays):
-            y_fills.append(np.interp(xfill, x, y, left=0, right=0))
-        return (xfill, y_fills, labels)
+            labels += [f"Left {i}", f"Right {i}"]
+        y_fill_cum = np.sum(y_fills, axis=0)
+        return SimulationResult(xfill, y_fills, labels, y_fill_cum, inside, round(cv))
+
+    def _sweep(
+        self, average: Pattern, swath_widths: list[float]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # RT and BF CV for each swath width, from a cached batched sweep
+        key = (
+            average.fingerprint(),
+            tuple(swath_widths),
+            self.simulated_adjascent_passes,
+            "sweep",
+        )
+        return self._cached_simulation(
+            key,
+            lambda: SwathCVEngine(average, self.simulated_adjascent_passes).sweep(
+                swath_widths
+            )[1:],
+        )
 
     def _config_mpl_plotter(self, mplWidget: MplWidget):
         mplWidget.canvas.ax.clear()
@@ -1,8 +1,10 @@
 import numpy as np
 import pandas as pd
 import accupatt.config as cfg
+from accupatt.helpers.patternAveragingEngine import PatternAveragingEngine
 from accupatt.models.passDataCard import PassDataCard
 from accupatt.models.passData import Pass
+from accupatt.models.pattern import Pattern
 from accupatt.models.seriesDataBase import SeriesDataBase
 from accupatt.widgets.mplwidget import MplWidget
 
@@ -10,6 +12,9 @@ from accupatt.widgets.mplwidget import MplWidget
 class SeriesDataCard(SeriesDataBase):
     def __init__(self, passes: list[Pass]):
         super().__init__(passes)
+        # Centered average and the inputs it was built from
+        self._average_mod_key: tuple = None
+        self._average_mod: pd.DataFrame = pd.DataFrame()
 
     def _get_active_passes(self) -> list[Pass]:
         activePasses: list[Pass] = []
@@ -24,52 +29,30 @@ class SeriesDataCard(SeriesDataBase):
             if cfg.get_card_plot_y_axis() == cfg.CARD_PLOT_Y_AXIS_DEPOSITION
             else "cov"
         )
-        dd = pd.DataFrame()
-        lastPassName = ""
+        engine = PatternAveragingEngine()
+        locs, columns = [], {y_index: [], "dv01": [], "dv05": []}
         for p in self._get_active_passes():
             # Get Pass Dataframe
             d = p.cards.get_data_mod(loc_units=self.swath_units)
-            # Start or merge to the series dataframe
-            if dd.empty:
-                dd = d
-            else:
-                _d = d.set_index("loc")
-                _d.sort_values(by="loc", axis=0, inplace=True)
-                _d["dv01"].interpolate(
-                    method="slinear", fill_value="extrapolate", inplace=True
-                )
-                _d["dv05"].interpolate(
-                    method="slinear", fill_value="extrapolate", inplace=True
-                )
-
-                dd = dd.merge(
-                    _d,
-                    on="loc",
-                    how="outer",
-                    suffixes=[f"_{lastPassName}", f"_{p.name}"],
+            if d.empty:
+                continue
+            d = d.sort_values(by="loc")
+            loc = d["loc"].to_numpy(dtype=float)
+            locs.append(loc)
+            columns[y_index].append(d[y_index].to_numpy(dtype=float))
+            # Blank cards have no droplet sizes, fill them from their neighbors
+            for col in ["dv01", "dv05"]:
+                columns[col].append(
+                    engine.fill_missing(loc, d[col].to_numpy(dtype=float))
                 )
-            lastPassName = p.name
-        if dd.empty:
-            return dd
-        dd.set_index("loc", inplace=True)
-        dd.sort_values(by="loc", axis=0, inplace=True)
-        dd.interpolate(method="slinear", limit_area="inside", inplace=True)
-        for col in dd.columns:
-            if y_index in col:
-                dd[col].fillna(0, inplace=True)
-        dd[f"{y_index}_avg"] = dd.loc[:, dd.columns.str.contains(y_index)].mean(
-            axis="columns"
-        )
-        dd["dv01_avg"] = dd.loc[:, dd.columns.str.contains("dv01")].mean(axis="columns")
-        dd["dv05_avg"] = dd.loc[:, dd.columns.str.contains("dv05")].mean(axis="columns")
-        dd["loc_units"] = [self.swath_units for i in range(len(dd.index))]
-        avg = dd.loc[
-            :, [f"{y_index}_avg", "dv01_avg", "dv05_avg", "loc_units"]
-        ].reset_index()
-        avg.rename(
-            columns={f"{y_index}_avg": y_index, "dv01_avg": "dv01", "dv05_avg": "dv05"},
-            inplace=True,
+        if len(locs) == 0:
+            return pd.DataFrame()
+        # Deposition counts as 0 outside a pass, droplet sizes are left out
+        loc, avg = engine.average(
+            locs, columns, outside={"dv01": np.nan, "dv05": np.nan}
         )
+        avg = pd.DataFrame({"loc": loc, **avg})
+        avg["loc_units"] = self.swath_units
         return avg
 
     def plotOverlay(self, mplWidget: MplWidget):
@@ -112,14 +95,11 @@ class SeriesDataCard(SeriesDataBase):
         # Setup and clear the plotter
         self._config_mpl_plotter(mplWidget)
 
-        avg = self._get_average()
+        avg = self._get_average_mod_data()
         if avg.empty:
             mplWidget.canvas.draw()
             return
         avgPass = PassDataCard(name="average")
-        avgPass.center = self.center
-        avgPass.center_method = self.center_method
-        avg = avgPass.get_data_mod(loc_units=self.swath_units, data=avg)
         # Must re-add loc_units, as it is stripped during get_data_mod
         avg["loc_units"] = pd.Series(
             [self.swath_units for i in range(len(avg.index))], dtype=str
@@ -179,12 +159,62 @@ class SeriesDataCard(SeriesDataBase):
 
     # Overrides for superclass
 
-    def get_average_mod(self):
-        avg = self._get_average()
-        avgPass = PassDataCard(name="average")
-        avgPass.center = self.center
-        avgPass.center_method = self.center_method
-        return avgPass.get_data_mod(loc_units=self.swath_units, data=avg)
+    def _get_average_inputs_key(self) -> tuple:
+        # Everything the centered average is built from, including how each pass
+        # centers itself and which passes and cards are included
+        passes = tuple(
+            (
+                p.id,
+                p.name,
+                p.cards.include_in_composite,
+                p.cards.center,
+                p.cards.center_method,
+                tuple(
+                    (
+                        c.id,
+                        c.location,
+                        c.location_units,
+                        c.stats.get_percent_coverage(),
+                        c.stats.get_deposition(),
+                        c.stats.get_dv01(),
+                        c.stats.get_dv05(),
+                    )
+                    for c in p.cards._get_located_cards()
+                ),
+            )
+            for p in self._get_active_passes()
+        )
+        return (
+            passes,
+            self.swath_units,
+            self.center,
+            self.center_method,
+            cfg.get_card_plot_y_axis(),
+            cfg.get_average_grid_points(),
+        )
+
+    def _get_average_mod_data(self) -> pd.DataFrame:
+        # Rebuild the centered average only when its inputs have changed
+        key = self._get_average_inputs_key()
+        if key != self._average_mod_key:
+            avg = self._get_average()
+            if not avg.empty:
+                avgPass = PassDataCard(name="average")
+                avgPass.center = self.center
+                avgPass.center_method = self.center_method
+                avg = avgPass.get_data_mod(loc_units=self.swath_units, data=avg)
+            self._average_mod, self._average_mod_key = avg, key
+        return self._average_mod.copy()
+
+    def get_average_mod(self) -> Pattern:
+        avg = self._get_average_mod_data()
+        if avg.empty:
+            return Pattern()
+        return Pattern(
+            loc=avg["loc"],
+            y=avg[self.get_average_y_label()],
+            loc_units=self.swath_units,
+        )
 
     def get_average_y_label(self):
         return (
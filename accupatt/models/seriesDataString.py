@@ -1,8 +1,9 @@
 from matplotlib.pyplot import table
 import accupatt.config as cfg
 import numpy as np
-import pandas as pd
+from accupatt.helpers.patternAveragingEngine import PatternAveragingEngine
 from accupatt.models.passData import Pass
+from accupatt.models.pattern import Pattern
 from accupatt.models.seriesDataBase import SeriesDataBase
 from accupatt.widgets.mplwidget import MplWidget
 from PyQt6.QtWidgets import QTableWidget
@@ -30,8 +31,9 @@ class SeriesDataString(SeriesDataBase):
         self.average.string.smooth = self.smooth
         self.average.string.center = self.center
         self.average.string.center_method = self.center_method
-        # Generate and assign data to average Pass
+        # Generate and assign data to average Pass, located in swath units
         self.average.string.data = self._averagePattern(active_passes)
+        self.average.string.data_loc_units = self.swath_units
         self.average.string.smooth_window = self.smooth_window
         self.average.string.smooth_order = self.smooth_order
         # Apply avearge pattern modifications
@@ -42,29 +44,24 @@ class SeriesDataString(SeriesDataBase):
             return
         # Integrate each pattern to find area under the curve
         areas = [
-            np.trapz(y=p.string.data_mod[p.name], x=p.string.data_mod["loc"], axis=0)
-            for p in passes
+            np.trapz(y=p.string.data_mod.y, x=p.string.data_mod.loc) for p in passes
         ]
         # Find the pass with the largest integral
         area_max = max(areas)
         # Scale each pass to equalize areas to the maxx above
         for i, p in enumerate(passes):
-            p.string.data_mod[p.name] = p.string.data_mod[p.name].multiply(
-                area_max / areas[i]
+            np.multiply(
+                p.string.data_mod.y, area_max / areas[i], out=p.string.data_mod.y
             )
+            p.string.data_mod.modified()
 
-    def _averagePattern(self, passes: list[Pass]) -> pd.DataFrame:
-        # df placeholder
-        average_df = pd.DataFrame()
-        for p in passes:
-            s = p.string.data_mod.set_index("loc")[p.name]
-            average_df = average_df.join(s, how="outer", lsuffix="_l", rsuffix="_r")
-        # average_df.fillna(0)
-        # take the column-wise average and add that series to the placeholder
-        average_df.interpolate(limit_area="inside", inplace=True)
-        average_df["Average"] = average_df.fillna(0).mean(axis="columns")
-        average_df = average_df.reset_index()
-        return average_df
+    def _averagePattern(self, passes: list[Pass]) -> Pattern:
+        # Resample onto a common grid, passes count as 0 outside their extent
+        loc, avg = PatternAveragingEngine().average(
+            [p.string.data_mod.loc for p in passes],
+            {"y": [p.string.data_mod.y for p in passes]},
+        )
+        return Pattern(loc=loc, y=avg["y"])
 
     """
     Plotting Methods
@@ -77,9 +74,8 @@ class SeriesDataString(SeriesDataBase):
         active_passes = [p for p in self.passes if p.string.is_active()]
         # Iterate over plottable passes
         for p in active_passes:
-            # Numpy-ize dataframe columns to plot
-            x = np.array(p.string.data_mod["loc"], dtype=float)
-            y = np.array(p.string.data_mod[p.name], dtype=float)
+            x = p.string.data_mod.loc
+            y = p.string.data_mod.y
             # Plot non-zero data, and label the series with the pass name
             mplWidget.canvas.ax.plot(x[y != 0], y[y != 0], linewidth=1, label=p.name)
         # Add a legend if applicable
@@ -96,9 +92,8 @@ class SeriesDataString(SeriesDataBase):
         # Convenience accessor to average string modified data
         a = self.average.string.data_mod
         if not a.empty:
-            # Numpy-ize dataframe columns to plot
-            x = np.array(a["loc"], dtype=float)
-            y = np.array(a["Average"], dtype=float)
+            x = a.loc
+            y = a.y
             # Plot non-zero data, and label the series
             mplWidget.canvas.ax.plot(
                 x[y != 0], y[y != 0], color="black", linewidth=2, label="Average"
@@ -116,14 +111,13 @@ class SeriesDataString(SeriesDataBase):
                         _sw / 2,
                     ]
                     # Find average deposition inside swath width
-                    a_c = a[(a["loc"] >= -_sw / 2) & (a["loc"] <= _sw / 2)]
-                    a_c_mean = a_c["Average"].mean(axis="rows")
+                    a_c_mean = y[(x >= -_sw / 2) & (x <= _sw / 2)].mean()
                     dash_y = [0, a_c_mean / 2, a_c_mean / 2, 0]
                     dash_label = "Effective Swath"
 
                 else:
-                    dash_x = [a["loc"].iloc[0], a["loc"].iloc[-1]]
-                    a_mean = a["Average"].mean(axis="rows")
+                    dash_x = [x[0], x[-1]]
+                    a_mean = y.mean()
                     dash_y = [a_mean, a_mean]
                     dash_label = "Average Value"
                 mplWidget.canvas.ax.plot(
@@ -159,12 +153,9 @@ class SeriesDataString(SeriesDataBase):
 
     # Overrides for superclass
 
-    def get_average_mod(self):
+    def get_average_mod(self) -> Pattern:
         return self.average.string.data_mod
 
-    def get_average_y_label(self):
-        return "Average"
-
     def _config_mpl_plotter(self, mplWidget: MplWidget):
         super()._config_mpl_plotter(mplWidget)
         mplWidget.canvas.ax.set_yticks([])
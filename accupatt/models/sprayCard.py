@@ -1,4 +1,7 @@
+import concurrent.futures as cf
 from dataclasses import dataclass
+import hashlib
+import json
 import math
 import uuid
 
@@ -6,14 +9,22 @@ import accupatt.config as cfg
 import cv2
 from skimage.draw import ellipse_perimeter
 from skimage.feature import peak_local_max
-from skimage.measure import find_contours, label as sklabel, regionprops
+from skimage.measure import find_contours, regionprops
 from skimage.segmentation import watershed
 from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 import numpy as np
 from accupatt.helpers.atomizationModel import AtomizationModel
+from accupatt.helpers.imageCache import image_cache
+from accupatt.models.stainHistogram import StainHistogram
+from accupatt.models.stainTable import StainTable
 
 
 class SprayCard:
+    # Bumped when process_image numbers or measures stains differently
+    PROCESS_VERSION = 2
+
     def __init__(self, id_="", name="", filepath=None):
         # Use id if passed, else create one
         self.id = id_
@@ -25,7 +36,11 @@ class SprayCard:
         self.location = None
         self.location_units = None
         self.has_image = False
+        # Hash of the stored image, used to key persisted processing results
+        self.image_hash = None
         self.include_in_composite = False
+        # Database rows as last loaded or saved, keyed by table
+        self.saved_rows: dict = {}
         # Init optionals using persistent values/defaults from config if available
         self.dpi = cfg.get_image_dpi()
         self.threshold_type = cfg.get_threshold_type()
@@ -50,19 +65,31 @@ class SprayCard:
         # Initialize stain stats
         self.flag_max_stain_limit_reached = False
         self.area_px2 = 0.0
-        self.stains = []
+        self.stains = StainTable()
         self.stats = SprayCardStats(sprayCard=self)
         # Flag for currency
         self.current = False
         # Temporary working variable
         self.threshold_grayscale_calculated = cfg.get_threshold_grayscale()
 
-    def image_original(self):
-        return sprayCardImageFileHandler.read_image_from_file(self)
+    def image_original(self, copy=True):
+        # Decoded images are shared via the image cache, only copy=False callers may skip the copy
+        img = sprayCardImageFileHandler.read_image_from_file(self)
+        if img is not None and copy:
+            img = img.copy()
+        return img
 
-    def process_image(self, overlay=False, mask=False):
+    def process_image(self, overlay=False, mask=False, stages=None):
         self.current = True
-        scip = SprayCardImageProcessor(sprayCard=self)
+        if stages is None:
+            stages = SprayCardImageStages(self.image_original(copy=False))
+        # Stains alone of cards too large for the memory budget are found in tiles
+        if not (overlay or mask) and TiledSprayCardImageProcessor.can_process(
+            self, stages.img_src
+        ):
+            scip = TiledSprayCardImageProcessor(sprayCard=self, stages=stages)
+        else:
+            scip = SprayCardImageProcessor(sprayCard=self, stages=stages)
         self.threshold_grayscale_calculated = scip.threshold_grayscale_calculated
         scip.process_stains()
         if overlay and mask:
@@ -72,6 +99,46 @@ class SprayCard:
         elif mask:
             return scip.get_mask_image()
 
+    def get_process_options(self) -> dict:
+        # All attributes which affect the outcome of process_image, dpi and spread
+        # factors only affect stats, see SprayCardStats.refresh
+        return {
+            "threshold_type": self.threshold_type,
+            "threshold_method_grayscale": self.threshold_method_grayscale,
+            "threshold_grayscale": self.threshold_grayscale,
+            "threshold_color_hue_min": self.threshold_color_hue_min,
+            "threshold_color_hue_max": self.threshold_color_hue_max,
+            "threshold_color_hue_pass": self.threshold_color_hue_pass,
+            "threshold_color_saturation_min": self.threshold_color_saturation_min,
+            "threshold_color_saturation_max": self.threshold_color_saturation_max,
+            "threshold_color_saturation_pass": self.threshold_color_saturation_pass,
+            "threshold_color_brightness_min": self.threshold_color_brightness_min,
+            "threshold_color_brightness_max": self.threshold_color_brightness_max,
+            "threshold_color_brightness_pass": self.threshold_color_brightness_pass,
+            "watershed": self.watershed,
+            "min_stain_area_px": self.min_stain_area_px,
+            "stain_approximation_method": self.stain_approximation_method,
+        }
+
+    def set_process_options(self, d: dict):
+        for key, value in d.items():
+            setattr(self, key, value)
+
+    def get_process_key(self) -> str:
+        # Identifies the image and options used by process_image, None if image unknown
+        if self.image_hash is None:
+            return None
+        # Normalize to the types read back from db (bools as ints, integral floats as ints)
+        options = self.get_process_options()
+        for key, value in options.items():
+            if isinstance(value, bool) or (
+                isinstance(value, float) and value.is_integer()
+            ):
+                options[key] = int(value)
+        options = json.dumps(options, sort_keys=True)
+        key = f"{self.PROCESS_VERSION}:{self.image_hash}:{options}"
+        return hashlib.sha1(key.encode()).hexdigest()
+
     def save_image_to_file(self, image):
         return sprayCardImageFileHandler.save_image_to_file(self, image)
 
@@ -191,21 +258,20 @@ class SprayCardStats:
             return self.lpha
 
     def get_percent_coverage(self, text=False):
-        stains = [s for s in self.sprayCard.stains if s["is_include"] or s["is_edge"]]
+        stains = self.sprayCard.stains
+        mask = stains.is_include | stains.is_edge
         # Protect from div/0 error or empty stain array
-        if self.sprayCard.area_px2 == 0 or len(stains) == 0:
+        if self.sprayCard.area_px2 == 0 or not mask.any():
             return 0
         # Calculate coverage as percent of pixel area
-        cov = (
-            sum([stain["area"] for stain in stains]) / self.sprayCard.area_px2
-        ) * 100.0
+        cov = (stains.sum_area(mask) / self.sprayCard.area_px2) * 100.0
         if text:
             return f"{cov:.2f}%"
         else:
             return cov
 
     def get_number_of_stains(self, text=False):
-        l = len([s for s in self.sprayCard.stains if s["is_include"]])
+        l = self.sprayCard.stains.count(self.sprayCard.stains.is_include)
         if text:
             return str(l)
         else:
@@ -234,33 +300,27 @@ class SprayCardStats:
 
     # Public setter for dv's
 
-    def set_volumetric_stats(self, drop_dia_um=None, drop_vol_um3=None):
+    def set_volumetric_stats(self, drop_hist: StainHistogram = None):
+        # Droplet histogram normally none, but will be supplied for composite card calcs
+        if drop_hist is None:
+            drop_hist = self.get_droplet_histogram()
         # Protect agains empty array
-        if not any([s["is_include"] for s in self.sprayCard.stains]):
+        if drop_hist.count() == 0:
             self.dv01 = np.nan
             self.dv05 = np.nan
             self.dv09 = np.nan
             self.gpa = np.nan
             self.lpha = np.nan
+            self.current = True
             return
-        # dd and dv lists normally none, but will have values already for composite card calcs
-        if drop_dia_um is None or drop_vol_um3 is None:
-            drop_dia_um, drop_vol_um3 = self.get_droplet_diameters_and_volumes()
-        # Calculate volume sum
-        drop_vol_um3_sum = sum(drop_vol_um3)
-        # Calculate volume fractions
-        dv01_vol = 0.10 * drop_vol_um3_sum
-        dv05_vol = 0.50 * drop_vol_um3_sum
-        dv09_vol = 0.90 * drop_vol_um3_sum
-        # Convert lists to np arrays
-        drop_dia_um = np.array(drop_dia_um, dtype=float, order="K")
-        drop_vol_um3 = np.array(drop_vol_um3, dtype=float, order="K")
-        # Create cumulative volume array
-        drop_vol_um3_cum = np.cumsum(drop_vol_um3)
-        # Interpolate drop diameters using volume fractions
-        self.dv01 = round(np.interp(dv01_vol, drop_vol_um3_cum, drop_dia_um))
-        self.dv05 = round(np.interp(dv05_vol, drop_vol_um3_cum, drop_dia_um))
-        self.dv09 = round(np.interp(dv09_vol, drop_vol_um3_cum, drop_dia_um))
+        # Drop volume of each distinct diameter and volume sum over all drops
+        drop_vol_um3 = (np.pi * drop_hist.values**3) / 6.0
+        drop_vol_um3_sum = (drop_vol_um3 * drop_hist.counts).sum()
+        # Interpolate drop diameters at volume fractions from cumulative volumes
+        dv01, dv05, dv09 = drop_hist.quantiles([0.10, 0.50, 0.90], drop_vol_um3)
+        self.dv01 = round(dv01)
+        self.dv05 = round(dv05)
+        self.dv09 = round(dv09)
         # Use the vol sum here to set GPA and L/HA
         um3_per_um2 = drop_vol_um3_sum / self._px2_to_um2(self.sprayCard.area_px2)
         self.gpa = um3_per_um2 / cfg.UM3_UM2_PER_GAL_ACRE
@@ -268,29 +328,35 @@ class SprayCardStats:
         # Reset currency flag
         self.current = True
 
-    # Publicly accessible getter for dd and dv lists, only public so can be used in Composite Card calculations
+    def refresh(self):
+        # Stats-only parameters changed, recompute from the stain areas if still current
+        if self.sprayCard.current:
+            self.set_volumetric_stats()
+        else:
+            self.current = False
 
-    def get_droplet_diameters_and_volumes(self) -> tuple[list[float], list[float]]:
-        stains = [s for s in self.sprayCard.stains if s["is_include"]]
-        # Protect agains empty array
-        if not stains:
-            return [], []
-        drop_dia_um = []
-        drop_vol_um3 = []
-        # Sort areas into ascending order of size
-        stains.sort(key=lambda s: s["area"])
-        for stain in stains:
-            # Convert px2 to um2
-            area_um2 = self._px2_to_um2(stain["area"])
-            # Calculate stain diameter assuming circular stain
-            dia_um = math.sqrt((4.0 * area_um2) / math.pi)
-            # Apply Spread Factors to get originating drop diameter
-            drop_dia_um.append(self._stain_dia_to_drop_dia(dia_um))
-            # Use drop diameter to calculate drop volume
-            vol_um3 = (math.pi * drop_dia_um[-1] ** 3) / 6.0
-            # Build volume list
-            drop_vol_um3.append(vol_um3)
-        return drop_dia_um, drop_vol_um3
+    # Publicly accessible histogram getters, only public so can be used in Composite Card calculations
+
+    def get_area_histogram(self) -> StainHistogram:
+        # Kept until the stain table is replaced, so stats-only updates skip the stains
+        stains = self.sprayCard.stains
+        cached = getattr(self, "_area_hist", None)
+        if cached is None or cached[0] is not stains:
+            hist = StainHistogram.from_values(stains.get_areas(stains.is_include))
+            self._area_hist = cached = (stains, hist)
+        return cached[1]
+
+    def get_droplet_histogram(self) -> StainHistogram:
+        # Only distinct stain areas need converting to droplet diameters
+        return self.get_area_histogram().map(self._stain_area_to_drop_dia)
+
+    def _stain_area_to_drop_dia(self, area_px2):
+        # Convert px2 to um2
+        area_um2 = self._px2_to_um2(area_px2)
+        # Calculate stain diameter assuming circular stain
+        dia_um = np.sqrt((4.0 * area_um2) / np.pi)
+        # Apply Spread Factors to get originating drop diameter
+        return self._stain_dia_to_drop_dia(dia_um)
 
     # Internal Functions
 
@@ -321,14 +387,20 @@ class SprayCardStats:
 
 
 class sprayCardImageFileHandler:
-    def read_image_from_file(sprayCard: SprayCard):
+    def read_image_from_file(sprayCard: SprayCard, use_cache=True):
         if sprayCard.filepath is None or not sprayCard.has_image:
             return
+        # Use decoded image if still cached
+        img = image_cache.get(sprayCard.filepath, sprayCard.id) if use_cache else None
+        if img is not None:
+            return img
         if sprayCard.filepath[-1] == "x":
-            return sprayCardImageFileHandler._read_image_from_xlsx(sprayCard=sprayCard)
+            img = sprayCardImageFileHandler._read_image_from_xlsx(sprayCard=sprayCard)
         elif sprayCard.filepath[-1] == "b":
-            return sprayCardImageFileHandler._read_image_from_db(sprayCard=sprayCard)
-        return
+            img = sprayCardImageFileHandler._read_image_from_db(sprayCard=sprayCard)
+        if img is None or not use_cache:
+            return img
+        return image_cache.put(sprayCard.filepath, sprayCard.id, img)
 
     def save_image_to_file(sprayCard: SprayCard, image):
         if sprayCard.filepath is None or sprayCard.filepath == "":
@@ -338,6 +410,20 @@ class sprayCardImageFileHandler:
                 sprayCard=sprayCard, image=image
             )
 
+    def save_images_to_file(sprayCards: list[SprayCard], images: list):
+        # Bulk save, any processing results already current are saved alongside
+        if len(sprayCards) == 0:
+            return
+        filepath = sprayCards[0].filepath
+        if filepath is None or filepath == "" or filepath[-1] != "b":
+            return
+        from accupatt.helpers.dBBridge import save_images_to_db
+
+        for sprayCard in sprayCards:
+            sprayCard.has_image = True
+            sprayCard.include_in_composite = True
+        return save_images_to_db(filepath, sprayCards, images)
+
     def _read_image_from_xlsx(sprayCard: SprayCard):
         from accupatt.helpers.dataFileImporter import load_image_from_accupatt_1
 
@@ -359,30 +445,140 @@ class sprayCardImageFileHandler:
         return cv2.imdecode(image_array, cv2.IMREAD_COLOR)
 
     def _write_image_to_db(sprayCard: SprayCard, image):
-        from accupatt.helpers.dBBridge import save_image_to_db
+        from accupatt.helpers.dBBridge import hash_image, save_image_to_db
 
-        if success := save_image_to_db(sprayCard.filepath, sprayCard.id, image):
+        image_hash = hash_image(image)
+        if success := save_image_to_db(
+            sprayCard.filepath, sprayCard.id, image, image_hash
+        ):
             sprayCard.has_image = True
+            sprayCard.image_hash = image_hash
+            # New image invalidates any previous processing results
+            sprayCard.current = False
+            sprayCard.stats.current = False
             sprayCard.include_in_composite = True
         return success
 
 
+class SprayCardImageStages:
+    """
+    Holds a decoded card image along with the color-space conversions and Otsu
+    threshold derived from it. Each stage is computed once on first use, so
+    reprocessing with new threshold settings only redoes the mask step.
+    """
+
+    def __init__(self, img_src, scale=1.0, otsu_source=None):
+        self.img_src = img_src
+        # Ratio of this image's size to the original card image
+        self.scale = scale
+        self._gray = None
+        self._hsv = None
+        self._otsu_threshold = None
+        # Downscaled stages share the Otsu value of the full resolution image
+        self._otsu_source = otsu_source
+        self._downscaled = {}
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.img_src, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def hsv(self):
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.img_src, cv2.COLOR_BGR2HSV)
+        return self._hsv
+
+    @property
+    def otsu_threshold(self) -> float:
+        if self._otsu_threshold is None:
+            if self._otsu_source is not None:
+                self._otsu_threshold = self._otsu_source.otsu_threshold
+            else:
+                self._otsu_threshold, _ = cv2.threshold(
+                    src=self.gray,
+                    thresh=0,  # This val isn't used when Otsu's method is employed
+                    maxval=255,
+                    type=cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU,
+                )
+        return self._otsu_threshold
+
+    @otsu_threshold.setter
+    def otsu_threshold(self, value: float):
+        # For callers which find it without the whole gray image
+        self._otsu_threshold = value
+
+    @property
+    def has_otsu_threshold(self) -> bool:
+        return self._otsu_threshold is not None
+
+    def downscaled(self, max_dim=1024) -> "SprayCardImageStages":
+        # Reduced resolution stages for interactive previews, self if already small enough
+        scale = min(1.0, max_dim / max(self.img_src.shape[:2]))
+        if scale == 1.0:
+            return self
+        if max_dim not in self._downscaled:
+            img = cv2.resize(
+                self.img_src, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+            self._downscaled[max_dim] = SprayCardImageStages(
+                img, scale=scale * self.scale, otsu_source=self
+            )
+        return self._downscaled[max_dim]
+
+
 class SprayCardImageProcessor:
-    def __init__(self, sprayCard):
+    def __init__(self, sprayCard, stages: SprayCardImageStages = None):
         self.sprayCard: SprayCard = sprayCard
         self.threshold_grayscale = self.sprayCard.threshold_grayscale
-        self.img_src = self.sprayCard.image_original()
+        # Stages may be supplied (and reused) by callers which reprocess the same image
+        if stages is None:
+            stages = SprayCardImageStages(self.sprayCard.image_original(copy=False))
+        self.stages = stages
+        self.img_src = stages.img_src
         self.threshold_grayscale_calculated, self.img_thresh = self._image_threshold(
-            img=self.img_src
+            stages
         )
-        self.sprayCard.area_px2 = self.img_src.shape[0] * self.img_src.shape[1]
-        # Clear stain lists
-        self.sprayCard.stains = []
+        # Card area always refers to the full resolution image
+        self.sprayCard.area_px2 = (
+            self.img_src.shape[0] * self.img_src.shape[1] / stages.scale**2
+        )
+        # Clear stain table
+        self.sprayCard.stains = StainTable()
 
     def process_stains(self):
-        sc = self.sprayCard
-        image_t = self.img_thresh
-        if self.sprayCard.watershed:
+        self.labels = self._label_stains(self.img_thresh)
+        m = self._measure_stains(self.labels)
+        area = self._approximate_stain_areas(m, self.labels)
+        # Add them to the stain table for later use, contours are only built if requested
+        self.sprayCard.stains = self._build_stain_table(m, area, self.labels.shape)
+
+    def _build_stain_table(self, m: dict, area, shape) -> StainTable:
+        # Check for mimimum area, scaled for reduced resolution stages
+        is_too_small = (
+            m["area"] < self.sprayCard.min_stain_area_px * self.stages.scale**2
+        )
+        # Check if touching edge
+        is_edge = (
+            (m["bbox_min_row"] <= 0)
+            | (m["bbox_min_col"] <= 0)
+            | (m["bbox_max_row"] >= shape[0] - 1)
+            | (m["bbox_max_col"] >= shape[1] - 1)
+        )
+        # Valid unless otherwise declared
+        is_include = ~is_too_small & ~is_edge
+        return StainTable(
+            index=m["index"],
+            area=area / self.stages.scale**2,
+            is_too_small=is_too_small,
+            is_edge=is_edge,
+            is_include=is_include,
+        )
+
+    def _label_stains(self, image_t):
+        # Watershed splitting is left to the full resolution pass, it dominates preview time
+        if self.sprayCard.watershed and self.stages.scale == 1.0:
             # Generate markers as local maxima of distance to background
             distance = cv2.distanceTransform(
                 image_t, cv2.DIST_L2, cv2.DIST_MASK_PRECISE
@@ -397,54 +593,140 @@ class SprayCardImageProcessor:
             mask = np.zeros(distance.shape, dtype=bool)
             mask[tuple(coords.T)] = True
             markers, _ = ndimage.label(mask)
-            labels = watershed(-distance, markers, mask=image_t, watershed_line=True)
-        else:
-            labels = sklabel(image_t)
-        # Iterate over each generated label
-        for r in regionprops(labels):
-            # Skip background
-            if r.label == 0:
-                continue
-            # Check for mimimum area
-            is_too_small = r.area < sc.min_stain_area_px
-            # Get bbox vals for offsetting local region
-            x1, y1, x2, y2 = r.bbox
-            # Check if touching edge
-            is_edge = (
-                True
-                if x1 <= 0
-                or y1 <= 0
-                or x2 >= image_t.shape[0] - 1
-                or y2 >= image_t.shape[1] - 1
-                else False
-            )
-            # Valid unless otherwise declared
-            is_include = not is_too_small and not is_edge
-            c, area = self._approximate_stain(r, image_t.shape)
-            # Convert to cv2 image array, applying offsets (-1 for padding above)
-            c_ = []
-            for pt in c:
-                c_.append([int(pt[1]), int(pt[0])])
-            c = np.array(c_).astype(int)
-
-            # Add it to the stains list for later use
-            sc.stains.append(
-                {
-                    "index": r.label,
-                    "contour": c,
-                    "area": area,
-                    "is_too_small": is_too_small,
-                    "is_edge": is_edge,
-                    "is_include": is_include,
-                }
+            return watershed(-distance, markers, mask=image_t, watershed_line=True)
+        return self._connected_components(image_t)
+
+    @staticmethod
+    def _connected_components(image_t):
+        # 8-connectivity to match skimage.measure.label. Wu's algorithm numbers
+        # stains in raster order of their first pixel, which tiles can reproduce
+        _, labels = cv2.connectedComponentsWithAlgorithm(
+            image_t, 8, cv2.CV_32S, cv2.CCL_WU
+        )
+        return labels
+
+    def _measure_stains(self, labels, origin=(0, 0)) -> dict:
+        """
+        Measures every labeled stain at once, returning a dict of arrays (one
+        element per stain) of index, area, bbox, centroid and ellipse axis
+        lengths equivalent to those of skimage.measure.regionprops.
+        Coordinates are offset by origin when labels is a window of the card.
+        """
+        rows, cols = np.nonzero(labels)
+        lab = labels[rows, cols]
+        # Group foreground pixels by label
+        order = np.argsort(lab, kind="stable")
+        lab = lab[order]
+        rows = rows[order].astype(float) + origin[0]
+        cols = cols[order].astype(float) + origin[1]
+        index, starts, area = np.unique(lab, return_index=True, return_counts=True)
+        n = index.size
+        group = np.repeat(np.arange(n), area)
+        m = {"index": index, "area": area}
+        if n == 0:
+            for key in [
+                "bbox_min_row",
+                "bbox_min_col",
+                "bbox_max_row",
+                "bbox_max_col",
+                "centroid_row",
+                "centroid_col",
+                "major_axis_length",
+                "minor_axis_length",
+            ]:
+                m[key] = np.zeros(0)
+            return m
+        # Bounding boxes, max is exclusive as in regionprops
+        m["bbox_min_row"] = np.minimum.reduceat(rows, starts).astype(int)
+        m["bbox_min_col"] = np.minimum.reduceat(cols, starts).astype(int)
+        m["bbox_max_row"] = np.maximum.reduceat(rows, starts).astype(int) + 1
+        m["bbox_max_col"] = np.maximum.reduceat(cols, starts).astype(int) + 1
+        # Centroids
+        m["centroid_row"] = np.bincount(group, weights=rows, minlength=n) / area
+        m["centroid_col"] = np.bincount(group, weights=cols, minlength=n) / area
+        # Normalized second central moments
+        dr = rows - m["centroid_row"][group]
+        dc = cols - m["centroid_col"][group]
+        mu_rr = np.bincount(group, weights=dr * dr, minlength=n) / area
+        mu_cc = np.bincount(group, weights=dc * dc, minlength=n) / area
+        mu_rc = np.bincount(group, weights=dr * dc, minlength=n) / area
+        self._set_ellipse_properties(m, mu_rr, mu_cc, mu_rc)
+        return m
+
+    def _set_ellipse_properties(self, m: dict, mu_rr, mu_cc, mu_rc):
+        # Eigenvalues of the inertia tensor give the ellipse axes
+        half_diff = np.sqrt(((mu_cc - mu_rr) / 2) ** 2 + mu_rc**2)
+        mean = (mu_cc + mu_rr) / 2
+        m["major_axis_length"] = 4 * np.sqrt(np.clip(mean + half_diff, 0, None))
+        m["minor_axis_length"] = 4 * np.sqrt(np.clip(mean - half_diff, 0, None))
+
+    def _approximate_stain_areas(self, m: dict, labels):
+        method = self.sprayCard.stain_approximation_method
+        area = m["area"].astype(float)
+        if method in [
+            cfg.STAIN_APPROXIMATION_ELLIPSE,
+            cfg.STAIN_APPROXIMATION_MIN_CIRCLE,
+        ]:
+            r_radius = (m["minor_axis_length"] / 2).astype(int)
+            c_radius = (m["major_axis_length"] / 2).astype(int)
+            if method == cfg.STAIN_APPROXIMATION_MIN_CIRCLE:
+                r_radius = np.maximum(r_radius, c_radius)
+                c_radius = r_radius
+            # Stains too small or too close to origin to approximate keep raw area
+            approximated = (
+                (m["centroid_row"].astype(int) >= 1)
+                & (m["centroid_col"].astype(int) >= 1)
+                & (r_radius >= 1)
+                & (c_radius >= 1)
             )
+            area[approximated] = (np.pi * r_radius * c_radius)[approximated]
+        elif method == cfg.STAIN_APPROXIMATION_CONVEX_HULL:
+            # Convex hulls must be found per stain
+            area = np.array([r.area_convex for r in regionprops(labels)], dtype=float)
+        return area
+
+    def _build_contours(self):
+        # Contours are only needed for drawing, so build them on request
+        stains = self.sprayCard.stains
+        if stains.has_contours():
+            return
+        contours = []
+        # Regions are yielded in ascending label order, as are stains
+        for r in regionprops(self.labels):
+            c, _ = self._approximate_stain(r, self.labels.shape)
+            # Convert to cv2 image array (x, y)
+            contours.append(c[:, ::-1].astype(int))
+        stains.set_contours(contours)
+
+    def _get_preview_classes(self):
+        # Per-pixel stain class (0 background, 1 too small, 2 edge, 3 include) and
+        # outlines of included stains, drawn straight from the label image
+        stains = self.sprayCard.stains
+        lut = np.zeros(self.labels.max() + 1, dtype=np.uint8)
+        lut[stains.index[stains.is_too_small]] = 1
+        lut[stains.index[stains.is_edge]] = 2
+        lut[stains.index[stains.is_include]] = 3
+        classes = lut[self.labels]
+        lab = self.labels
+        boundary = np.zeros(lab.shape, dtype=bool)
+        boundary[1:, :] |= lab[1:, :] != lab[:-1, :]
+        boundary[:-1, :] |= lab[:-1, :] != lab[1:, :]
+        boundary[:, 1:] |= lab[:, 1:] != lab[:, :-1]
+        boundary[:, :-1] |= lab[:, :-1] != lab[:, 1:]
+        return classes, boundary & (classes == 3)
 
     def get_overlay_image(self):
         sc = self.sprayCard
-        img = self.img_src
+        img = self.img_src.copy()
+        # Reduced resolution previews skip per-stain contours, outlining raw stains instead
+        if self.stages.scale < 1.0:
+            _, outline = self._get_preview_classes()
+            img[outline] = cfg.COLOR_STAIN_OUTLINE[::-1]
+            return img
+        self._build_contours()
         cv2.drawContours(
             img,
-            [stain["contour"] for stain in sc.stains if stain["is_include"]],
+            sc.stains.get_contours(sc.stains.is_include),
             -1,
             cfg.COLOR_STAIN_OUTLINE[::-1],
             1,
@@ -453,60 +735,77 @@ class SprayCardImageProcessor:
 
     def get_mask_image(self):
         sc = self.sprayCard
+        # Reduced resolution previews fill raw stains by class rather than drawing contours
+        if self.stages.scale < 1.0:
+            classes, outline = self._get_preview_classes()
+            palette = np.array(
+                [
+                    (255, 255, 255),
+                    cfg.COLOR_STAIN_FILL_ALL[::-1],
+                    cfg.COLOR_STAIN_FILL_EDGE[::-1],
+                    cfg.COLOR_STAIN_FILL_VALID[::-1],
+                ],
+                dtype=np.uint8,
+            )
+            img = palette[classes]
+            img[outline] = (255, 255, 255)
+            return img
+        self._build_contours()
         img = np.zeros((self.img_src.shape[0], self.img_src.shape[1], 3), np.uint8)
         img[:] = (255, 255, 255)
         cv2.drawContours(
             img,
-            [stain["contour"] for stain in sc.stains if stain["is_too_small"]],
+            sc.stains.get_contours(sc.stains.is_too_small),
             -1,
             cfg.COLOR_STAIN_FILL_ALL[::-1],
             -1,
         )
         cv2.drawContours(
             img,
-            [stain["contour"] for stain in sc.stains if stain["is_edge"]],
+            sc.stains.get_contours(sc.stains.is_edge),
             -1,
             cfg.COLOR_STAIN_FILL_EDGE[::-1],
             -1,
         )
         cv2.drawContours(
             img,
-            [stain["contour"] for stain in sc.stains if stain["is_include"]],
+            sc.stains.get_contours(sc.stains.is_include),
             -1,
             cfg.COLOR_STAIN_FILL_VALID[::-1],
             -1,
         )
         cv2.drawContours(
             img,
-            [stain["contour"] for stain in sc.stains if stain["is_include"]],
+            sc.stains.get_contours(sc.stains.is_include),
             -1,
             (255, 255, 255),
             1,
         )
         return img
 
-    def _image_threshold(self, img):
+    def _image_threshold(self, stages: SprayCardImageStages):
         if self.sprayCard.threshold_type == cfg.THRESHOLD_TYPE_GRAYSCALE:
-            return self._image_threshold_grayscale(img)
+            return self._image_threshold_grayscale(stages)
         else:
-            return self._image_threshold_color(img)
+            return self._image_threshold_color(stages)
 
-    def _image_threshold_grayscale(self, img):
-        # Convert to grayscale
-        img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    def _image_threshold_grayscale(self, stages: SprayCardImageStages):
+        # Use cached grayscale conversion
+        img_gray = stages.gray
         if (
             self.sprayCard.threshold_method_grayscale
             == cfg.THRESHOLD_GRAYSCALE_METHOD_AUTO
         ):
-            # Run Otsu Threshold, if threshold value is within ui-specified range, return it
-            thresh_val, _img_thresh = cv2.threshold(
-                src=img_gray,
-                thresh=0,  # This val isn't used when Otsu's method is employed
-                maxval=255,
-                type=cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU,
-            )
+            # Use Otsu Threshold, if threshold value is within ui-specified range, return it
+            thresh_val = stages.otsu_threshold
             if thresh_val <= self.sprayCard.threshold_grayscale:
-                return thresh_val, _img_thresh
+                _, img_thresh = cv2.threshold(
+                    src=img_gray,
+                    thresh=thresh_val,
+                    maxval=255,
+                    type=cv2.THRESH_BINARY_INV,
+                )
+                return thresh_val, img_thresh
         # If manually thresholding, or auto returned threshold value outside ui-specified range, run manual thresh and return it
         _, img_thresh = cv2.threshold(
             src=img_gray,
@@ -516,7 +815,7 @@ class SprayCardImageProcessor:
         )
         return self.sprayCard.threshold_grayscale, img_thresh
 
-    def _image_threshold_color(self, img):
+    def _image_threshold_color(self, stages: SprayCardImageStages):
         # Readability
         hbl = 0
         hvl = self.sprayCard.threshold_color_hue_min
@@ -530,8 +829,8 @@ class SprayCardImageProcessor:
         bvl = self.sprayCard.threshold_color_brightness_min
         bvh = self.sprayCard.threshold_color_brightness_max
         bbh = 255
-        # Use HSV colorspace
-        img_hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+        # Use cached HSV colorspace conversion
+        img_hsv = stages.hsv
         # Check Hue channel
         if self.sprayCard.threshold_color_hue_pass:
             # Band-Pass
@@ -632,3 +931,380 @@ class SprayCardImageProcessor:
         c[:, 0] += x1 - 1
         c[:, 1] += y1 - 1
         return c, area
+
+
+class TiledSprayCardImageProcessor(SprayCardImageProcessor):
+    """
+    Finds the stains of very large cards tile by tile, so only the working arrays
+    of one tile per thread are held at once. Stains crossing tile seams are merged,
+    so stain areas, bounding boxes and edge flags match whole-card processing.
+    Only the stain table is produced, overlay and mask images need whole-card labels.
+    Watershed is left to whole-card processing, see can_process.
+    """
+
+    # Approximate working memory per pixel (gray/HSV, threshold, labels and moments)
+    WORKING_BYTES_PER_PX = 48
+    # Budget (MB) in place of the configured one, set in processes sharing it
+    memory_mb: float = None
+
+    def __init__(
+        self, sprayCard, stages: SprayCardImageStages = None, max_workers=None
+    ):
+        self.sprayCard: SprayCard = sprayCard
+        self.threshold_grayscale = self.sprayCard.threshold_grayscale
+        if stages is None:
+            stages = SprayCardImageStages(self.sprayCard.image_original(copy=False))
+        self.stages = stages
+        self.img_src = stages.img_src
+        # Follow OpenCV's thread count, which is 1 within processing engine workers
+        self.max_workers = max_workers if max_workers else max(cv2.getNumThreads(), 1)
+        self.tile_size = TiledSprayCardImageProcessor.get_tile_size(self.max_workers)
+        h, w = self.img_src.shape[:2]
+        t = self.tile_size
+        self.tiles = [
+            (r, c, min(r + t, h), min(c + t, w))
+            for r in range(0, h, t)
+            for c in range(0, w, t)
+        ]
+        self.grid_shape = (-(-h // t), -(-w // t))
+        # Otsu threshold must come from the whole card, accumulate tile histograms
+        if (
+            self.sprayCard.threshold_type == cfg.THRESHOLD_TYPE_GRAYSCALE
+            and self.sprayCard.threshold_method_grayscale
+            == cfg.THRESHOLD_GRAYSCALE_METHOD_AUTO
+            and not stages.has_otsu_threshold
+        ):
+            stages.otsu_threshold = self._otsu_threshold_tiled()
+        self.threshold_grayscale_calculated, _ = self._image_threshold(
+            self._tile_stages(self.tiles[0])
+        )
+        self.sprayCard.area_px2 = h * w / stages.scale**2
+        # Clear stain table
+        self.sprayCard.stains = StainTable()
+
+    @staticmethod
+    def get_tile_size(max_workers: int) -> int:
+        max_bytes = TiledSprayCardImageProcessor.memory_budget()
+        per_worker = max_bytes / max_workers
+        return max(
+            256,
+            int(
+                math.sqrt(
+                    per_worker / TiledSprayCardImageProcessor.WORKING_BYTES_PER_PX
+                )
+            ),
+        )
+
+    @staticmethod
+    def memory_budget() -> float:
+        # Working memory budget in bytes
+        mb = TiledSprayCardImageProcessor.memory_mb
+        return (mb if mb is not None else cfg.get_tile_memory_mb()) * 1024 * 1024
+
+    @staticmethod
+    def can_process(sprayCard: SprayCard, img) -> bool:
+        # Only cards over the memory budget are worth tiling
+        if not TiledSprayCardImageProcessor.exceeds_budget(img):
+            return False
+        # Watershed breaks flooding ties in an order set by the whole card, so split
+        # lines found within a window can differ from those of the whole card
+        return not sprayCard.watershed
+
+    @staticmethod
+    def exceeds_budget(img) -> bool:
+        # Whether whole-card processing of img would exceed the memory budget
+        working_bytes = (
+            img.shape[0]
+            * img.shape[1]
+            * TiledSprayCardImageProcessor.WORKING_BYTES_PER_PX
+        )
+        return working_bytes > TiledSprayCardImageProcessor.memory_budget()
+
+    def process_stains(self):
+        with cf.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            parts = list(executor.map(self._label_tile, self.tiles))
+            m = self._merge_tiles(parts)
+            if m["area"].size == 0:
+                area = m["area"].astype(float)
+            elif (
+                self.sprayCard.stain_approximation_method
+                == cfg.STAIN_APPROXIMATION_CONVEX_HULL
+            ):
+                # Stains must be hulled from their pixels, revisit them in windows
+                args = self._get_windows(m)
+                windows = list(executor.map(self._process_window, args))
+                # Windows hold their stains in raster order, restore it across windows
+                order = np.argsort(np.concatenate([a[3] for a in args]))
+                m = {
+                    key: np.concatenate([mw[key] for mw, _ in windows])[order]
+                    for key in windows[0][0]
+                }
+                m["index"] = np.arange(1, m["area"].size + 1)
+                area = np.concatenate([a for _, a in windows])[order].astype(float)
+            else:
+                area = self._approximate_stain_areas(m, None)
+        self.sprayCard.stains = self._build_stain_table(m, area, self.img_src.shape[:2])
+
+    def _tile_stages(self, tile) -> SprayCardImageStages:
+        r0, c0, r1, c1 = tile
+        return SprayCardImageStages(
+            self.img_src[r0:r1, c0:c1], scale=self.stages.scale, otsu_source=self.stages
+        )
+
+    def _otsu_threshold_tiled(self) -> float:
+        hist = np.zeros(256)
+        for r0, c0, r1, c1 in self.tiles:
+            gray = cv2.cvtColor(self.img_src[r0:r1, c0:c1], cv2.COLOR_BGR2GRAY)
+            hist += np.bincount(gray.ravel(), minlength=256)
+        # Otsu's method as implemented by cv2.threshold, maximize between-class variance
+        p = hist / hist.sum()
+        q1 = np.cumsum(p)
+        q2 = 1.0 - q1
+        mu = np.cumsum(np.arange(256) * p)
+        valid = (q1 > np.finfo(np.float32).eps) & (q2 > np.finfo(np.float32).eps)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mu1 = mu / q1
+            mu2 = (mu[-1] - mu) / q2
+            sigma = np.where(valid, q1 * q2 * (mu1 - mu2) ** 2, 0.0)
+        return float(np.argmax(sigma))
+
+    def _label_tile(self, tile) -> dict:
+        r0, c0, _, _ = tile
+        _, thresh = self._image_threshold(self._tile_stages(tile))
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(
+            thresh, connectivity=8, ltype=cv2.CV_32S
+        )
+        rows, cols = np.nonzero(labels)
+        idx = labels[rows, cols] - 1
+        n = n - 1
+        count = np.bincount(idx, minlength=n).astype(float)
+        # First pixel of each stain in raster order, every label has pixels
+        _, first = np.unique(idx, return_index=True)
+        # Means and central second moment sums, merged across tiles later
+        mean_r = np.bincount(idx, weights=rows, minlength=n) / count
+        mean_c = np.bincount(idx, weights=cols, minlength=n) / count
+        dr = rows - mean_r[idx]
+        dc = cols - mean_c[idx]
+        return {
+            "count": count,
+            "mean_r": mean_r + r0,
+            "mean_c": mean_c + c0,
+            "m_rr": np.bincount(idx, weights=dr * dr, minlength=n),
+            "m_cc": np.bincount(idx, weights=dc * dc, minlength=n),
+            "m_rc": np.bincount(idx, weights=dr * dc, minlength=n),
+            "min_r": stats[1:, cv2.CC_STAT_TOP] + r0,
+            "min_c": stats[1:, cv2.CC_STAT_LEFT] + c0,
+            "max_r": stats[1:, cv2.CC_STAT_TOP] + stats[1:, cv2.CC_STAT_HEIGHT] + r0,
+            "max_c": stats[1:, cv2.CC_STAT_LEFT] + stats[1:, cv2.CC_STAT_WIDTH] + c0,
+            "first_r": rows[first] + r0,
+            "first_c": cols[first] + c0,
+            # Labels along the tile border, for joining stains across seams
+            "top": labels[0].copy(),
+            "bottom": labels[-1].copy(),
+            "left": labels[:, 0].copy(),
+            "right": labels[:, -1].copy(),
+        }
+
+    def _merge_tiles(self, parts: list[dict]) -> dict:
+        offsets = np.cumsum([0] + [p["count"].size for p in parts])
+        n = offsets[-1]
+        if n == 0:
+            m = self._measure_stains(np.zeros((1, 1), dtype=np.int32))
+            m["first_row"] = m["first_col"] = np.zeros(0, dtype=int)
+            return m
+        gr, gc = self.grid_shape
+
+        def node(i, labels):
+            # Global node of each labeled pixel along a tile border
+            return np.where(labels > 0, labels - 1 + offsets[i], -1)
+
+        a_list, b_list = [], []
+
+        def join(a, b):
+            # 8-connectivity across a seam, a and b are facing border rows/cols
+            for shift in (-1, 0, 1):
+                aa = a[max(0, -shift) : a.size - max(0, shift)]
+                bb = b[max(0, shift) : b.size - max(0, -shift)]
+                keep = (aa >= 0) & (bb >= 0)
+                a_list.append(aa[keep])
+                b_list.append(bb[keep])
+
+        for i, p in enumerate(parts):
+            ti, tj = divmod(i, gc)
+            if tj + 1 < gc:
+                join(node(i, p["right"]), node(i + 1, parts[i + 1]["left"]))
+            if ti + 1 < gr:
+                below = i + gc
+                join(node(i, p["bottom"]), node(below, parts[below]["top"]))
+                # Diagonal neighbours across tile corners
+                if tj + 1 < gc:
+                    join(
+                        node(i, p["bottom"][-1:]),
+                        node(below + 1, parts[below + 1]["top"][:1]),
+                    )
+                if tj > 0:
+                    join(
+                        node(i, p["bottom"][:1]),
+                        node(below - 1, parts[below - 1]["top"][-1:]),
+                    )
+        a = np.concatenate(a_list) if a_list else np.zeros(0, dtype=int)
+        b = np.concatenate(b_list) if b_list else np.zeros(0, dtype=int)
+        graph = coo_matrix((np.ones(a.size), (a, b)), shape=(n, n))
+        _, group = connected_components(graph, directed=False)
+        cat = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+        # Order merged stains by their first pixel, as whole-card labeling does
+        w_img = self.img_src.shape[1]
+        first = cat["first_r"] * w_img + cat["first_c"]
+        first_g = np.full(group.max() + 1, np.iinfo(np.int64).max)
+        np.minimum.at(first_g, group, first)
+        rank = np.empty_like(first_g)
+        rank[np.argsort(first_g)] = np.arange(first_g.size)
+        first_g = np.sort(first_g)
+        g = rank[group]
+        k = first_g.size
+        # Merge counts, means and central moments (parallel algorithm)
+        count = np.bincount(g, weights=cat["count"], minlength=k)
+        mean_r = (
+            np.bincount(g, weights=cat["count"] * cat["mean_r"], minlength=k) / count
+        )
+        mean_c = (
+            np.bincount(g, weights=cat["count"] * cat["mean_c"], minlength=k) / count
+        )
+        dr = cat["mean_r"] - mean_r[g]
+        dc = cat["mean_c"] - mean_c[g]
+        w = cat["count"]
+        mu_rr = np.bincount(g, weights=cat["m_rr"] + w * dr * dr, minlength=k) / count
+        mu_cc = np.bincount(g, weights=cat["m_cc"] + w * dc * dc, minlength=k) / count
+        mu_rc = np.bincount(g, weights=cat["m_rc"] + w * dr * dc, minlength=k) / count
+        m = {
+            "index": np.arange(1, k + 1),
+            "area": count.astype(int),
+            "centroid_row": mean_r,
+            "centroid_col": mean_c,
+            "first_row": first_g // w_img,
+            "first_col": first_g % w_img,
+        }
+        for key, part_key, reduce, initial in [
+            ("bbox_min_row", "min_r", np.minimum, np.iinfo(int).max),
+            ("bbox_min_col", "min_c", np.minimum, np.iinfo(int).max),
+            ("bbox_max_row", "max_r", np.maximum, 0),
+            ("bbox_max_col", "max_c", np.maximum, 0),
+        ]:
+            m[key] = np.full(k, initial, dtype=int)
+            reduce.at(m[key], g, cat[part_key])
+        self._set_ellipse_properties(m, mu_rr, mu_cc, mu_rc)
+        return m
+
+    def _get_windows(self, m: dict) -> list[tuple]:
+        # Each stain is revisited with the tile holding its first pixel, in a window
+        # grown to cover the whole of every such stain
+        t = self.tile_size
+        tile_of = (m["first_row"] // t) * self.grid_shape[1] + m["first_col"] // t
+        h, w = self.img_src.shape[:2]
+        windows = []
+        for i in np.unique(tile_of):
+            stains = np.flatnonzero(tile_of == i)
+            window = (
+                max(m["bbox_min_row"][stains].min() - 1, 0),
+                max(m["bbox_min_col"][stains].min() - 1, 0),
+                min(m["bbox_max_row"][stains].max() + 1, h),
+                min(m["bbox_max_col"][stains].max() + 1, w),
+            )
+            windows.append(
+                (window, m["first_row"][stains], m["first_col"][stains], stains)
+            )
+        return windows
+
+    def _process_window(self, args) -> tuple[dict, np.ndarray]:
+        window, first_row, first_col, _ = args
+        r0, c0, _, _ = window
+        _, thresh = self._image_threshold(self._tile_stages(window))
+        labels = self._connected_components(thresh)
+        # Only keep stains assigned to this window, others belong to neighbouring windows
+        keep = np.zeros(labels.max() + 1, dtype=bool)
+        keep[labels[first_row - r0, first_col - c0]] = True
+        keep[0] = False
+        labels[~keep[labels]] = 0
+        m = self._measure_stains(labels, origin=(r0, c0))
+        return m, self._approximate_stain_areas(m, labels)
+
+
+class SheetSprayCardImageProcessor(SprayCardImageProcessor):
+    """
+    Finds the stains of all cards cropped from one scanner sheet in a single pass.
+    Each card region of the sheet is thresholded (with its own Otsu value) into one
+    sheet mask, which is labeled and measured once before stains are handed back to
+    the card whose region holds them. Results match processing each crop alone.
+    """
+
+    def __init__(self, sprayCards: list[SprayCard], img_sheet, rects: list[tuple]):
+        # Cards share process options, see can_process
+        self.sprayCards = sprayCards
+        self.sprayCard: SprayCard = sprayCards[0]
+        self.threshold_grayscale = self.sprayCard.threshold_grayscale
+        self.stages = SprayCardImageStages(img_sheet)
+        self.img_src = img_sheet
+        self.rects = rects
+        self.img_thresh = np.zeros(img_sheet.shape[:2], dtype=np.uint8)
+        for card, (x, y, w, h) in zip(sprayCards, rects):
+            stages = SprayCardImageStages(img_sheet[y : y + h, x : x + w])
+            card.threshold_grayscale_calculated, thresh = self._image_threshold(stages)
+            self.img_thresh[y : y + h, x : x + w] = thresh
+            card.area_px2 = w * h
+            card.stains = StainTable()
+        self.threshold_grayscale_calculated = (
+            self.sprayCard.threshold_grayscale_calculated
+        )
+
+    @staticmethod
+    def can_process(sprayCards: list[SprayCard], rects: list[tuple], shape) -> bool:
+        options = sprayCards[0].get_process_options()
+        if any(card.get_process_options() != options for card in sprayCards):
+            return False
+        # Watershed peaks are excluded near image borders, which a crop has and a sheet doesn't
+        if sprayCards[0].watershed:
+            return False
+        # Sheet labels are held whole, so large sheets are left to per-card processing
+        working_bytes = (
+            shape[0] * shape[1] * TiledSprayCardImageProcessor.WORKING_BYTES_PER_PX
+        )
+        if working_bytes > TiledSprayCardImageProcessor.memory_budget():
+            return False
+        for x, y, w, h in rects:
+            if (
+                x < 0
+                or y < 0
+                or w <= 0
+                or h <= 0
+                or x + w > shape[1]
+                or y + h > shape[0]
+            ):
+                return False
+        # Regions must not touch, else stains could join across them
+        for i, (x1, y1, w1, h1) in enumerate(rects):
+            for x2, y2, w2, h2 in rects[i + 1 :]:
+                if not (x1 + w1 < x2 or x2 + w2 < x1 or y1 + h1 < y2 or y2 + h2 < y1):
+                    return False
+        return True
+
+    def process_stains(self):
+        self.labels = self._label_stains(self.img_thresh)
+        m = self._measure_stains(self.labels)
+        for card, (x, y, w, h) in zip(self.sprayCards, self.rects):
+            # Regions don't touch, so every stain lies wholly within one of them
+            sel = (
+                (m["bbox_min_row"] >= y)
+                & (m["bbox_min_col"] >= x)
+                & (m["bbox_max_row"] <= y + h)
+                & (m["bbox_max_col"] <= x + w)
+            )
+            mc = {key: value[sel] for key, value in m.items()}
+            # Renumber and move to card coordinates, label order within a region is preserved
+            mc["index"] = np.arange(1, mc["area"].size + 1)
+            for key in ["bbox_min_row", "bbox_max_row", "centroid_row"]:
+                mc[key] = mc[key] - y
+            for key in ["bbox_min_col", "bbox_max_col", "centroid_col"]:
+                mc[key] = mc[key] - x
+            area = self._approximate_stain_areas(mc, self.labels[y : y + h, x : x + w])
+            card.stains = self._build_stain_table(mc, area, (h, w))
+            card.current = True
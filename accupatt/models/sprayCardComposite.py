@@ -2,7 +2,8 @@ import matplotlib.ticker
 import numpy as np
 from accupatt.models.passData import Pass
 from accupatt.models.seriesData import SeriesData
-from accupatt.models.sprayCard import SprayCard
+from accupatt.models.sprayCard import SprayCard, SprayCardStats
+from accupatt.models.stainHistogram import StainHistogram
 from accupatt.widgets.mplwidget import MplWidget
 
 from PyQt6.QtWidgets import QTableWidget
@@ -11,11 +12,12 @@ from PyQt6.QtWidgets import QTableWidget
 class SprayCardComposite(SprayCard):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Must keep these lists for appending to as building from individual spray cards
-        self.drop_dia_um = []
-        self.drop_vol_um3 = []
-        # Must keep this for building sum area of individual spray cards
+        self.stats = SprayCardCompositeStats(sprayCard=self)
+        # Merged droplet histogram of individual spray cards, in place of their stains
+        self.drop_hist = StainHistogram()
+        # Must keep these for building sum areas of individual spray cards
         self.area_in2 = 0.0
+        self.covered_px2 = 0.0
 
     """
     Builder Methods to generate composite
@@ -37,23 +39,18 @@ class SprayCardComposite(SprayCard):
 
     def _buildFromList(self, cards: list[SprayCard]):
         # Build composite from valid cards
+        cards = [c for c in cards if c.has_image and c.include_in_composite]
         for card in cards:
-            if not card.has_image:
-                continue
-            if not card.include_in_composite:
-                continue
             self.area_px2 += card.area_px2
             self.area_in2 += card.stats._px2_to_in2(card.area_px2)
-            dd, dv = card.stats.get_droplet_diameters_and_volumes()
-            self.drop_dia_um.extend(dd)
-            self.drop_vol_um3.extend(dv)
-            self.stains.extend(card.stains)
-        # Sort the dia and vol lists before computing dv's
-        self.stains.sort(key=lambda s: s["area"])
-        self.drop_dia_um.sort()
-        self.drop_vol_um3.sort()
+            stains = card.stains
+            self.covered_px2 += stains.sum_area(stains.is_include | stains.is_edge)
+        # Histograms merge by distinct droplet diameter, not by stain
+        self.drop_hist = StainHistogram.merge(
+            [card.stats.get_droplet_histogram() for card in cards]
+        )
         # Set the dv vals in composite stats object for future use
-        self.stats.set_volumetric_stats(self.drop_dia_um, self.drop_vol_um3)
+        self.stats.set_volumetric_stats(self.drop_hist)
 
     """
     Plot Methods
@@ -70,17 +67,18 @@ class SprayCardComposite(SprayCard):
         binned_cov = [0 for b in bins]
         binned_quant = [0 for b in bins]
         # Abort if no stains
-        if any([s["is_include"] for s in self.stains]):
-            # Convenience accessors
-            area_list = [s["area"] for s in self.stains if s["is_include"]]
-            sum_area = sum(area_list)
-            dia_list = self.drop_dia_um
-            # Get an array of bins each drop dia belongs in (1-based)
-            binned_dia = np.digitize(dia_list, bins)
+        if self.drop_hist.count() > 0:
+            # Get an array of bins each drop dia belongs in (0-based)
+            binned_dia = (np.digitize(self.drop_hist.values, bins) - 1) % len(bins)
             # Sort values into bins
-            for area, bin_ in zip(area_list, binned_dia):
-                binned_cov[bin_ - 1] += area / sum_area
-                binned_quant[bin_ - 1] += 1
+            binned_cov = np.bincount(
+                binned_dia,
+                weights=self.drop_hist.area_sums / self.drop_hist.sum_area(),
+                minlength=len(bins),
+            ).tolist()
+            binned_quant = np.bincount(
+                binned_dia, weights=self.drop_hist.counts, minlength=len(bins)
+            ).tolist()
         self._plotDistCov(mplWidget1, bins, binned_cov)
         self._plotDistQuant(mplWidget2, bins, binned_quant)
         self._plotDistStatTable(tableWidget)
@@ -121,7 +119,7 @@ class SprayCardComposite(SprayCard):
         for row in range(tableWidget.rowCount()):
             tableWidget.item(row, 1).setText("-")
         # If no drops, return
-        if not any(s["is_include"] for s in self.stains):
+        if self.drop_hist.count() == 0:
             return
         tableWidget.item(0, 1).setText(self.stats.get_dsc())
         tableWidget.item(1, 1).setText(self.stats.get_dv01(text=True))
@@ -135,3 +133,25 @@ class SprayCardComposite(SprayCard):
             str(round(self.stats.get_number_of_stains() / self.area_in2))
         )
         tableWidget.resizeColumnsToContents()
+
+
+class SprayCardCompositeStats(SprayCardStats):
+    # Composites hold no stains, count and coverage come from the merged sums
+
+    def get_percent_coverage(self, text=False):
+        sc: SprayCardComposite = self.sprayCard
+        # Protect from div/0 error
+        if sc.area_px2 == 0:
+            return 0
+        cov = (sc.covered_px2 / sc.area_px2) * 100.0
+        if text:
+            return f"{cov:.2f}%"
+        else:
+            return cov
+
+    def get_number_of_stains(self, text=False):
+        l = self.sprayCard.drop_hist.count()
+        if text:
+            return str(l)
+        else:
+            return l
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class StainHistogram:
+    """
+    Compact histogram of a per-stain quantity (stain area or droplet diameter),
+    held as ascending distinct values with the number of stains and their summed
+    stain area (px²) at each. Size scales with the number of distinct values
+    rather than stains, and histograms of many cards merge by adding counts.
+    """
+
+    def __init__(self, values=None, counts=None, area_sums=None):
+        self.values = np.asarray(values if values is not None else [], dtype=float)
+        self.counts = np.asarray(counts if counts is not None else [], dtype=np.int64)
+        self.area_sums = np.asarray(
+            area_sums if area_sums is not None else [], dtype=float
+        )
+
+    def __len__(self) -> int:
+        return self.values.size
+
+    @classmethod
+    def from_values(cls, values, counts=None, area_sums=None) -> "StainHistogram":
+        # Values default to one stain each, and to being stain areas themselves
+        values = np.asarray(values, dtype=float)
+        counts = np.ones(values.size) if counts is None else counts
+        area_sums = values * counts if area_sums is None else area_sums
+        distinct, inverse = np.unique(values, return_inverse=True)
+        return cls(
+            values=distinct,
+            counts=np.bincount(inverse, weights=counts, minlength=distinct.size),
+            area_sums=np.bincount(inverse, weights=area_sums, minlength=distinct.size),
+        )
+
+    @classmethod
+    def merge(cls, hists: list["StainHistogram"]) -> "StainHistogram":
+        if len(hists) == 0:
+            return cls()
+        return cls.from_values(
+            np.concatenate([h.values for h in hists]),
+            counts=np.concatenate([h.counts for h in hists]),
+            area_sums=np.concatenate([h.area_sums for h in hists]),
+        )
+
+    def map(self, func) -> "StainHistogram":
+        # Transform values, re-merging any which collide or change order
+        values = np.asarray(func(self.values), dtype=float)
+        if np.all(values[1:] > values[:-1]):
+            return StainHistogram(values, self.counts, self.area_sums)
+        return StainHistogram.from_values(
+            values, counts=self.counts, area_sums=self.area_sums
+        )
+
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def sum_area(self) -> float:
+        return float(self.area_sums.sum())
+
+    def quantiles(self, fractions, weights) -> np.ndarray:
+        """
+        Values at which the cumulative sum of per-stain weights reaches each
+        fraction of its total. Matches np.interp over the cumulative sum of the
+        ascending per-stain arrays, as each run of equal values only contributes
+        its first and last points.
+        """
+        weights = np.asarray(weights, dtype=float)
+        cum_last = np.cumsum(weights * self.counts)
+        cum_first = cum_last - weights * (self.counts - 1)
+        return np.interp(
+            np.asarray(fractions) * cum_last[-1],
+            np.column_stack([cum_first, cum_last]).ravel(),
+            np.repeat(self.values, 2),
+        )
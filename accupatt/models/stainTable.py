@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class StainTable:
+    """
+    Columnar (structure-of-arrays) storage of stains detected on a SprayCard.
+    Each column holds one element per stain. Contours are optional and kept in
+    a ragged store: all points concatenated, with offsets marking each stain.
+    """
+
+    def __init__(
+        self,
+        index=None,
+        area=None,
+        is_too_small=None,
+        is_edge=None,
+        is_include=None,
+    ):
+        self.index = np.asarray(index if index is not None else [], dtype=np.int32)
+        self.area = np.asarray(area if area is not None else [], dtype=np.float64)
+        self.is_too_small = np.asarray(
+            is_too_small if is_too_small is not None else [], dtype=bool
+        )
+        self.is_edge = np.asarray(is_edge if is_edge is not None else [], dtype=bool)
+        self.is_include = np.asarray(
+            is_include if is_include is not None else [], dtype=bool
+        )
+        # Ragged contour store, empty until set_contours is called
+        self.contour_points = None
+        self.contour_offsets = None
+
+    def __len__(self) -> int:
+        return self.index.size
+
+    @classmethod
+    def concatenate(cls, tables: list["StainTable"]) -> "StainTable":
+        # Contours are not carried over to the concatenated table
+        if len(tables) == 0:
+            return cls()
+        return cls(
+            index=np.concatenate([t.index for t in tables]),
+            area=np.concatenate([t.area for t in tables]),
+            is_too_small=np.concatenate([t.is_too_small for t in tables]),
+            is_edge=np.concatenate([t.is_edge for t in tables]),
+            is_include=np.concatenate([t.is_include for t in tables]),
+        )
+
+    """
+    Masked accessors
+    """
+
+    def count(self, mask=None) -> int:
+        return len(self) if mask is None else int(np.count_nonzero(mask))
+
+    def sum_area(self, mask=None) -> float:
+        return float(self.area.sum() if mask is None else self.area[mask].sum())
+
+    def get_areas(self, mask=None) -> np.ndarray:
+        return self.area if mask is None else self.area[mask]
+
+    """
+    Contours
+    """
+
+    def has_contours(self) -> bool:
+        return self.contour_offsets is not None
+
+    def set_contours(self, contours: list[np.ndarray]):
+        # Contours must be supplied in stain order, each as an (n, 2) array of x, y
+        lengths = np.array([len(c) for c in contours], dtype=np.int64)
+        self.contour_offsets = np.concatenate([[0], np.cumsum(lengths)])
+        self.contour_points = (
+            np.concatenate(contours).astype(np.int32)
+            if len(contours) > 0
+            else np.zeros((0, 2), dtype=np.int32)
+        )
+
+    def get_contours(self, mask=None) -> list[np.ndarray]:
+        if not self.has_contours():
+            return []
+        stains = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        return [
+            self.contour_points[self.contour_offsets[i] : self.contour_offsets[i + 1]]
+            for i in stains
+        ]
+
+    def clear_contours(self):
+        self.contour_points = None
+        self.contour_offsets = None
+
+    def nbytes(self) -> int:
+        n = (
+            self.index.nbytes
+            + self.area.nbytes
+            + self.is_too_small.nbytes
+            + self.is_edge.nbytes
+            + self.is_include.nbytes
+        )
+        if self.has_contours():
+            n += self.contour_points.nbytes + self.contour_offsets.nbytes
+        return n
@@ -0,0 +1,122 @@
+import zlib
+
+import numpy as np
+
+from accupatt.models.dye import Dye
+from accupatt.models.pattern import Pattern
+
+
+class StringSpectra:
+    """
+    Full spectra captured over a string pass: a float32 block of one row per
+    frame and one column per pixel, with the wavelength of each pixel and the
+    location of each frame. Emission and excitation patterns can be
+    re-extracted from it for any band or dye after the pass is flown.
+    The block is stored compressed and only decompressed when first used.
+    """
+
+    # Favours speed, the byte-shuffled block compresses well regardless
+    COMPRESSION_LEVEL = 1
+
+    def __init__(
+        self,
+        wavelengths: np.ndarray,
+        loc: np.ndarray,
+        spectra: np.ndarray = None,
+        stride: int = 1,
+    ):
+        self.wavelengths = np.asarray(wavelengths, dtype=np.float64)
+        self.loc = np.asarray(loc, dtype=np.float64)
+        # Frames kept per frame captured, 1 if every frame was kept
+        self.stride = stride
+        self._spectra = (
+            None if spectra is None else np.asarray(spectra, dtype=np.float32)
+        )
+        self._blob: bytes = None
+
+    @classmethod
+    def from_blob(
+        cls, wavelengths: bytes, loc: bytes, blob: bytes, stride: int = 1
+    ) -> "StringSpectra":
+        s = cls(
+            np.frombuffer(wavelengths, dtype=np.float64),
+            np.frombuffer(loc, dtype=np.float64),
+            stride=stride,
+        )
+        s._blob = blob
+        return s
+
+    @property
+    def n_frames(self) -> int:
+        return self.loc.size
+
+    @property
+    def n_pixels(self) -> int:
+        return self.wavelengths.size
+
+    @property
+    def nbytes(self) -> int:
+        # Size of the uncompressed block
+        return self.n_frames * self.n_pixels * 4
+
+    @property
+    def spectra(self) -> np.ndarray:
+        if self._spectra is None:
+            # Undo the byte shuffle of to_blob
+            planes = np.frombuffer(zlib.decompress(self._blob), dtype=np.uint8)
+            self._spectra = (
+                np.ascontiguousarray(planes.reshape(4, -1).T)
+                .view(np.float32)
+                .reshape(self.n_frames, self.n_pixels)
+            )
+        return self._spectra
+
+    def to_blob(self) -> bytes:
+        if self._blob is None:
+            # Group the bytes of each float by significance, which compress far better
+            planes = self.spectra.reshape(-1).view(np.uint8).reshape(-1, 4).T
+            self._blob = zlib.compress(
+                np.ascontiguousarray(planes).tobytes(), self.COMPRESSION_LEVEL
+            )
+        return self._blob
+
+    def band_pixels(
+        self, wavelength: float, boxcar_width: float = 0
+    ) -> tuple[int, int]:
+        # Nearest pixels to each edge of the band, inclusive
+        half = boxcar_width / 2
+        lo = int(np.abs(self.wavelengths - (wavelength - half)).argmin())
+        hi = int(np.abs(self.wavelengths - (wavelength + half)).argmin())
+        return lo, hi
+
+    def band_intensities(self, bands: list[tuple[float, float]]) -> np.ndarray:
+        """
+        Mean intensity of each (wavelength, boxcar width) band in every frame,
+        one row per band.
+        """
+        edges = np.array([self.band_pixels(*band) for band in bands], dtype=np.intp)
+        edges = edges.reshape(-1, 2)
+        if edges.shape[0] == 1:
+            lo, hi = edges[0]
+            return self.spectra[:, lo : hi + 1].mean(axis=1, dtype=np.float64)[None]
+        # Many bands from one cumulative sum across pixels
+        cs = np.zeros((self.n_frames, self.n_pixels + 1))
+        np.cumsum(self.spectra, axis=1, dtype=np.float64, out=cs[:, 1:])
+        lo, hi = edges[:, 0], edges[:, 1]
+        return ((cs[:, hi + 1] - cs[:, lo]) / (hi - lo + 1)).T
+
+    def extract(self, dye: Dye) -> tuple[Pattern, Pattern]:
+        # Emission and excitation patterns
+        return self.extract_dyes([dye])[0]
+
+    def extract_dyes(self, dyes: list[Dye]) -> list[tuple[Pattern, Pattern]]:
+        # Emission and excitation patterns of each dye, from one pass over the block
+        bands = []
+        for dye in dyes:
+            bands.append((dye.wavelength_emission, dye.boxcar_width))
+            bands.append((dye.wavelength_excitation, 0))
+        y = self.band_intensities(bands)
+        return [
+            (Pattern(self.loc, y[2 * i]), Pattern(self.loc, y[2 * i + 1]))
+            for i in range(len(dyes))
+        ]
@@ -546,10 +546,12 @@ class CardTable(QAbstractTableModel):
             return False
         if col >= 5 and col <= 20:
             self.triggerImageUpdate.emit(card)
+        if col >= 6 and col <= 20:
             card.current = False
             card.stats.current = False
-        if col >= 21 and col <= 24:
-            card.stats.current = False
+        # DPI and spread factors don't affect stains, only stats
+        if col == 5 or (col >= 21 and col <= 24):
+            card.stats.refresh()
         self.dataChanged.emit(index, index)
         return True
 
@@ -4,6 +4,7 @@ import os
 import accupatt.config as cfg
 from PyQt6.QtCore import QSortFilterProxyModel, Qt, QTimer, pyqtSlot, QSignalBlocker
 from PyQt6.QtWidgets import (
+    QApplication,
     QComboBox,
     QHeaderView,
     QMessageBox,
@@ -12,6 +13,7 @@ from PyQt6.QtWidgets import (
     QTableView,
 )
 from pyqtgraph import PlotWidget
+from accupatt.helpers.cardProcessingEngine import CardProcessingEngine
 from accupatt.helpers.cardStatTabelModel import CardStatTableModel, ComboBoxDelegate
 
 from accupatt.models.passData import Pass
@@ -62,7 +64,10 @@ class TabWidgetCards(TabWidgetBase):
         card_identifier_list: list[str] = []
         for p in self.seriesData.passes:
             for c in p.cards.card_list:
-                if c.has_image and (not c.current or not c.stats.current):
+                if c.has_image and c.current and not c.stats.current:
+                    # Stains still current, stats are recomputed without the image
+                    c.stats.set_volumetric_stats()
+                elif c.has_image and not c.current:
                     card_list.append(c)
                     card_identifier_list.append(f"{p.name} - {c.name}")
         if not card_list:
@@ -71,16 +76,31 @@ class TabWidgetCards(TabWidgetBase):
         prog.setMinimumDuration(0)
         prog.setWindowModality(Qt.WindowModality.WindowModal)
         prog.setRange(0, len(card_list))
-        for i, card in enumerate(card_list):
-            prog.setValue(i)
-            prog.setLabelText(
-                f"Processing {card_identifier_list[i]} and caching droplet statistics"
-            )
-            card.process_image()
-            card.stats.set_volumetric_stats()
-            if prog.wasCanceled():
-                return
+        prog.setLabelText(
+            f"Processing {len(card_list)} cards and caching droplet statistics"
+        )
+
+        def on_progress(completed: int, card: SprayCard) -> bool:
+            prog.setValue(completed)
+            if card is not None:
+                prog.setLabelText(
+                    f"Processed {card_identifier_list[card_list.index(card)]} and cached droplet statistics"
+                )
+            QApplication.processEvents()
+            return not prog.wasCanceled()
+
+        engine = CardProcessingEngine()
+        engine.process(card_list, on_progress=on_progress)
+        if prog.wasCanceled():
+            return
         prog.setValue(len(card_list))
+        # Notify of cards whose images could not be processed
+        if engine.failed:
+            QMessageBox.warning(
+                self,
+                "Card Processing Failed",
+                f"The following cards were unable to be processed, their images may be unreadable or corrupt: [{', '.join(card_identifier_list[card_list.index(c)] for c in engine.failed)}]",
+            )
         # Notify of cards which exceeded max stain limit
         if any([c.flag_max_stain_limit_reached for c in card_list]):
             QMessageBox.warning(
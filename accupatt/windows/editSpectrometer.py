@@ -4,7 +4,14 @@ import numpy as np
 from PyQt6 import uic
 from PyQt6.QtCore import pyqtSignal, pyqtSlot, QSignalBlocker
 from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import QPushButton, QComboBox, QLineEdit, QMessageBox
+from PyQt6.QtWidgets import (
+    QCheckBox,
+    QPushButton,
+    QComboBox,
+    QLineEdit,
+    QMessageBox,
+    QSpinBox,
+)
 from oceandirect.OceanDirectAPI import OceanDirectAPI, Spectrometer
 
 from accupatt.models.dye import Dye
@@ -45,6 +52,21 @@ class EditSpectrometer(baseclass):
         self.cb_units.setCurrentText(cfg.get_spectrometer_display_unit())
         self.cb_units.currentTextChanged[str].connect(self.display_units_changed)
 
+        self.cb_acquisition: QComboBox = self.ui.acquisitionModeComboBox
+        self.cb_acquisition.addItems(cfg.SPECTROMETER_ACQUISITION_MODES)
+        self.cb_acquisition.setCurrentText(cfg.get_spectrometer_acquisition_mode())
+
+        self.cb_full_spectra: QCheckBox = self.ui.fullSpectraCheckBox
+        self.cb_full_spectra.setChecked(cfg.get_spectrometer_capture_full_spectra())
+        self.sb_full_spectra_limit: QSpinBox = self.ui.fullSpectraLimitSpinBox
+        self.sb_full_spectra_limit.setValue(
+            cfg.get_spectrometer_full_spectra_limit_mb()
+        )
+        self.sb_full_spectra_limit.setEnabled(self.cb_full_spectra.isChecked())
+        self.cb_full_spectra.toggled[bool].connect(
+            self.sb_full_spectra_limit.setEnabled
+        )
+
         self.b_test_spectrometer: QPushButton = self.ui.buttonTestSpectrometer
         self.b_test_spectrometer.clicked.connect(self.test_spectrometer)
 
@@ -95,6 +117,9 @@ class EditSpectrometer(baseclass):
         TestSpectrometer(spectrometer=self.spec, dye=dye, parent=self).exec()
 
     def accept(self):
+        cfg.set_spectrometer_acquisition_mode(self.cb_acquisition.currentText())
+        cfg.set_spectrometer_capture_full_spectra(self.cb_full_spectra.isChecked())
+        cfg.set_spectrometer_full_spectra_limit_mb(self.sb_full_spectra_limit.value())
         # Notify parent of dye change
         self.dye_changed.emit(self.cb_dye.currentText())
         # Update chosen dye in config
@@ -167,8 +167,8 @@ class EditSpreadFactors(baseclass):
                         card.spread_factor_a = a
                         card.spread_factor_b = b
                         card.spread_factor_c = c
-                        # Currency Flags
-                        card.stats.current = False
+                        # Stains are unaffected, only stats need recomputing
+                        card.stats.refresh()
 
         # Update Defaults if requested
         if self.ui.checkBoxUpdateDefaults.isChecked():
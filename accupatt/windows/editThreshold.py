@@ -10,6 +10,7 @@ from PyQt6.QtWidgets import (
     QCheckBox,
     QComboBox,
     QDialogButtonBox,
+    QLabel,
     QLineEdit,
     QMessageBox,
     QPushButton,
@@ -17,7 +18,8 @@ from PyQt6.QtWidgets import (
     QSpinBox,
 )
 
-from accupatt.models.sprayCard import SprayCard
+from accupatt.helpers.imageCache import image_cache
+from accupatt.models.sprayCard import SprayCard, SprayCardImageStages
 
 Ui_Form, baseclass = uic.loadUiType(
     os.path.join(os.getcwd(), "resources", "editThreshold.ui")
@@ -38,6 +40,14 @@ class EditThreshold(baseclass):
 
         self.fit = "horizontal"
 
+        # Decode once and cache color conversions, sliders then only redo the mask step
+        self.image_stages = None
+        self.sliders = []
+        if self.sprayCard.has_image:
+            self.image_stages = SprayCardImageStages(
+                self.sprayCard.image_original(copy=False)
+            )
+
         # Threshold Type Combobox - Sets contents of Threshold GroupBox
         self.ui.comboBoxThresholdType.addItems(cfg.THRESHOLD_TYPES)
         self.ui.comboBoxThresholdType.currentIndexChanged[int].connect(
@@ -100,6 +110,11 @@ class EditThreshold(baseclass):
         )
         rs_bri.valueChanged[tuple].connect(self.updateBrightness)
 
+        # Sliders show a reduced resolution preview while dragging, full resolution on release
+        self.sliders = [self.ui.sliderGrayscale, rs_hue, rs_sat, rs_bri]
+        for slider in self.sliders:
+            slider.sliderReleased.connect(self.updateSprayCardView)
+
         self.buttonAdvancedOptions: QPushButton = self.ui.buttonAdvancedOptions
         self.buttonAdvancedOptions.clicked.connect(self._clicked_advanced_options)
 
@@ -208,8 +223,13 @@ class EditThreshold(baseclass):
     def updateSprayCardView(self):
         if not self.sprayCard.has_image:
             return
+        stages = self.image_stages
+        if any(slider.isSliderDown() for slider in self.sliders):
+            stages = stages.downscaled()
         # Left Image (1) Right Image (2)
-        cvImg1, cvImg2 = self.sprayCard.process_image(overlay=True, mask=True)
+        cvImg1, cvImg2 = self.sprayCard.process_image(
+            overlay=True, mask=True, stages=stages
+        )
         self.ui.splitCardWidget.updateSprayCardView(cvImg1, cvImg2, self.fit)
         self.ui.labelGrayscaleThresholdCalculated.clear()
         if self.sprayCard.threshold_type == cfg.THRESHOLD_TYPE_GRAYSCALE:
@@ -391,6 +411,18 @@ class ProcessOptionsAdvanced(baseclass_2):
         self.le_max: QLineEdit = self.ui.lineEditMaxStains
         self.le_max.setText(str(cfg.get_max_stain_count()))
 
+        # Memory budgets, the image cache with its current usage
+        self.sb_image_cache: QSpinBox = self.ui.spinBoxImageCacheMB
+        self.sb_image_cache.setValue(cfg.get_image_cache_mb())
+        self.label_cache_usage: QLabel = self.ui.labelImageCacheUsage
+        lookups = image_cache.hits + image_cache.misses
+        self.label_cache_usage.setText(
+            f"In use: {image_cache.nbytes / 2**20:.0f} MB, {len(image_cache)} images, "
+            f"{image_cache.hits / lookups if lookups else 0:.0%} of {lookups} reads cached"
+        )
+        self.sb_tile_memory: QSpinBox = self.ui.spinBoxTileMemoryMB
+        self.sb_tile_memory.setValue(cfg.get_tile_memory_mb())
+
         # Populate Watershed
         self.cb_watershed: QCheckBox = self.ui.checkBoxWatershed
         self.cb_watershed.setCheckState(
@@ -421,6 +453,9 @@ class ProcessOptionsAdvanced(baseclass_2):
             if msg == QMessageBox.StandardButton.Ok:
                 return
         cfg.set_max_stain_count(self.le_max.text())
+        cfg.set_image_cache_mb(self.sb_image_cache.value())
+        image_cache.set_max_bytes(self.sb_image_cache.value() * 1024 * 1024)
+        cfg.set_tile_memory_mb(self.sb_tile_memory.value())
         self.sprayCard.watershed = self.cb_watershed.isChecked()
         self.sprayCard.min_stain_area_px = self.sb_min.value()
         self.sprayCard.stain_approximation_method = self.cb_approx.currentText()
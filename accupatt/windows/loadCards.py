@@ -7,7 +7,13 @@ import accupatt.config as cfg
 import cv2
 import numpy as np
 import pyqtgraph as pg
-from accupatt.models.sprayCard import SprayCard
+from accupatt.helpers.imageCache import image_cache
+from accupatt.models.sprayCard import (
+    SheetSprayCardImageProcessor,
+    SprayCard,
+    SprayCardImageStages,
+    sprayCardImageFileHandler,
+)
 from PIL import Image
 from PyQt6 import uic
 from PyQt6.QtGui import QCursor, QImageReader, QPixmap
@@ -69,8 +75,9 @@ class LoadCards(baseclass):
         self.ui.comboBoxScale.addItems([f"{s}%" for s in cfg.ROI_SCALES])
         self.ui.comboBoxScale.setCurrentIndex(cfg.ROI_SCALES.index(self.scale))
 
-        # Image File
+        # Image File, decoded on first use
         self.image_file = image_file
+        self.img_sheet = None
 
         # List of cards
         self.card_list = card_list
@@ -133,8 +140,9 @@ class LoadCards(baseclass):
         self.ui.comboBoxDPI.setCurrentText(str(self.dpi))
         self.show_image_characteristics()
 
-        # Only search image for ROIs once
-        self.roi_rectangles = self._find_rois(self.image_file)
+        # Only search image for ROIs once, flips are applied to the decoded sheet
+        self.img_sheet = None
+        self.roi_rectangles = self._find_rois(self._read_sheet())
         # Run initial drawing of ROIs
         self.rois = []
         self.draw_rois()
@@ -323,13 +331,14 @@ class LoadCards(baseclass):
         prog.setMinimumDuration(0)
         prog.setWindowModality(Qt.WindowModality.WindowModal)
 
+        # Scanner image is decoded once, cards are cropped from it
+        img = self._read_sheet()
+        cards: list[SprayCard] = self.card_list[: len(self.rois)]
+        crops, rects, buffers = [], [], []
+        prog.setRange(0, len(self.rois) + 1)
         for i, roi in enumerate(self.rois):
-            if i == 0:
-                prog.setRange(0, len(self.rois))
             prog.setValue(i)
-            prog.setLabelText(
-                f"Cropping {self.card_list[i].name} and saving to the database"
-            )
+            prog.setLabelText(f"Cropping {cards[i].name}")
             if prog.wasCanceled():
                 return
             roi: pg.RectROI
@@ -337,24 +346,30 @@ class LoadCards(baseclass):
             y = int(roi.pos()[1])
             w = int(roi.size()[0])
             h = int(roi.size()[1])
-            # Use CV to crop image roi
-            img = cv2.imread(self.image_file)
-            # Flip as needed
-            if cfg.get_image_flip_x():
-                img = cv2.flip(img, 1)
-            if cfg.get_image_flip_y():
-                img = cv2.flip(img, 0)
             img_crop = img[y : y + h, x : x + w]
+            crops.append(img_crop)
+            rects.append((x, y, img_crop.shape[1], img_crop.shape[0]))
             # Save to bytestream
             _, buffer = cv2.imencode("*.png", img_crop)
-            # Write to db and update spray card object
-            sprayCard: SprayCard = self.card_list[i]
-            sprayCard.save_image_to_file(buffer)
-            sprayCard.has_image = True
-            sprayCard.include_in_composite = True
-            sprayCard.dpi = self.dpi
-            if i == len(self.rois) - 1:
-                prog.setValue(i + 1)
+            buffers.append(buffer)
+            cards[i].dpi = self.dpi
+        prog.setValue(len(self.rois))
+        prog.setLabelText("Processing cards and saving to the database")
+        # Process all cards while the sheet is decoded, in one pass where possible
+        if len(cards) > 0 and SheetSprayCardImageProcessor.can_process(
+            cards, rects, img.shape
+        ):
+            SheetSprayCardImageProcessor(cards, img, rects).process_stains()
+        else:
+            for card, img_crop in zip(cards, crops):
+                card.process_image(stages=SprayCardImageStages(img_crop))
+        # Write all crops and their results to db together
+        if sprayCardImageFileHandler.save_images_to_file(cards, buffers):
+            for card, img_crop in zip(cards, crops):
+                card.stats.set_volumetric_stats()
+                # Decoded crops are already on hand
+                image_cache.put(card.filepath, card.id, img_crop.copy())
+        prog.setValue(len(self.rois) + 1)
 
         self.prompt_to_delete_original()
         super().accept()
@@ -418,12 +433,18 @@ class LoadCards(baseclass):
         # Once rois_sorted contains all original rois, re-assign the original rois
         self.roi_rectangles = rois_sorted
 
-    def _find_rois(self, image_file):
-        img = cv2.imread(image_file)
-        if cfg.get_image_flip_x():
-            img = cv2.flip(img, 1)
-        if cfg.get_image_flip_y():
-            img = cv2.flip(img, 0)
+    def _read_sheet(self):
+        # Decode and orient the scanner image once, shared by ROI search and cropping
+        if self.img_sheet is None:
+            img = cv2.imread(self.image_file)
+            if cfg.get_image_flip_x():
+                img = cv2.flip(img, 1)
+            if cfg.get_image_flip_y():
+                img = cv2.flip(img, 0)
+            self.img_sheet = img
+        return self.img_sheet
+
+    def _find_rois(self, img):
         # Convert to 8-bit, blur and invert LUT if using white cards
         img_gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
         img_gray = cv2.GaussianBlur(img_gray, (0, 0), 3, borderType=cv2.BORDER_REFLECT)
@@ -4,6 +4,7 @@ import subprocess
 import sys
 
 import accupatt.config as cfg
+from accupatt.helpers.dBConnections import db_connections
 from accupatt.helpers.dataFileImporter import (
     get_file_type,
     save_file,
@@ -356,6 +357,8 @@ class MainWindow(baseclass):
 
     def change_current_file(self, file: str):
         self.currentFile = file
+        # Only the current file's db connection is worth keeping open
+        db_connections.close_all(keep=file)
         # Set directory if file exists
         if file != "":
             cfg.set_datafile_dir(os.path.dirname(self.currentFile))
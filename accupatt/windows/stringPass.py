@@ -4,13 +4,20 @@ import accupatt.config as cfg
 import numpy as np
 import pyqtgraph
 import serial
+from accupatt.helpers.stringAcquisition import (
+    BufferedStringAcquisitionWorker,
+    SampleRingBuffer,
+    SpectrumRecorder,
+    StringAcquisitionWorker,
+)
 from accupatt.models.dye import Dye
 from accupatt.models.passData import Pass
+from accupatt.models.stringSpectra import StringSpectra
 from accupatt.widgets.passinfowidget import PassInfoWidget
 from accupatt.windows.editSpectrometer import EditSpectrometer
 from accupatt.windows.editStringDrive import EditStringDrive
 from PyQt6 import uic
-from PyQt6.QtCore import QTimer, pyqtSlot, Qt
+from PyQt6.QtCore import QThread, pyqtSlot, Qt
 from PyQt6.QtWidgets import QMessageBox, QCheckBox, QLabel, QPushButton
 from oceandirect.OceanDirectAPI import OceanDirectAPI, Spectrometer
 
@@ -60,6 +67,10 @@ class StringPass(baseclass):
         # Setup plot and init data vars
         self.setup_and_clear_plot(showPopup=False)
 
+        # Acquisition runs on its own thread while capturing
+        self.acquisition_thread: QThread = None
+        self.acquisition_worker: StringAcquisitionWorker = None
+
         # Setup Spectrometer and String Drive
         self.spec = None
         self.spec_connected = False
@@ -78,13 +89,10 @@ class StringPass(baseclass):
     def populate_plot(self):
         # Load in pattern data from pass object if available
         if self.passData.string.has_data():
-            self.x = np.array(self.passData.string.data["loc"].values, dtype=float)
-            self.y = np.array(
-                self.passData.string.data[self.passData.name].values, dtype=float
-            )
-            self.y_ex = np.array(
-                self.passData.string.data_ex[self.passData.name].values, dtype=float
-            )
+            self.x = np.array(self.passData.string.data.loc, dtype=float)
+            self.y = np.array(self.passData.string.data.y, dtype=float)
+            self.y_ex = np.array(self.passData.string.data_ex.y, dtype=float)
+            self.spectra = self.passData.string.spectra
             use_rel = (
                 cfg.get_spectrometer_display_unit()
                 == cfg.SPECTROMETER_DISPLAY_UNIT_RELATIVE
@@ -111,6 +119,8 @@ class StringPass(baseclass):
         self.x = np.array([])
         self.y = np.array([])
         self.y_ex = np.array([])
+        self.spectra: StringSpectra = None
+        self.spectrum_recorder: SpectrumRecorder = None
         # Configuration options
         pyqtgraph.setConfigOptions(antialias=True)
         pyqtgraph.setConfigOption("background", "k")
@@ -119,6 +129,7 @@ class StringPass(baseclass):
         self.plotWidget: pyqtgraph.PlotWidget = self.ui.plotWidget
         # Clear the plot
         self.plotWidget.plotItem.clear()
+        self.plotWidget.plotItem.setTitle(None)
         # Add plots of excitation and emission
         self.plot_emission = self.plotWidget.plotItem.plot(name="Emission", pen="w")
         self.plot_excitation = self.plotWidget.plotItem.plot(name="Excitation", pen="c")
@@ -136,40 +147,63 @@ class StringPass(baseclass):
         self.button_string_drive.setEnabled(True)
         return True
 
-    def plotFrame(self):
-        # Calculate and log location based off elapsed/remaining time
-        self.x = np.append(
-            self.x,
-            self.location_start
-            + (
-                (self.timer.interval() - self.timer.remainingTime())
-                * self.speed_per_milli
-            ),
-        )
-        # Take a full spectrum reading, correct dark pixels and nonlinearity if supported by device & backend
-        intensities = np.array(self.spec.get_formatted_spectrum(), dtype=np.float32)
-        # record y_val (emission amplitute) and request plot update
-        self.y = np.append(
-            self.y, np.average(intensities[self.pix_em[0] : self.pix_em[1] + 1])
-        )
+    @pyqtSlot(np.ndarray, np.ndarray)
+    def plotFrame(self, t: np.ndarray, y: np.ndarray):
+        # Calculate location based off elapsed time of each sample
+        x = self.location_start + t * self.speed
         use_rel = (
             cfg.get_spectrometer_display_unit()
             == cfg.SPECTROMETER_DISPLAY_UNIT_RELATIVE
         )
-        _y = self.y / cfg.AU_PER_PERCENT_16_BIT if use_rel else self.y
-        self.plot_emission.setData(self.x, _y)
-        # record y_ex_val (excitation amplitude)
-        self.y_ex = np.append(self.y_ex, intensities[self.pix_ex])
+        _y = y / cfg.AU_PER_PERCENT_16_BIT if use_rel else y
+        self.plot_emission.setData(x, _y)
 
     @pyqtSlot()
     def endPlot(self):
-        self.timer_trigger.stop()
+        self._stop_acquisition()
         self.ser.write(cfg.STRING_DRIVE_FWD_STOP.encode())
+        # Record every sample from the acquisition buffer
+        t, self.y, self.y_ex = self.buffer.snapshot()
+        self.x = self.location_start + t * self.speed
+        self.plotFrame(t, self.y)
+        if self.spectrum_recorder is not None:
+            self._keep_spectra()
         self.enableButtons(start=False, abort=False)
         # Disable Edit spec to preserve origination params
         self.button_spec.setEnabled(False)
         self.button_string_drive.setEnabled(False)
 
+    def _keep_spectra(self):
+        r = self.spectrum_recorder
+        t, block = r.snapshot()
+        self.spectra = StringSpectra(
+            self.wavelengths, self.location_start + t * self.speed, block, r.stride
+        )
+        # Compress now, reporting what will be stored with the pass
+        stored_mb = len(self.spectra.to_blob()) / 2**20
+        report = (
+            f"{self.spectra.n_frames} spectra kept of {r.offered} at "
+            f"{r.capture_rate_hz:.0f}/s, {self.spectra.nbytes / 2**20:.1f} MB "
+            f"({stored_mb:.1f} MB compressed)"
+        )
+        if r.dropped > 0:
+            report += f", {r.dropped} dropped over limit"
+        self.plotWidget.plotItem.setTitle(report)
+        self.spectrum_recorder = None
+
+    @pyqtSlot(str)
+    def acquisitionFailed(self, message: str):
+        QMessageBox.warning(self, "Spectrometer Error", message)
+
+    def _stop_acquisition(self):
+        if self.acquisition_thread is None:
+            return
+        self.acquisition_worker.stop()
+        self.acquisition_thread.quit()
+        self.acquisition_thread.wait()
+        self.acquisition_thread = None
+        self.acquisition_worker = None
+
     @pyqtSlot()
     def click_start(self):
         if self.button_start.text() == "Start":
@@ -179,15 +213,16 @@ class StringPass(baseclass):
             self.button_start.setText("Mark")
             self.enableButtons(clear=False, reverse=False, advance=False, window=False)
         else:
-            # Initialize timers
-            self.timer = QTimer(self)
-            self.timer_trigger = QTimer(self)
             # Set local vars from config
             self.location_start = -cfg.get_string_length() / 2
-            self.speed_per_milli = cfg.get_string_speed() / 1000.0
+            self.speed = cfg.get_string_speed()
+            duration_s = cfg.get_string_length() / cfg.get_string_speed()
             # Get a handle on pixels for chosen wavelengths
-            wavelengths = np.array(self.spec.get_wavelengths(), np.float32)
-            self.pix_ex, _wav = self.spec.get_index_at_wavelength(self.passData.string.dye.wavelength_excitation)
+            wavelengths = self.spec.get_wavelengths_numpy()
+            self.wavelengths = wavelengths
+            self.pix_ex, _wav = self.spec.get_index_at_wavelength(
+                self.passData.string.dye.wavelength_excitation
+            )
             bw = self.passData.string.dye.boxcar_width
             self.pix_em = [
                 np.abs(
@@ -199,28 +234,48 @@ class StringPass(baseclass):
                     - (self.passData.string.dye.wavelength_emission + (bw / 2))
                 ).argmin(),
             ]
-            # Set the intervals and timeouts
-            self.timer.setSingleShot(True)
-            self.timer.setInterval(
-                int((cfg.get_string_length() / cfg.get_string_speed()) * 1000)
-            )
-            self.timer.timeout.connect(self.endPlot)
-            self.timer_trigger.setInterval(
-                int(self.passData.string.dye.integration_time_milliseconds)
-            )
-            self.timer_trigger.timeout.connect(self.plotFrame)
-            # Start timers
-            self.timer.start()
-            self.timer_trigger.start()
+            # Room for the whole pass at the integration time, with margin
+            int_time_s = self.passData.string.dye.integration_time_milliseconds / 1000
+            self.buffer = SampleRingBuffer(int(2 * duration_s / int_time_s) + 64)
+            # Optionally keep full spectra, within the configured size limit
+            self.spectrum_recorder = None
+            if cfg.get_spectrometer_capture_full_spectra():
+                self.spectrum_recorder = SpectrumRecorder(
+                    wavelengths.size,
+                    int(1.25 * duration_s / int_time_s) + 16,
+                    cfg.get_spectrometer_full_spectra_limit_mb() * 2**20,
+                )
+            # Acquire on a dedicated thread, ending itself after the pass duration
+            self.acquisition_thread = QThread(self)
+            args = (self.spec, self.pix_em, self.pix_ex, duration_s, self.buffer)
+            if (
+                cfg.get_spectrometer_acquisition_mode()
+                == cfg.SPECTROMETER_ACQUISITION_MODE_BUFFERED
+            ):
+                self.acquisition_worker = BufferedStringAcquisitionWorker(
+                    *args,
+                    integration_time_s=int_time_s,
+                    spectra=self.spectrum_recorder,
+                )
+            else:
+                self.acquisition_worker = StringAcquisitionWorker(
+                    *args, spectra=self.spectrum_recorder
+                )
+            self.acquisition_worker.moveToThread(self.acquisition_thread)
+            self.acquisition_thread.started.connect(self.acquisition_worker.run)
+            self.acquisition_worker.plotUpdate.connect(self.plotFrame)
+            self.acquisition_worker.failed.connect(self.acquisitionFailed)
+            self.acquisition_worker.finished.connect(self.endPlot)
+            self.acquisition_thread.start()
             self.enableButtons(
                 start=False, clear=False, reverse=False, advance=False, window=False
             )
 
     @pyqtSlot()
     def click_abort(self):
-        if not self.button_start.isEnabled():
-            self.timer.stop()
-            self.timer_trigger.stop()
+        if self.acquisition_thread is not None:
+            self.acquisition_worker.finished.disconnect(self.endPlot)
+            self._stop_acquisition()
         self.ser.write(cfg.STRING_DRIVE_FWD_STOP.encode())
         self.setup_and_clear_plot(showPopup=False)
         self.button_start.setText("Start")
@@ -239,7 +294,10 @@ class StringPass(baseclass):
             )
             if msg == QMessageBox.StandardButton.No:
                 return False
-        # Ensure connections are severed
+        # Ensure acquisition has ended and connections are severed
+        if self.acquisition_thread is not None:
+            self.acquisition_worker.finished.disconnect(self.endPlot)
+            self._stop_acquisition()
         if self.ser and self.ser.is_open:
             self.ser.close()
         if self.spec:
@@ -256,7 +314,7 @@ class StringPass(baseclass):
             return
         # Pattern
         if len(self.x) > 0:
-            p.string.setData(self.x, self.y, self.y_ex)
+            p.string.setData(self.x, self.y, self.y_ex, self.spectra)
         # If all checks out, sever serial and spectrometer connections
         if self.ser:
             self.ser.close()
@@ -43,8 +43,9 @@ class TestSpectrometer(baseclass):
         self.label_integration_Time: QLabel = self.ui.label_integration_time
 
         # Init plot
-        self.x = np.array(self.spec.get_wavelengths(), dtype=np.float32)
-        self.y = []
+        self.x = self.spec.get_wavelengths_numpy()
+        # Spectrum buffer, refilled in place each frame
+        self.y = np.empty(self.spec.get_formatted_spectrum_length())
         pyqtgraph.setConfigOptions(antialias=True)
         pyqtgraph.setConfigOption("background", "k")
         pyqtgraph.setConfigOption("foreground", "w")
@@ -162,7 +163,7 @@ class TestSpectrometer(baseclass):
         self.show()
 
     def _plot_frame(self):
-        self.y = np.array(self.spec.get_formatted_spectrum(), dtype=np.float32) # correct dark pixels and nonlinearity if supported by device & backend
+        self.spec.get_formatted_spectrum_numpy(self.y) # correct dark pixels and nonlinearity if supported by device & backend
         use_rel = (
             cfg.get_spectrometer_display_unit()
             == cfg.SPECTROMETER_DISPLAY_UNIT_RELATIVE
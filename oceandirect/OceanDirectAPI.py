@@ -8,6 +8,7 @@ import json
 from typing import List
 from ctypes import cdll, c_int, c_ushort, c_uint, c_long, create_string_buffer, c_ulong, c_ubyte, c_double, c_float, c_longlong, POINTER, byref
 from enum import Enum,auto
+import numpy as np
 from oceandirect.sdk_properties import oceandirect_dll
 from oceandirect.od_logger import od_logger
 
@@ -26,6 +27,17 @@ class OceanDirectError(Exception):
     def get_error_details(self) -> tuple[int, str]:
         return (self._error_code, self._error_msg)
 
+def _numpy_out(out: np.ndarray, shape: tuple, dtype) -> np.ndarray:
+    """!
+    Validate, or allocate if None, an output array that the device library can write into directly.
+    """
+
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape or out.dtype != dtype or not out.flags.c_contiguous or not out.flags.writeable:
+        raise ValueError("Output array must be a writeable, C-contiguous %s array of shape %s" % (np.dtype(dtype).name, shape))
+    return out
+
 class OceanDirectAPI:
     
     class __OceanDirectSingleton:
@@ -465,6 +477,8 @@ class Spectrometer():
         self.scans_to_avg = 1
         self.boxcar_hw = False
         self.__nlflag = c_ubyte(1)
+        self.__wavelengths_np = None
+        self.__err_np = (c_long * 1)(0)
 
     def get_serial_number(self) -> str:
         """!
@@ -663,6 +677,23 @@ class Spectrometer():
             raise OceanDirectError(err_cp[0], error_msg)
         return list(spd_c)
 
+    def get_formatted_spectrum_numpy(self, out: np.ndarray = None) -> np.ndarray:
+        """!
+        Return a formatted spectrum as a NumPy array. The device writes straight into the array's memory,
+        so no python list is built. Pass the same array back in on each call to avoid allocating one per spectrum.
+        @param[in] out Optional C-contiguous float64 array of get_formatted_spectrum_length() elements to fill.
+        @return The formatted spectrum, in out if it was given.
+        """
+
+        out = _numpy_out(out, (self.pixel_count_formatted,), np.float64)
+        err_cp = self.__err_np
+        err_cp[0] = 0
+        self.oceandirect.odapi_get_formatted_spectrum(self.device_id, err_cp, out.ctypes.data_as(POINTER(c_double)), self.pixel_count_formatted)
+        if err_cp[0] != 0:
+            error_msg = self.decode_error(err_cp[0],"get_formatted_spectrum_numpy")
+            raise OceanDirectError(err_cp[0], error_msg)
+        return out
+
     def get_formatted_spectrum_length(self) -> int:
         """!
         Return the formatted spectra length.
@@ -690,6 +721,29 @@ class Spectrometer():
                 self.wavelengths = list(wl_c)
         return self.wavelengths
     
+    def get_wavelengths_numpy(self, out: np.ndarray = None) -> np.ndarray:
+        """!
+        Return the wavelengths for the spectrometer as a NumPy array. The values are read from the device
+        once and cached.
+        @param[in] out Optional C-contiguous float64 array of get_formatted_spectrum_length() elements to fill.
+        @return The wavelength values, in out if it was given. Without out, the cached read-only array is returned.
+        """
+
+        if self.__wavelengths_np is None:
+            wl = np.empty(self.pixel_count_formatted, dtype=np.float64)
+            err_cp = (c_long * 1)(0)
+            self.oceandirect.odapi_get_wavelengths(self.device_id, err_cp, wl.ctypes.data_as(POINTER(c_double)), self.pixel_count_formatted)
+            if err_cp[0] != 0:
+                error_msg = self.decode_error(err_cp[0],"get_wavelengths_numpy")
+                raise OceanDirectError(err_cp[0], error_msg)
+            wl.setflags(write=False)
+            self.__wavelengths_np = wl
+        if out is None:
+            return self.__wavelengths_np
+        out = _numpy_out(out, (self.pixel_count_formatted,), np.float64)
+        np.copyto(out, self.__wavelengths_np)
+        return out
+
     def get_minimum_integration_time(self) -> int:
         """!
         Returns the minimum allowable integration time on the device.
@@ -2394,6 +2448,33 @@ class Spectrometer():
 
             return spectraCount
 
+        def get_raw_spectrum_with_metadata_numpy(self, out_spectra: np.ndarray, out_timestamps: np.ndarray) -> int:
+            """!
+            As get_raw_spectrum_with_metadata(), with the device writing straight into NumPy arrays rather
+            than python lists. The number of rows in the arrays is the buffer size (maximum is 15).
+            @param[in] out_spectra    C-contiguous float64 array of (buffer size, get_formatted_spectrum_length()) to fill.
+            @param[in] out_timestamps C-contiguous int64 array of buffer size, filled with the timestamp of each spectra.
+            @return The number of spectra read, filling the first rows. It can be zero.
+            """
+
+            buffer_size = out_spectra.shape[0]
+            pixels = self.device.pixel_count_formatted
+            _numpy_out(out_spectra, (buffer_size, pixels), np.float64)
+            _numpy_out(out_timestamps, (buffer_size,), np.int64)
+            # Row pointers into the caller's array
+            buffer = (POINTER(c_double) * buffer_size)()
+            for x in range(buffer_size):
+                buffer[x] = out_spectra[x].ctypes.data_as(POINTER(c_double))
+
+            err_cp       = (c_long * 1)(0)
+            spectraCount = self.device.oceandirect.odapi_get_raw_spectrum_with_metadata(self.device.device_id, err_cp, buffer, buffer_size,
+                                                                                        pixels, out_timestamps.ctypes.data_as(POINTER(c_longlong)), buffer_size)
+
+            if err_cp[0] != 0:
+                error_msg = self.device.decode_error(err_cp[0], "get_raw_spectrum_with_metadata_numpy")
+                raise OceanDirectError(err_cp[0], error_msg)
+            return spectraCount
+
         def get_usb_endpoint_primary_out(self) -> int:
             """!
             This function returns the usb primary OUT endpoint for the type specified. If the type is not
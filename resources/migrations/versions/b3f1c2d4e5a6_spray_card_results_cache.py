@@ -0,0 +1,33 @@
+"""spray_card_results cache table
+
+Revision ID: b3f1c2d4e5a6
+Revises: 270e53247037
+Create Date: 2026-10-18 09:12:31.104522
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f1c2d4e5a6'
+down_revision = '270e53247037'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "spray_card_results",
+        sa.Column("spray_card_id", sa.String, sa.ForeignKey("spray_cards.id"), primary_key=True),
+        sa.Column("process_key", sa.String),
+        sa.Column("area_px2", sa.Float),
+        sa.Column("threshold_grayscale_calculated", sa.Float),
+        sa.Column("stain_index", sa.LargeBinary),
+        sa.Column("stain_area", sa.LargeBinary),
+        sa.Column("stain_flags", sa.LargeBinary),
+    )
+
+
+def downgrade():
+    op.drop_table("spray_card_results")
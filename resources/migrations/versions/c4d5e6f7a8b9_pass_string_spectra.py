@@ -0,0 +1,31 @@
+"""pass_string_spectra table for full spectrum capture
+
+Revision ID: c4d5e6f7a8b9
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-18 14:03:52.518207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d5e6f7a8b9'
+down_revision = 'b3f1c2d4e5a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "pass_string_spectra",
+        sa.Column("pass_id", sa.String, sa.ForeignKey("passes.id"), primary_key=True),
+        sa.Column("stride", sa.Integer),
+        sa.Column("wavelengths", sa.LargeBinary),
+        sa.Column("loc", sa.LargeBinary),
+        sa.Column("spectra", sa.LargeBinary),
+    )
+
+
+def downgrade():
+    op.drop_table("pass_string_spectra")
@@ -0,0 +1,93 @@
+"""binary pass_string excitation_data and emission_data
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-18 16:41:07.230915
+
+"""
+import json
+import struct
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5e6f7a8b9c0'
+down_revision = 'c4d5e6f7a8b9'
+branch_labels = None
+depends_on = None
+
+# As Pattern.to_blob, version 1 with float64 values, uncompressed
+_HEADER = struct.Struct("<4sBBBxI")
+
+
+def _json_to_blob(text: str) -> bytes:
+    # DataFrame.to_json of a loc column and one intensity column
+    columns = json.loads(text)
+    loc = columns.pop("loc", {})
+    y = next(iter(columns.values()), {})
+    keys = sorted(loc.keys(), key=int)
+    values = [loc[k] for k in keys] + [y.get(k) for k in keys]
+    # NaN is written to JSON as null
+    values = [float("nan") if v is None else v for v in values]
+    header = _HEADER.pack(b"APAT", 1, 8, 0, len(keys))
+    return header + struct.pack(f"<{len(values)}d", *values)
+
+
+def _blob_to_json(blob: bytes, name: str) -> str:
+    # Inverse of _json_to_blob, also reading float32 or compressed blobs
+    _, _, itemsize, flags, n = _HEADER.unpack_from(blob)
+    payload = blob[_HEADER.size :]
+    if flags & 1:
+        payload = zlib.decompress(payload)
+    values = struct.unpack_from(f"<{2 * n}{'f' if itemsize == 4 else 'd'}", payload)
+    # As DataFrame.to_json, indexed by row with NaN as null
+    values = [None if v != v else v for v in values]
+    columns = {
+        "loc": {str(i): values[i] for i in range(n)},
+        name: {str(i): values[n + i] for i in range(n)},
+    }
+    return json.dumps(columns, separators=(",", ":"))
+
+
+def upgrade():
+    # TEXT affinity stores blobs unchanged, so the columns are converted in place
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("""SELECT pass_id, excitation_data, emission_data FROM pass_string""")
+    ).fetchall()
+    for pass_id, d_ex, d_em in rows:
+        conn.execute(
+            sa.text(
+                """UPDATE pass_string SET excitation_data = :d_ex, emission_data = :d_em WHERE pass_id = :pass_id"""
+            ),
+            {
+                "d_ex": _json_to_blob(d_ex) if isinstance(d_ex, str) else d_ex,
+                "d_em": _json_to_blob(d_em) if isinstance(d_em, str) else d_em,
+                "pass_id": pass_id,
+            },
+        )
+
+
+def downgrade():
+    # Older builds name the intensity column after the pass
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text(
+            """SELECT pass_string.pass_id, passes.pass_name, excitation_data, emission_data FROM pass_string LEFT JOIN passes ON passes.id = pass_string.pass_id"""
+        )
+    ).fetchall()
+    for pass_id, name, d_ex, d_em in rows:
+        name = name if name is not None else "y"
+        conn.execute(
+            sa.text(
+                """UPDATE pass_string SET excitation_data = :d_ex, emission_data = :d_em WHERE pass_id = :pass_id"""
+            ),
+            {
+                "d_ex": _blob_to_json(d_ex, name) if isinstance(d_ex, bytes) else d_ex,
+                "d_em": _blob_to_json(d_em, name) if isinstance(d_em, bytes) else d_em,
+                "pass_id": pass_id,
+            },
+        )
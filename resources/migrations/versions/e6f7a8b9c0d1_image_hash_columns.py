@@ -0,0 +1,49 @@
+"""image_hash of spray_cards and spray_card_results
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-18 21:24:16.803541
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6f7a8b9c0d1'
+down_revision = 'd5e6f7a8b9c0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("spray_cards", sa.Column("image_hash", sa.String))
+    op.add_column("spray_card_results", sa.Column("image_hash", sa.String))
+    # Hash each stored image once, as dBBridge.hash_image
+    conn = op.get_bind()
+    ids = conn.execute(
+        sa.text("""SELECT id FROM spray_cards WHERE image IS NOT NULL""")
+    ).fetchall()
+    for (id_,) in ids:
+        image = conn.execute(
+            sa.text("""SELECT image FROM spray_cards WHERE id = :id"""), {"id": id_}
+        ).scalar()
+        conn.execute(
+            sa.text("""UPDATE spray_cards SET image_hash = :hash WHERE id = :id"""),
+            {"hash": hashlib.sha1(image).hexdigest(), "id": id_},
+        )
+    # Results saved for an older image are still caught by their process_key
+    conn.execute(
+        sa.text(
+            """UPDATE spray_card_results SET image_hash = (SELECT image_hash FROM spray_cards WHERE spray_cards.id = spray_card_results.spray_card_id)"""
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("spray_card_results") as batch_op:
+        batch_op.drop_column("image_hash")
+    with op.batch_alter_table("spray_cards") as batch_op:
+        batch_op.drop_column("image_hash")
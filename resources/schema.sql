@@ -113,10 +113,17 @@ CREATE TABLE IF NOT EXISTS pass_string (
     smooth_window           REAL,
     smooth_order            INTEGER,
     data_loc_units          TEXT,
-    excitation_data         TEXT,
-    emission_data           TEXT,
+    excitation_data         BLOB,
+    emission_data           BLOB,
     include_in_composite    INTEGER
 );
+CREATE TABLE IF NOT EXISTS pass_string_spectra (
+    pass_id                 TEXT PRIMARY KEY REFERENCES passes(id),
+    stride                  INTEGER,
+    wavelengths             BLOB,
+    loc                     BLOB,
+    spectra                 BLOB
+);
 CREATE TABLE IF NOT EXISTS pass_spray_card (
     pass_id                 TEXT PRIMARY KEY REFERENCES passes(id),
     center                  INTEGER,
@@ -151,5 +158,16 @@ CREATE TABLE IF NOT EXISTS spray_cards (
     spread_factor_b                 REAL,
     spread_factor_c                 REAL,
     has_image                       INTEGER,
-    image                           BLOB
+    image                           BLOB,
+    image_hash                      TEXT
+);
+CREATE TABLE IF NOT EXISTS spray_card_results (
+    spray_card_id                   TEXT PRIMARY KEY REFERENCES spray_cards(id),
+    process_key                     TEXT,
+    area_px2                        REAL,
+    threshold_grayscale_calculated  REAL,
+    stain_index                     BLOB,
+    stain_area                      BLOB,
+    stain_flags                     BLOB,
+    image_hash                      TEXT
 );
\ No newline at end of file